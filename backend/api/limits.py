@@ -0,0 +1,59 @@
+"""Request body size limit.
+
+The limit is enforced before the body is parsed: a declared Content-Length
+over the limit is rejected straight away, and bodies without one (chunked
+uploads) are counted as they stream in and cut off once they pass it.
+
+Configuration (environment):
+    MAX_UPLOAD_MB  maximum request body size (default 512, 0 disables)
+"""
+
+import os
+
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+def _too_large_detail(max_bytes: int) -> str:
+    return f"Upload too large. The limit is {max_bytes // (1024 * 1024)} MB."
+
+
+class UploadLimitMiddleware:
+    def __init__(self, app: ASGIApp, max_bytes: int | None = None):
+        self.app = app
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("MAX_UPLOAD_MB", "512")) * 1024 * 1024
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self.max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    declared = 0
+                if declared > self.max_bytes:
+                    response = JSONResponse({"detail": _too_large_detail(self.max_bytes)}, status_code=413)
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside the endpoint's body parsing, so the
+                    # app's exception handling turns it into the response
+                    raise HTTPException(status_code=413, detail=_too_large_detail(self.max_bytes))
+            return message
+
+        await self.app(scope, limited_receive, send)
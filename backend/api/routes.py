@@ -1,109 +1,365 @@
-import re
+import asyncio
+import json
+import time
 from typing import Optional
 
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 
-from services.epub_parser import parse_epub
-from services.clippings_parser import parse_clippings, Clipping
-from services.markdown_generator import generate_markdown, merge_markdown
+from services.clippings_index import clippings_store
+from services.batch import convert_library, stream_zip
+from services.conversion import ConversionError, ConversionRequest, run_conversion
+from services.conversion_pool import ConversionTimeout, PoolBusy, WorkerCrashed, conversion_pool
+from services.metrics import StageTimer, conversion_metrics
+from services.profiling import new_profile, profile_path, profile_report, profiling_enabled
+from services.uploads import SpooledUpload, spool_upload
 
 router = APIRouter(prefix="/api")
 
+# Clippings uploads are copied into the clippings store this many bytes at a time
+CLIPPINGS_CHUNK_SIZE = 256 * 1024
 
-def _parse_pasted_notes(text: str) -> list[Clipping]:
-    """Parse pasted bullet points into Clipping objects."""
-    notes: list[Clipping] = []
-    for line in text.splitlines():
-        line = line.strip()
-        # Strip leading bullet markers: -, *, •, numbered (1., 2.)
-        line = re.sub(r"^(?:[-*•]\s*|\d+[.)]\s*)", "", line).strip()
-        if not line:
-            continue
-        notes.append(Clipping(
-            book_title="",
-            author="",
-            text=line,
-            clip_type="note",
-            page=None,
-            location_start=None,
-            location_end=None,
-            date=None,
-        ))
-    return notes
+# Conversions whose /convert/stream client went away, kept until they finish
+_detached: set[asyncio.Task] = set()
+
+# Conversion outcomes in /metrics, by HTTP status; anything else is "error"
+_OUTCOMES = {503: "busy", 422: "timeout"}
+
+
+def _store_clippings(clippings: UploadFile, timer: StageTimer | None = None) -> str:
+    """Stream an uploaded clippings file into the store and return its id."""
+    def chunks():
+        for chunk in iter(lambda: clippings.file.read(CLIPPINGS_CHUNK_SIZE), b""):
+            if timer is not None:
+                timer.count("clippings_bytes", len(chunk))
+            yield chunk
+    return clippings_store.put(chunks())
 
 
 @router.post("/convert")
 async def convert(
+    response: Response,
+    epub: UploadFile = File(...),
+    clippings: Optional[UploadFile] = File(None),
+    notes: Optional[str] = Form(None),
+    existing_markdown: Optional[UploadFile] = File(None),
+    existing_markdown_text: Optional[str] = Form(None),
+    clippings_id: Optional[str] = Form(None),
+    timings: bool = False,
+    profile: bool = False,
+):
+    """Convert an epub + Kindle clippings + pasted notes into structured markdown.
+
+    A clippings file uploaded earlier can be reused by passing the
+    ``clippings_id`` returned by a previous response instead of the file.
+
+    Every stage is timed into the Server-Timing header and /metrics; with
+    ``?timings=true`` the milliseconds are also returned in ``stats.timings``.
+    With profiling enabled (PROFILE_DIR), ``?profile=true`` profiles the
+    conversion; the X-Profile-Id header names the profile to download.
+    """
+    started = time.perf_counter()
+    timer = StageTimer()
+    profile_id = profile_file = None
+    if profile and profiling_enabled():
+        profile_id, profile_file = new_profile()
+    try:
+        body = await _convert(
+            timer, epub, clippings, notes, existing_markdown, existing_markdown_text, clippings_id, profile_file
+        )
+    except HTTPException as e:
+        conversion_metrics.outcome(_OUTCOMES.get(e.status_code, "error"))
+        if profile_id and profile_path(profile_id):
+            e.headers = {**(e.headers or {}), "X-Profile-Id": profile_id}
+        raise
+    timer.add("total", time.perf_counter() - started)
+    conversion_metrics.outcome("ok")
+    conversion_metrics.observe(timer)
+    response.headers["Server-Timing"] = timer.server_timing()
+    if profile_id:
+        response.headers["X-Profile-Id"] = profile_id
+    if timings:
+        body["stats"]["timings"] = timer.milliseconds()
+    return body
+
+
+@router.post("/convert/stream")
+async def convert_stream(
     epub: UploadFile = File(...),
     clippings: Optional[UploadFile] = File(None),
     notes: Optional[str] = Form(None),
     existing_markdown: Optional[UploadFile] = File(None),
     existing_markdown_text: Optional[str] = Form(None),
+    clippings_id: Optional[str] = Form(None),
 ):
-    """Convert an epub + Kindle clippings + pasted notes into structured markdown."""
+    """/convert, reporting progress as it goes in newline-delimited JSON events.
+
+    Each line is an object with a "stage": "upload" (byte counts),
+    "epub_parsed" (title, chapters), "clippings_parsed" (highlights),
+    "merge" (existing_highlights, already_merged, repeated, new; merge mode
+    only), "matching" (done of total highlights) and finally "done" with
+    the /convert response body in "result" and the stage timings, or
+    "error" with the status and detail /convert would have answered.
+    Invalid uploads are still rejected with an HTTP error before streaming.
+    """
+    started = time.perf_counter()
+    timer = StageTimer()
+    try:
+        request, spooled = await _prepare(
+            timer, epub, clippings, notes, existing_markdown, existing_markdown_text, clippings_id, None
+        )
+    except HTTPException:
+        conversion_metrics.outcome("error")
+        raise
+    return _ProgressResponse(timer, started, request, spooled)
+
+
+def _event_line(event: dict) -> bytes:
+    return (json.dumps(event) + "\n").encode("utf-8")
+
+
+def _detached_done(task: asyncio.Task) -> None:
+    _detached.discard(task)
+    if not task.cancelled():
+        task.exception()  # Nobody is left to report it to
+
+
+class _ProgressResponse(StreamingResponse):
+    """The /convert/stream response: conversion progress as NDJSON events.
+
+    The spooled epub belongs to the response until the body starts the
+    conversion, which then removes it. A client can go away before the
+    body is first iterated; the response removes the spool itself then.
+    """
+
+    def __init__(self, timer: StageTimer, started: float, request: ConversionRequest, spooled: SpooledUpload):
+        self._spooled = spooled
+        self._converting = False
+        super().__init__(
+            self._events(timer, started, request),
+            media_type="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # Runs the body's cleanup if it was left at a yield
+            await self.body_iterator.aclose()
+            if not self._converting:
+                self._spooled.remove()
+
+    async def _events(self, timer: StageTimer, started: float, request: ConversionRequest):
+        channel, events = await conversion_pool.open_channel()
+        request.progress = channel
+        task = asyncio.ensure_future(_run(timer, request, self._spooled))
+        self._converting = True
+        try:
+            yield _event_line({"stage": "upload", **timer.counts})
+            while not task.done():
+                next_event = asyncio.ensure_future(events.get())
+                try:
+                    await asyncio.wait((next_event, task), return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    if not next_event.done():
+                        next_event.cancel()
+                if next_event.done():
+                    yield _event_line(next_event.result())
+            await conversion_pool.flush_channel(channel)
+            while (event := await events.get()) is not None:
+                yield _event_line(event)
+
+            try:
+                body = task.result()
+            except HTTPException as e:
+                conversion_metrics.outcome(_OUTCOMES.get(e.status_code, "error"))
+                yield _event_line({"stage": "error", "status": e.status_code, "detail": e.detail})
+                return
+            except Exception:
+                conversion_metrics.outcome("error")
+                yield _event_line({"stage": "error", "status": 500, "detail": "Conversion failed"})
+                raise
+            timer.add("total", time.perf_counter() - started)
+            conversion_metrics.outcome("ok")
+            conversion_metrics.observe(timer)
+            yield _event_line({"stage": "done", "result": body, "timings": timer.milliseconds()})
+        finally:
+            conversion_pool.close_channel(channel)
+            # The client went away: stop forwarding events but let the conversion
+            # finish, so it keeps its pool slot and its spooled epub until then
+            if not task.done():
+                _detached.add(task)
+                task.add_done_callback(_detached_done)
+
+
+async def _convert(
+    timer: StageTimer,
+    epub: UploadFile,
+    clippings: Optional[UploadFile],
+    notes: Optional[str],
+    existing_markdown: Optional[UploadFile],
+    existing_markdown_text: Optional[str],
+    clippings_id: Optional[str],
+    profile_file: Optional[str],
+) -> dict:
+    request, spooled = await _prepare(
+        timer, epub, clippings, notes, existing_markdown, existing_markdown_text, clippings_id, profile_file
+    )
+    return await _run(timer, request, spooled)
+
+
+async def _prepare(
+    timer: StageTimer,
+    epub: UploadFile,
+    clippings: Optional[UploadFile],
+    notes: Optional[str],
+    existing_markdown: Optional[UploadFile],
+    existing_markdown_text: Optional[str],
+    clippings_id: Optional[str],
+    profile_file: Optional[str],
+) -> tuple[ConversionRequest, SpooledUpload]:
+    """Validate and store the uploads; the spooled epub is removed by _run."""
     # Validate epub
     if not epub.filename or not epub.filename.lower().endswith(".epub"):
         raise HTTPException(status_code=400, detail="Please upload a valid .epub file")
 
-    try:
-        epub_bytes = await epub.read()
-        book = parse_epub(epub_bytes)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to parse epub file: {e}")
+    with timer.stage("upload"):
+        # Store the clippings file if provided; the worker reads this book's entries from its index
+        if clippings and clippings.filename:
+            try:
+                clippings_id = await run_in_threadpool(_store_clippings, clippings, timer)
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Failed to read clippings file: {e}")
 
-    all_clippings: list[Clipping] = []
+        # Parse existing markdown if provided (merge mode) — file takes precedence over pasted text
+        existing_md_text: Optional[str] = None
+        if existing_markdown and existing_markdown.filename:
+            if not existing_markdown.filename.lower().endswith(".md"):
+                raise HTTPException(status_code=400, detail="Existing markdown file must be a .md file")
+            try:
+                md_bytes = await existing_markdown.read()
+                existing_md_text = md_bytes.decode("utf-8-sig", errors="replace")
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Failed to read existing markdown file: {e}")
+        elif existing_markdown_text and existing_markdown_text.strip():
+            existing_md_text = existing_markdown_text
 
-    # Parse clippings file if provided
-    if clippings and clippings.filename:
-        try:
-            clippings_bytes = await clippings.read()
-            clippings_text = clippings_bytes.decode("utf-8", errors="replace")
-            all_clippings = parse_clippings(clippings_text, filter_title=book.title)
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Failed to parse clippings file: {e}")
+        # The worker opens the epub from a spooled copy rather than receiving its bytes
+        spooled = await run_in_threadpool(spool_upload, epub.file, ".epub")
+    timer.count("epub_bytes", spooled.size)
+    request = ConversionRequest(
+        epub_path=spooled.path,
+        epub_digest=spooled.digest,
+        clippings_id=clippings_id,
+        notes=notes,
+        existing_markdown=existing_md_text,
+        profile_path=profile_file,
+    )
+    return request, spooled
 
-    # Parse pasted notes if provided
-    pasted_notes: list[Clipping] = []
-    if notes and notes.strip():
-        pasted_notes = _parse_pasted_notes(notes)
-        all_clippings.extend(pasted_notes)
 
-    if not all_clippings:
+async def _run(timer: StageTimer, request: ConversionRequest, spooled: SpooledUpload) -> dict:
+    submitted = time.perf_counter()
+    try:
+        body = await conversion_pool.run(run_conversion, request)
+    except ConversionError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except PoolBusy as e:
         raise HTTPException(
-            status_code=400,
-            detail="No highlights or notes provided. Upload a clippings file or paste some notes.",
+            status_code=503,
+            detail="The server is busy converting other books. Please try again shortly.",
+            headers={"Retry-After": str(e.retry_after)},
         )
+    except ConversionTimeout:
+        raise HTTPException(status_code=422, detail="This book took too long to convert.")
+    except WorkerCrashed:
+        raise HTTPException(status_code=500, detail="The conversion failed unexpectedly. Please try again.")
+    finally:
+        spooled.remove()
+
+    worker = body.pop("metrics")
+    # Waiting for a worker, and moving the request and result between processes
+    timer.add("queue", max(0.0, time.perf_counter() - submitted - worker["seconds"]))
+    timer.update(worker)
+    return body
+
+
+@router.post("/convert/batch")
+async def convert_batch(
+    epubs: list[UploadFile] = File(...),
+    clippings: Optional[UploadFile] = File(None),
+    clippings_id: Optional[str] = Form(None),
+):
+    """Convert many epubs against one clippings file into a zip of markdown files.
+
+    The zip holds one markdown file per book that had highlights and a
+    stats.json with per-book stats and errors.
+    """
+    for epub in epubs:
+        if not epub.filename or not epub.filename.lower().endswith(".epub"):
+            raise HTTPException(status_code=400, detail=f"Not an .epub file: {epub.filename}")
 
-    # Parse existing markdown if provided (merge mode) — file takes precedence over pasted text
-    existing_md_text: Optional[str] = None
-    if existing_markdown and existing_markdown.filename:
-        if not existing_markdown.filename.lower().endswith(".md"):
-            raise HTTPException(status_code=400, detail="Existing markdown file must be a .md file")
+    if clippings and clippings.filename:
         try:
-            md_bytes = await existing_markdown.read()
-            existing_md_text = md_bytes.decode("utf-8-sig", errors="replace")
+            clippings_id = await run_in_threadpool(_store_clippings, clippings)
         except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Failed to read existing markdown file: {e}")
-    elif existing_markdown_text and existing_markdown_text.strip():
-        existing_md_text = existing_markdown_text
-
-    if existing_md_text:
-        result = merge_markdown(book, all_clippings, existing_md_text)
-    else:
-        result = generate_markdown(book, all_clippings)
-
-    return {
-        "title": result.title,
-        "author": result.author,
-        "chapters": [
-            {
-                "title": ch.title,
-                "level": ch.level,
-                "highlights": ch.highlights,
-            }
-            for ch in result.chapters
-        ],
-        "markdown": result.markdown,
-        "original_markdown": existing_md_text,
-        "stats": result.stats,
-    }
+            raise HTTPException(status_code=400, detail=f"Failed to read clippings file: {e}")
+    if not clippings_id:
+        raise HTTPException(status_code=400, detail="Upload a clippings file to convert a library.")
+    if not clippings_store.exists(clippings_id):
+        raise HTTPException(
+            status_code=404,
+            detail="Clippings file not found on the server. Please upload it again.",
+        )
+
+    # convert_library removes each spooled epub once its book is done
+    books: list[tuple[str, SpooledUpload]] = []
+    for epub in epubs:
+        books.append((epub.filename, await run_in_threadpool(spool_upload, epub.file, ".epub")))
+    return StreamingResponse(
+        stream_zip(convert_library(books, clippings_id)),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="kindle-highlights.zip"'},
+    )
+
+
+@router.post("/clippings")
+async def upload_clippings(clippings: UploadFile = File(...)):
+    """Store a clippings file and list the books it contains."""
+    try:
+        clippings_id = await run_in_threadpool(_store_clippings, clippings)
+        books = await run_in_threadpool(clippings_store.books, clippings_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to parse clippings file: {e}")
+    return {"clippings_id": clippings_id, "books": books}
+
+
+@router.get("/clippings/{clippings_id}")
+async def list_clippings_books(clippings_id: str):
+    """List the books in a stored clippings file with their highlight counts."""
+    try:
+        books = await run_in_threadpool(clippings_store.books, clippings_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Clippings file not found on the server.")
+    return {"clippings_id": clippings_id, "books": books}
+
+
+@router.delete("/clippings/{clippings_id}", status_code=204)
+async def delete_clippings(clippings_id: str):
+    """Delete a stored clippings file and its index."""
+    if not await run_in_threadpool(clippings_store.delete, clippings_id):
+        raise HTTPException(status_code=404, detail="Clippings file not found on the server.")
+    return Response(status_code=204)
+
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(profile_id: str, format: str = "pstats"):
+    """A profile saved by /api/convert?profile=true: the .pstats file, or a text report with format=text."""
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    if format == "text":
+        return PlainTextResponse(await run_in_threadpool(profile_report, path))
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.pstats")
@@ -0,0 +1,10 @@
+"""Performance benchmarks. Run from the backend directory, e.g.
+
+    python -m benchmarks.bench_matching
+
+benchmarks.suite times every conversion stage and saves the results as
+JSON, to compare commits:
+
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --compare before.json
+"""
@@ -0,0 +1,69 @@
+"""Merge dedup scaling: linear containment scan vs DedupIndex.
+
+    python -m benchmarks.bench_dedup [--existing 10000] [--new 1000]
+"""
+
+import argparse
+import random
+import time
+
+from services.markdown_generator import DedupIndex
+
+from .synthetic import make_text, make_vocabulary
+
+
+def linear_is_duplicate(norm: str, existing: set[str]) -> bool:
+    """The pre-index merge_markdown check."""
+    if norm in existing:
+        return True
+    return any(norm in e or e in norm for e in existing)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--existing", type=int, default=10_000)
+    ap.add_argument("--new", type=int, default=1_000)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    vocab = make_vocabulary(5000, rng)
+    existing = [make_text(rng.randint(8, 60), vocab, rng).replace(".", "") for _ in range(args.existing)]
+    new = []
+    for _ in range(args.new):
+        if rng.random() < 0.5:
+            words = rng.choice(existing).split()
+            new.append(" ".join(words[2:-2]) or words[0])  # truncated re-highlight
+        else:
+            new.append(make_text(rng.randint(8, 60), vocab, rng).replace(".", ""))
+
+    print(f"{args.existing} existing x {args.new} new highlights")
+
+    start = time.perf_counter()
+    seen = set(existing)
+    linear_dups = 0
+    for norm in new:
+        if linear_is_duplicate(norm, seen):
+            linear_dups += 1
+        seen.add(norm)
+    linear = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = DedupIndex()
+    for norm in existing:
+        index.add(norm)
+    build = time.perf_counter() - start
+    index_dups = 0
+    for norm in new:
+        if index.find(norm) is not None:
+            index_dups += 1
+        index.add(norm)
+    indexed = time.perf_counter() - start
+
+    assert linear_dups == index_dups
+    print(f"  linear   {linear:8.3f}s")
+    print(f"  indexed  {indexed:8.3f}s  (build {build:.3f}s)  {linear / indexed:6.1f}x")
+    print(f"  duplicates found: {index_dups}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""EPUB parsing: ebooklib's read_epub vs the lazy zip reader.
+
+    python -m benchmarks.bench_epub_parse [--chapters 80] [--images 40] [--image-kb 1000]
+
+Reports wall time and peak Python memory (tracemalloc) for parsing one
+illustrated EPUB from a file on disk.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+from ebooklib import epub
+
+from services.epub_parser import _parse_book, parse_epub
+
+from .synthetic import make_epub
+
+
+def ebooklib_parse(path: str):
+    """The pre-lazy-reader parse_epub."""
+    return _parse_book(epub.read_epub(path, options={"ignore_ncx": False}))
+
+
+def measure(fn, path: str):
+    tracemalloc.start()
+    start = time.perf_counter()
+    book = fn(path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return book, elapsed, peak
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--chapters", type=int, default=80)
+    ap.add_argument("--images", type=int, default=40)
+    ap.add_argument("--image-kb", type=int, default=1000)
+    args = ap.parse_args()
+    warnings.filterwarnings("ignore")
+
+    data = make_epub(chapters=args.chapters, images=args.images, image_bytes=args.image_kb * 1024)
+    with tempfile.NamedTemporaryFile(suffix=".epub", delete=False) as f:
+        f.write(data)
+    try:
+        print(f"{args.chapters} chapters, {args.images} images, {len(data) / 1e6:.1f} MB")
+        baseline, base_time, base_peak = measure(ebooklib_parse, f.name)
+        lazy, lazy_time, lazy_peak = measure(parse_epub, f.name)
+    finally:
+        os.unlink(f.name)
+
+    assert baseline == lazy
+    print(f"  ebooklib {base_time:8.3f}s  peak {base_peak / 1e6:8.1f} MB")
+    print(f"  lazy     {lazy_time:8.3f}s  peak {lazy_peak / 1e6:8.1f} MB  "
+          f"{base_time / lazy_time:5.1f}x faster, {base_peak / lazy_peak:5.1f}x less memory")
+
+
+if __name__ == "__main__":
+    main()
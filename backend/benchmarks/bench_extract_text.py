@@ -0,0 +1,47 @@
+"""HTML text extraction: BeautifulSoup vs the lxml parser-target extractor.
+
+    python -m benchmarks.bench_extract_text [--chapters 80] [--words 4000]
+
+Extracts the text of every chapter of a synthetic EPUB, as rendered by
+its document items, with both extractors.
+"""
+
+import argparse
+import io
+import time
+import warnings
+import zipfile
+
+from services.epub_parser import _LazyEpub, _extract_text_bs4, _extract_text_lxml
+
+from .synthetic import make_epub
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--chapters", type=int, default=80)
+    ap.add_argument("--words", type=int, default=4000)
+    args = ap.parse_args()
+    warnings.filterwarnings("ignore")
+
+    data = make_epub(chapters=args.chapters, words_per_chapter=args.words, images=0)
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        book = _LazyEpub(zf)
+        documents = [item.get_content() for item in book.items if item.get_name().endswith(".xhtml")]
+    print(f"{len(documents)} documents, {sum(map(len, documents)) / 1e6:.1f} MB")
+
+    start = time.perf_counter()
+    reference = [_extract_text_bs4(doc) for doc in documents]
+    bs4_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fast = [_extract_text_lxml(doc) for doc in documents]
+    lxml_time = time.perf_counter() - start
+
+    assert fast == reference
+    print(f"  bs4   {bs4_time:8.3f}s")
+    print(f"  lxml  {lxml_time:8.3f}s  {bs4_time / lxml_time:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
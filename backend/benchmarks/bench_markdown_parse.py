@@ -0,0 +1,70 @@
+"""parse_existing_markdown on large vault files.
+
+    python -m benchmarks.bench_markdown_parse [--mb 10] [--repeat 3]
+
+Times the parser on three layouts of roughly ``--mb`` megabytes each: a
+plain export, an export with user-written blocks after a fifth of the
+highlights, and an export followed by one long block of user content. The
+last is compared with the previous way of trimming a raw block, re-enacted
+here: leading blank lines removed one ``list.pop(0)`` at a time.
+"""
+
+import argparse
+import time
+
+from services.markdown_parser import RawBlock, _flush_raw_accumulator, parse_existing_markdown
+
+from .synthetic import make_export_markdown
+
+
+def popping_flush(raw_accumulator: list[str]) -> RawBlock | None:
+    """The previous _flush_raw_accumulator."""
+    while raw_accumulator and raw_accumulator[0].strip() == "":
+        raw_accumulator.pop(0)
+    while raw_accumulator and raw_accumulator[-1].strip() == "":
+        raw_accumulator.pop()
+    if not raw_accumulator:
+        return None
+    return RawBlock(lines=list(raw_accumulator))
+
+
+def best_of(repeat: int, fn, *args) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--mb", type=float, default=10)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    target = int(args.mb * 1_000_000)
+
+    export = make_export_markdown(target)
+    annotated = make_export_markdown(target, user_ratio=0.2)
+    # A vault note whose body, after the export, is one long run of user content
+    head = make_export_markdown(target // 2)
+    tail_lines = (target - len(head)) // 7  # half blank lines, half "user content"
+    appended = head + "\n" * (tail_lines // 2) + "\nuser content" * (tail_lines // 2)
+
+    for name, text in [("export", export), ("user blocks", annotated), ("appended notes", appended)]:
+        seconds = best_of(args.repeat, parse_existing_markdown, text)
+        parsed = parse_existing_markdown(text)
+        highlights = sum(len(ch.highlights) for ch in parsed.chapters)
+        mb = len(text.encode()) / 1e6
+        print(f"  {name:15} {mb:5.1f} MB  {highlights:7} highlights  {seconds:7.3f}s  {mb / seconds:6.1f} MB/s")
+
+    blank_first = [""] * 100_000 + ["user content"] * 100_000
+    old = best_of(1, lambda: popping_flush(list(blank_first)))
+    new = best_of(args.repeat, lambda: _flush_raw_accumulator(list(blank_first)))
+    print("  trimming 100,000 leading blank lines")
+    print(f"    list.pop(0)     {old:8.3f}s")
+    print(f"    index slice     {new:8.3f}s  {old / new:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
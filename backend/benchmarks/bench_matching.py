@@ -0,0 +1,40 @@
+"""Compare the matching engines in services.markdown_generator.MATCHERS.
+
+    python -m benchmarks.bench_matching [--chapters 80] [--words 4000] [--highlights 1500]
+"""
+
+import argparse
+import time
+
+from services import markdown_generator
+from services.markdown_generator import MATCHERS, _highlight_query, build_book_index
+
+from .synthetic import make_book, make_clippings
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--chapters", type=int, default=80)
+    ap.add_argument("--words", type=int, default=4000)
+    ap.add_argument("--highlights", type=int, default=1500)
+    args = ap.parse_args()
+
+    book = make_book(args.chapters, args.words)
+    clippings = make_clippings(book, args.highlights)
+    index = build_book_index(book)
+    queries = [_highlight_query(c.text, c.location_start, c.page) for c in clippings]
+
+    print(f"{args.chapters} chapters x {args.words} words, {args.highlights} highlights")
+    if markdown_generator.ahocorasick is None:
+        print("  (pyahocorasick not installed: automaton uses the pure-Python fallback)")
+    timings = {}
+    for name, matcher in MATCHERS.items():
+        start = time.perf_counter()
+        matcher(queries, index)
+        timings[name] = time.perf_counter() - start
+    for name, seconds in timings.items():
+        print(f"  {name:10s} {seconds:8.3f}s  {timings['pairwise'] / seconds:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
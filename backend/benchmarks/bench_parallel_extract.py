@@ -0,0 +1,47 @@
+"""EPUB parsing with document text extracted by 0, 1, 2, 4... worker processes.
+
+    python -m benchmarks.bench_parallel_extract [--chapters 400] [--words 4000] [--workers 0 2 4]
+
+Parses the same synthetic EPUB with each worker count and checks that the
+chapters come out identical. Worker pools are started before timing.
+Scaling is bounded by the host's core count.
+"""
+
+import argparse
+import os
+import time
+import warnings
+
+from services.epub_parser import _extract_executor, parse_epub
+
+from .synthetic import make_epub
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--chapters", type=int, default=400)
+    ap.add_argument("--words", type=int, default=4000)
+    ap.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4, 8])
+    args = ap.parse_args()
+    warnings.filterwarnings("ignore")
+
+    data = make_epub(chapters=args.chapters, words_per_chapter=args.words, images=0)
+    print(f"{args.chapters} chapters, {len(data) / 1e6:.1f} MB, {os.cpu_count()} CPUs")
+
+    reference = None
+    baseline = None
+    for workers in args.workers:
+        if workers > 1:
+            # Warm the pool so process start-up isn't timed
+            list(_extract_executor(workers).map(abs, range(workers * 4)))
+        start = time.perf_counter()
+        book = parse_epub(data, workers=workers)
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference, baseline = book, elapsed
+        assert book == reference
+        print(f"  workers={workers:<3} {elapsed:8.3f}s  {baseline / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
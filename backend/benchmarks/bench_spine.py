@@ -0,0 +1,87 @@
+"""parse_epub on a book split into 1,000 files: spine merge and no-TOC fallback.
+
+    python -m benchmarks.bench_spine [--files 1000] [--words 600] [--toc-every 250]
+
+Times parse_epub on two layouts of the same synthetic book: a sparse TOC,
+where the untitled files fold into the preceding chapter, and no TOC at
+all. Each is compared with the previous approach, re-enacted here: chapter
+text grown by string concatenation, and a second BeautifulSoup parse of
+every fallback document to find its heading.
+"""
+
+import argparse
+import io
+import time
+import warnings
+import zipfile
+
+import ebooklib
+from bs4 import BeautifulSoup
+
+from services.epub_parser import _LazyEpub, _extract_text, parse_epub
+
+from .synthetic import make_epub
+
+
+def concatenated_merge(data: bytes, toc_every: int) -> list[str]:
+    """Chapter texts as the old spine merge grew them."""
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        book = _LazyEpub(zf)
+        texts: list[str] = []
+        for i, (item_id, _) in enumerate(book.spine):
+            text = _extract_text(book.get_item_with_id(item_id).get_content())
+            if i % toc_every == 0:
+                texts.append(text)
+            else:
+                texts[-1] = texts[-1] + " " + text
+    return texts
+
+
+def two_parse_fallback(data: bytes) -> list[str]:
+    """Chapter titles as the old fallback found them."""
+    titles = []
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        for i, item in enumerate(_LazyEpub(zf).get_items_of_type(ebooklib.ITEM_DOCUMENT)):
+            content = item.get_content()
+            if not _extract_text(content).strip():
+                continue
+            heading = BeautifulSoup(content, "lxml").find(["h1", "h2", "h3"])
+            titles.append(heading.get_text(strip=True) if heading else f"Chapter {i + 1}")
+    return titles
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument("--files", type=int, default=1000)
+    ap.add_argument("--words", type=int, default=600)
+    ap.add_argument("--toc-every", type=int, default=250)
+    args = ap.parse_args()
+    warnings.filterwarnings("ignore")
+
+    sparse = make_epub(chapters=args.files, words_per_chapter=args.words, images=0, toc_every=args.toc_every)
+    no_toc = make_epub(chapters=args.files, words_per_chapter=args.words, images=0, toc_every=0)
+    print(f"{args.files} files, {len(sparse) / 1e6:.1f} MB")
+
+    book, new_time = timed(parse_epub, sparse)
+    texts, old_time = timed(concatenated_merge, sparse, args.toc_every)
+    assert [ch.text for ch in book.chapters] == texts
+    print(f"  sparse TOC ({len(book.chapters)} chapters)")
+    print(f"    concatenation  {old_time:8.3f}s")
+    print(f"    parse_epub     {new_time:8.3f}s  {old_time / new_time:5.1f}x")
+
+    book, new_time = timed(parse_epub, no_toc)
+    titles, old_time = timed(two_parse_fallback, no_toc)
+    assert [ch.title for ch in book.chapters] == titles
+    print(f"  no TOC ({len(book.chapters)} chapters)")
+    print(f"    two parses     {old_time:8.3f}s")
+    print(f"    parse_epub     {new_time:8.3f}s  {old_time / new_time:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Per-stage timings of a conversion, saved as JSON for comparing commits.
+
+    python -m benchmarks.suite [--size medium] [--repeat 5] [--output results.json] [--compare baseline.json]
+
+Generates a synthetic EPUB (nested TOC with fragment links) and a
+My Clippings.txt of highlights taken from it: mostly exact, some truncated,
+reordered, curly-quoted or orphaned. Then times each stage on its own:
+
+    parse_epub               EPUB bytes -> ParsedBook
+    parse_clippings          My Clippings.txt -> clippings
+    generate_markdown        match every highlight, render markdown
+    merge_markdown           merge every highlight into an export of half of them
+    remerge_markdown         merge every highlight again into that merge's output
+    parse_existing_markdown  parse the full export
+
+Each stage runs ``--repeat`` times; the JSON keeps every run along with
+the minimum and median. ``--compare`` prints each stage's median against
+a previous results file.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+import warnings
+from datetime import datetime, timezone
+from pathlib import Path
+
+from services.clippings_parser import parse_clippings
+from services.epub_parser import parse_epub
+from services.markdown_generator import generate_markdown, merge_markdown
+from services.markdown_parser import parse_existing_markdown
+
+from .synthetic import format_clippings, make_clippings, make_epub
+
+SIZES = {
+    "small": {"chapters": 20, "words": 2000, "highlights": 300},
+    "medium": {"chapters": 80, "words": 4000, "highlights": 1500},
+    "large": {"chapters": 300, "words": 6000, "highlights": 6000},
+}
+
+
+def _commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=Path(__file__).parent, check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def _time(fn, repeat: int, setup=None) -> list[float]:
+    runs = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--size", choices=SIZES, default="medium")
+    ap.add_argument("--chapters", type=int, help="override the size's chapter count")
+    ap.add_argument("--words", type=int, help="override the size's words per chapter")
+    ap.add_argument("--highlights", type=int, help="override the size's highlight count")
+    ap.add_argument("--sections", type=int, default=3, help="fragment-linked sections per chapter")
+    ap.add_argument("--toc-depth", type=int, default=3)
+    ap.add_argument("--matcher", default="location", help="matching engine, as /api/convert uses")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--output", type=Path, help="write results JSON here")
+    ap.add_argument("--compare", type=Path, help="previous results JSON to compare against")
+    args = ap.parse_args()
+    warnings.filterwarnings("ignore")
+
+    params = dict(SIZES[args.size])
+    for key in ("chapters", "words", "highlights"):
+        if getattr(args, key) is not None:
+            params[key] = getattr(args, key)
+    params.update(sections=args.sections, toc_depth=args.toc_depth, matcher=args.matcher, seed=args.seed)
+
+    epub_bytes = make_epub(
+        chapters=params["chapters"],
+        words_per_chapter=params["words"],
+        images=0,
+        seed=args.seed,
+        sections_per_chapter=args.sections,
+        toc_depth=args.toc_depth,
+        quote_ratio=0.02,
+    )
+    book = parse_epub(epub_bytes)
+    clippings_text = format_clippings(
+        make_clippings(book, params["highlights"], seed=args.seed, curly_ratio=0.2)
+    )
+    clippings = parse_clippings(clippings_text)
+    existing = generate_markdown(book, clippings[: len(clippings) // 2], matcher=args.matcher).markdown
+    generated = generate_markdown(book, clippings, matcher=args.matcher)
+    full = generated.markdown
+    merged = merge_markdown(book, clippings, existing, matcher=args.matcher).markdown
+
+    def cold_index():
+        # Matching builds its index on the book; time that as part of each run
+        book.search_index = None
+
+    stages = {
+        "parse_epub": _time(lambda: parse_epub(epub_bytes), args.repeat),
+        "parse_clippings": _time(lambda: parse_clippings(clippings_text), args.repeat),
+        "generate_markdown": _time(
+            lambda: generate_markdown(book, clippings, matcher=args.matcher), args.repeat, cold_index
+        ),
+        "merge_markdown": _time(
+            lambda: merge_markdown(book, clippings, existing, matcher=args.matcher), args.repeat, cold_index
+        ),
+        "remerge_markdown": _time(
+            lambda: merge_markdown(book, clippings, merged, matcher=args.matcher), args.repeat, cold_index
+        ),
+        "parse_existing_markdown": _time(lambda: parse_existing_markdown(full), args.repeat),
+    }
+
+    results = {
+        "commit": _commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": params,
+        "inputs": {
+            "epub_bytes": len(epub_bytes),
+            "chapters": len(book.chapters),
+            "clippings_bytes": len(clippings_text.encode()),
+            "markdown_bytes": len(full.encode()),
+        },
+        # A change here means the timings no longer measure the same work
+        "match_stats": generated.stats,
+        "stages": {
+            name: {"min": min(runs), "median": statistics.median(runs), "runs": runs}
+            for name, runs in stages.items()
+        },
+    }
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    print(f"{args.size}: {params['chapters']} chapters x {params['words']} words, "
+          f"{params['highlights']} highlights (commit {results['commit'] or 'unknown'})")
+    for name, stage in results["stages"].items():
+        line = f"  {name:24s} {stage['median']:8.4f}s  (min {stage['min']:.4f}s)"
+        before = (baseline or {}).get("stages", {}).get(name)
+        if before:
+            line += f"  {before['median'] / stage['median']:5.2f}x vs {baseline.get('commit') or args.compare.name}"
+        print(line)
+    if baseline and baseline.get("params") != params:
+        print("  note: the baseline was run with different parameters")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""Deterministic synthetic books and clippings for benchmarks."""
+
+import io
+import random
+import zipfile
+
+from services.epub_parser import Chapter, ParsedBook
+from services.clippings_parser import Clipping
+
+SYLLABLES = [
+    "ka", "lo", "mi", "ren", "tos", "va", "el", "dor", "shi", "qu",
+    "an", "bel", "cor", "fin", "gra", "hul", "ix", "jom", "nu", "pel",
+]
+COMMON = ["the", "of", "and", "to", "a", "in", "that", "it", "was", "he"]
+
+
+def make_vocabulary(size: int, rng: random.Random) -> list[str]:
+    words: set[str] = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))))
+    return sorted(words)
+
+
+def make_text(words: int, vocab: list[str], rng: random.Random, quote_ratio: float = 0.0) -> str:
+    """Random sentences; ``quote_ratio`` of the words get a straight apostrophe or quotes."""
+    out = []
+    for i in range(words):
+        out.append(rng.choice(COMMON) if rng.random() < 0.3 else rng.choice(vocab))
+        if quote_ratio and rng.random() < quote_ratio:
+            out[-1] = f"{out[-1]}'s" if rng.random() < 0.5 else f'"{out[-1]}"'
+        if i % 17 == 16:
+            out[-1] += "."
+    return " ".join(out)
+
+
+def make_book(chapters: int = 80, words_per_chapter: int = 4000, seed: int = 0, quote_ratio: float = 0.0) -> ParsedBook:
+    """Build an in-memory book with a flat TOC."""
+    rng = random.Random(seed)
+    vocab = make_vocabulary(5000, rng)
+    return ParsedBook(
+        title="Synthetic Book",
+        author="Bench Author",
+        chapters=[
+            Chapter(
+                title=f"Chapter {i + 1}",
+                level=1,
+                order=i,
+                text=make_text(words_per_chapter, vocab, rng, quote_ratio),
+                href=f"ch{i + 1}.xhtml",
+            )
+            for i in range(chapters)
+        ],
+    )
+
+
+def make_clippings(
+    book: ParsedBook,
+    count: int = 1500,
+    orphan_ratio: float = 0.05,
+    truncated_ratio: float = 0.1,
+    reworded_ratio: float = 0.05,
+    seed: int = 0,
+    curly_ratio: float = 0.0,
+) -> list[Clipping]:
+    """Pick highlights from the book in reading order.
+
+    A share of them are truncated in the middle (tier-2 matches), a share
+    have their words reordered (tier-1 word-overlap matches) and a share are
+    made-up orphans that match no chapter. With ``curly_ratio``, a share of
+    the rest have the book's straight quotes turned curly, as Kindle does.
+    """
+    rng = random.Random(seed)
+    vocab = make_vocabulary(5000, random.Random(seed + 1))
+    clippings: list[Clipping] = []
+    location = 0
+    per_chapter = max(1, count // max(1, len(book.chapters)))
+    for i in range(count):
+        chapter = book.chapters[min(i // per_chapter, len(book.chapters) - 1)]
+        words = chapter.text.split()
+        length = rng.randint(8, 60)
+        start = rng.randint(0, max(0, len(words) - length))
+        span = words[start:start + length]
+        roll = rng.random()
+        if roll < orphan_ratio:
+            span = [f"{w}zz" for w in rng.sample(vocab, length)]
+        elif roll < orphan_ratio + truncated_ratio and len(span) > 12:
+            span = span[:6] + ["…"] + span[-6:]
+        elif roll < orphan_ratio + truncated_ratio + reworded_ratio:
+            span = sorted(span)
+        elif curly_ratio and rng.random() < curly_ratio:
+            span = [_curly(word) for word in span]
+        location += rng.randint(5, 40)
+        clippings.append(Clipping(
+            book_title=book.title,
+            author=book.author,
+            text=" ".join(span),
+            clip_type="highlight",
+            page=None,
+            location_start=location,
+            location_end=location + 3,
+            date=None,
+        ))
+    return clippings
+
+
+def _xhtml(title: str, body: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="utf-8"?><!DOCTYPE html>'
+        f'<html xmlns="http://www.w3.org/1999/xhtml"><head><title>{title}</title></head>'
+        f"<body>{body}</body></html>"
+    )
+
+
+def make_epub(
+    chapters: int = 80,
+    words_per_chapter: int = 4000,
+    images: int = 40,
+    image_bytes: int = 1_000_000,
+    seed: int = 0,
+    toc_every: int = 1,
+    sections_per_chapter: int = 0,
+    toc_depth: int = 2,
+    quote_ratio: float = 0.0,
+) -> bytes:
+    """Build an EPUB 2 file with an NCX TOC, one XHTML file per chapter and
+    incompressible image files, like an illustrated book.
+
+    Only every ``toc_every``-th file gets a TOC entry (0: none), like books
+    split into many files per chapter. Each chapter with an entry can have
+    ``sections_per_chapter`` headings the TOC links to by fragment, nested
+    down to ``toc_depth`` levels."""
+    rng = random.Random(seed)
+    vocab = make_vocabulary(5000, rng)
+    manifest = ['<item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>']
+    spine = []
+    toc: list[tuple[int, str, str]] = []
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        zf.writestr(
+            "META-INF/container.xml",
+            '<?xml version="1.0"?><container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+            '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+            "</rootfiles></container>",
+        )
+        for i in range(chapters):
+            in_toc = bool(toc_every) and i % toc_every == 0
+            if in_toc:
+                toc.append((1, f"Chapter {i + 1}", f"ch{i + 1}.xhtml"))
+            sections = sections_per_chapter if in_toc else 0
+            paragraphs = []
+            for j in range(10):
+                if sections and j % max(1, 10 // sections) == 0 and j // max(1, 10 // sections) < sections:
+                    number = j // max(1, 10 // sections) + 1
+                    paragraphs.append(f'<h2 id="s{number}">Section {i + 1}.{number}</h2>')
+                    # Sections step down one level at a time, then start over at level 2
+                    level = 2 + (number - 1) % max(1, toc_depth - 1)
+                    toc.append((level, f"Section {i + 1}.{number}", f"ch{i + 1}.xhtml#s{number}"))
+                paragraphs.append(f"<p>{make_text(words_per_chapter // 10, vocab, rng, quote_ratio)}</p>")
+            zf.writestr(
+                f"OEBPS/ch{i + 1}.xhtml",
+                _xhtml(f"Chapter {i + 1}", f"<h1>Chapter {i + 1}</h1>{''.join(paragraphs)}"),
+            )
+            manifest.append(f'<item id="ch{i + 1}" href="ch{i + 1}.xhtml" media-type="application/xhtml+xml"/>')
+            spine.append(f'<itemref idref="ch{i + 1}"/>')
+        for i in range(images):
+            zf.writestr(f"OEBPS/images/img{i}.jpg", rng.randbytes(image_bytes))
+            manifest.append(f'<item id="img{i}" href="images/img{i}.jpg" media-type="image/jpeg"/>')
+        zf.writestr(
+            "OEBPS/toc.ncx",
+            '<?xml version="1.0"?><ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">'
+            f"<head/><docTitle><text>Synthetic Book</text></docTitle><navMap>{_nav_points(toc)}</navMap></ncx>",
+        )
+        zf.writestr(
+            "OEBPS/content.opf",
+            '<?xml version="1.0"?><package xmlns="http://www.idpf.org/2007/opf" version="2.0" unique-identifier="id">'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/"><dc:identifier id="id">synthetic</dc:identifier>'
+            "<dc:title>Synthetic Book</dc:title><dc:creator>Bench Author</dc:creator></metadata>"
+            f'<manifest>{"".join(manifest)}</manifest><spine toc="ncx">{"".join(spine)}</spine></package>',
+        )
+    return buf.getvalue()
+
+
+def _nav_points(toc: list[tuple[int, str, str]]) -> str:
+    """Nested NCX navPoints for (level, label, src) entries in reading order."""
+    out = []
+    open_levels: list[int] = []
+    for order, (level, label, src) in enumerate(toc, 1):
+        while open_levels and open_levels[-1] >= level:
+            open_levels.pop()
+            out.append("</navPoint>")
+        out.append(
+            f'<navPoint id="np{order}" playOrder="{order}"><navLabel><text>{label}</text></navLabel>'
+            f'<content src="{src}"/>'
+        )
+        open_levels.append(level)
+    out.extend("</navPoint>" for _ in open_levels)
+    return "".join(out)
+
+
+def _curly(word: str) -> str:
+    if word.startswith('"'):
+        word = "\u201c" + word[1:]
+    return word.replace('"', "\u201d").replace("'", "\u2019")
+
+
+def format_clippings(clippings: list[Clipping]) -> str:
+    """Serialize clippings the way a Kindle writes My Clippings.txt."""
+    entries = []
+    for clipping in clippings:
+        what = "Highlight" if clipping.clip_type == "highlight" else "Note"
+        page = f" on page {clipping.page}" if clipping.page is not None else ""
+        location = f"location {clipping.location_start}"
+        if clipping.location_end is not None and clipping.location_end != clipping.location_start:
+            location += f"-{clipping.location_end}"
+        entries.append(
+            f"{clipping.book_title} ({clipping.author})\n"
+            f"- Your {what}{page} | {location} | Added on {clipping.date or 'Monday, January 1, 2024 12:00:00 AM'}\n"
+            f"\n{clipping.text}\n==========\n"
+        )
+    return "\ufeff" + "".join(entries)
+
+
+def make_export_markdown(
+    target_bytes: int = 10_000_000,
+    highlights_per_chapter: int = 40,
+    user_ratio: float = 0.0,
+    user_lines: int = 20,
+    seed: int = 0,
+) -> str:
+    """Markdown in the app's export format, as merged into a vault file.
+
+    Chapters of quoted highlights and notes with their metadata lines are
+    added until the text reaches ``target_bytes``. With ``user_ratio``, that
+    share of the highlights is followed by a block of ``user_lines`` lines
+    of user-written content, padded with blank lines.
+    """
+    rng = random.Random(seed)
+    vocab = make_vocabulary(5000, rng)
+    lines = ["# Synthetic Book", "", "*Bench Author*", ""]
+    size = 0
+    chapter = 0
+    while size < target_bytes:
+        chapter += 1
+        block = [f"## Chapter {chapter}", ""]
+        for i in range(highlights_per_chapter):
+            location = chapter * 1000 + i * 20
+            if rng.random() < 0.1:
+                block += [f"- {make_text(rng.randint(5, 20), vocab, rng)}", f"  LOCATION {location} · ANNOTATION"]
+            else:
+                block += [
+                    f'- "{make_text(rng.randint(8, 60), vocab, rng)}"',
+                    f"  PAGE {location // 10} · LOCATION {location}-{location + 3} · HIGHLIGHT",
+                ]
+            if user_ratio and rng.random() < user_ratio:
+                block += [""] * 3
+                block += [make_text(rng.randint(5, 30), vocab, rng) if j % 4 else "" for j in range(user_lines)]
+                block += [""] * 3
+            block.append("")
+        size += sum(len(line) + 1 for line in block)
+        lines += block
+    return "\n".join(lines)
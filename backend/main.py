@@ -1,14 +1,29 @@
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 
+from api.limits import UploadLimitMiddleware
 from api.routes import router
+from services.conversion_pool import conversion_pool
+from services.epub_cache import epub_cache_stats
+from services.metrics import conversion_metrics
 
-app = FastAPI(title="KindleToMD", description="Convert Kindle highlights to Markdown")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    conversion_pool.shutdown()
+
+
+app = FastAPI(title="KindleToMD", description="Convert Kindle highlights to Markdown", lifespan=lifespan)
+
+# Added before CORSMiddleware so that it runs inside it and early 413s carry CORS headers
+app.add_middleware(UploadLimitMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -25,7 +40,23 @@ STATIC_DIR = Path(__file__).parent / "static"
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    # Cache counters are for this process; pooled workers each keep their own memory tier
+    return {
+        "status": "ok",
+        "epub_cache": epub_cache_stats(),
+        "conversion_pool": conversion_pool.metrics(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics for /api/convert, for this server process."""
+    pool = conversion_pool.metrics()
+    gauges = {f"conversion_pool_{name}": pool[name] for name in ("workers", "in_flight", "queue_depth")}
+    return PlainTextResponse(
+        conversion_metrics.render(gauges),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 
 if STATIC_DIR.is_dir():
@@ -0,0 +1,171 @@
+"""Convert a library of EPUBs against one clippings file.
+
+The books run in the shared conversion pool, so a batch is subject to the
+same worker bound as /api/convert; books wait for a free slot instead of
+being rejected. Each worker reads only its book's entries of the stored
+clippings file.
+
+Configuration (environment):
+    BATCH_WORKERS  books of one batch converted at once (default: CONVERT_WORKERS)
+"""
+
+import asyncio
+import json
+import os
+import re
+import zipfile
+from collections.abc import AsyncIterable, AsyncIterator
+from dataclasses import dataclass, field
+
+from .clippings_index import clippings_store
+from .conversion_pool import ConversionPool, ConversionTimeout, conversion_pool
+from .epub_cache import parse_epub_cached
+from .markdown_generator import generate_markdown
+from .uploads import SpooledUpload
+
+
+@dataclass
+class BookConversion:
+    """Outcome of converting one EPUB of a batch."""
+    filename: str
+    title: str = ""
+    author: str = ""
+    markdown: str | None = None
+    stats: dict = field(default_factory=dict)
+    error: str | None = None
+
+
+# Books still converting after their batch's client went away
+_detached: set[asyncio.Task] = set()
+
+
+def _convert_book(clippings_id: str, filename: str, epub_path: str, digest: str) -> BookConversion:
+    result = BookConversion(filename=filename)
+    try:
+        book = parse_epub_cached(epub_path, digest)
+    except Exception as e:
+        result.error = f"Failed to parse epub file: {e}"
+        return result
+    result.title, result.author = book.title, book.author
+
+    clippings = clippings_store.clippings_for(clippings_id, book.title)
+    if not clippings:
+        result.error = "No highlights found for this book"
+        return result
+
+    generated = generate_markdown(book, clippings)
+    result.markdown = generated.markdown
+    result.stats = generated.stats
+    return result
+
+
+def _book_done(task: asyncio.Task, upload: SpooledUpload) -> None:
+    upload.remove()
+    if task in _detached:
+        _detached.discard(task)
+        if not task.cancelled():
+            task.exception()  # Nobody is left to report it to
+
+
+async def convert_library(
+    epubs: list[tuple[str, SpooledUpload]],
+    clippings_id: str,
+    pool: ConversionPool = conversion_pool,
+    max_concurrent: int | None = None,
+) -> AsyncIterator[BookConversion]:
+    """Convert every (filename, spooled upload) EPUB against a stored clippings file.
+
+    Yields results as books finish, not in input order. Each spooled upload
+    is removed once its book is done; books already submitted when the
+    caller stops are left to finish first.
+    """
+    if max_concurrent is None:
+        max_concurrent = int(os.environ.get("BATCH_WORKERS", "0")) or max(pool.workers, 1)
+    books = iter(epubs)
+    running: dict[asyncio.Task, str] = {}
+
+    def start(name: str, upload: SpooledUpload) -> None:
+        task = asyncio.ensure_future(
+            pool.run(_convert_book, clippings_id, name, upload.path, upload.digest, wait=True)
+        )
+        task.add_done_callback(lambda task: _book_done(task, upload))
+        running[task] = name
+
+    try:
+        for _, (name, upload) in zip(range(max_concurrent), books):
+            start(name, upload)
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = running.pop(task)
+                book = next(books, None)
+                if book is not None:
+                    start(*book)
+                try:
+                    yield task.result()
+                except ConversionTimeout:
+                    yield BookConversion(filename=name, error="This book took too long to convert.")
+                except Exception as e:
+                    yield BookConversion(filename=name, error=f"Conversion failed: {e}")
+    finally:
+        for _, upload in books:
+            upload.remove()
+        _detached.update(task for task in running if not task.done())
+
+
+def _markdown_filename(title: str, used: set[str]) -> str:
+    base = re.sub(r'[\\/:*?"<>|\x00-\x1f]+', " ", title).strip(" .") or "Untitled"
+    name = f"{base}.md"
+    n = 2
+    while name in used:
+        name = f"{base} ({n}).md"
+        n += 1
+    used.add(name)
+    return name
+
+
+class _ChunkSink:
+    """Write-only file object that collects bytes for a streaming response."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_zip(conversions: AsyncIterable[BookConversion]) -> AsyncIterator[bytes]:
+    """Stream a zip of one markdown file per converted book plus stats.json.
+
+    Each book is written to the zip as soon as it is available.
+    """
+    sink = _ChunkSink()
+    used: set[str] = set()
+    summary: list[dict] = []
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        async for conversion in conversions:
+            entry = {
+                "epub": conversion.filename,
+                "title": conversion.title,
+                "author": conversion.author,
+                "markdown": None,
+                "stats": conversion.stats,
+                "error": conversion.error,
+            }
+            if conversion.markdown is not None:
+                entry["markdown"] = _markdown_filename(conversion.title or conversion.filename, used)
+                zf.writestr(entry["markdown"], conversion.markdown)
+            summary.append(entry)
+            yield sink.drain()
+        summary.sort(key=lambda e: e["epub"])
+        zf.writestr("stats.json", json.dumps(summary, indent=2, ensure_ascii=False))
+    yield sink.drain()
@@ -0,0 +1,285 @@
+"""Content-addressed store of uploaded clippings files with a per-book index.
+
+Users upload the same multi-megabyte My Clippings.txt once per book they
+convert. The store keeps each file on disk under its SHA-256 and indexes it
+in one scan into normalized title -> byte ranges of that book's entries, so
+later conversions read only the matching book's entries (through mmap)
+instead of re-parsing the whole file. Files live in a shared directory, so
+every worker process can use an id returned by any other. A file unused for
+CLIPPINGS_STORE_TTL_HOURS is deleted, and clients can delete one sooner.
+
+Configuration (environment):
+    CLIPPINGS_STORE_DIR        directory for stored files (default: <tmp>/kindletomd-clippings)
+    CLIPPINGS_STORE_MB         max total size of stored files (default 512)
+    CLIPPINGS_STORE_TTL_HOURS  hours an unused file is kept (default 24, 0 keeps it until evicted)
+    CLIPPINGS_INDEX_ENTRIES    indexes kept in memory per process (default 32)
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import tempfile
+import time
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from .cache import LRUCache
+from .clippings_parser import (
+    ENTRY_SEPARATOR,
+    Clipping,
+    _entry_lines,
+    _normalize_title,
+    _normalized_titles_match,
+    _parse_entry,
+    _parse_title_line,
+)
+
+# Bump when the index layout or entry parsing changes
+INDEX_FORMAT = 1
+
+_SEPARATOR_BYTES = ENTRY_SEPARATOR.encode("ascii")
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+@dataclass
+class BookEntries:
+    """All highlight/note entries of one book in a clippings file."""
+    title: str
+    author: str
+    highlights: int = 0
+    notes: int = 0
+    # (start, end) byte offsets of each entry, in file order
+    ranges: list[tuple[int, int]] = field(default_factory=list)
+
+
+@dataclass
+class ClippingsIndex:
+    digest: str
+    books: dict[str, BookEntries] = field(default_factory=dict)  # keyed by normalized title
+
+    def ranges_for(self, epub_title: str) -> list[tuple[int, int]]:
+        """Byte ranges of every entry whose book title matches the epub title.
+
+        An empty title matches every book, like parse_clippings without a filter.
+        """
+        norm_epub = _normalize_title(epub_title) if epub_title else None
+        ranges: list[tuple[int, int]] = []
+        for norm_title, book in self.books.items():
+            if norm_epub is None or _normalized_titles_match(norm_title, norm_epub):
+                ranges.extend(book.ranges)
+        ranges.sort()
+        return ranges
+
+
+def _parse_range(data, start: int, end: int) -> Clipping | None:
+    lines = _entry_lines(data[start:end].decode("utf-8", errors="replace"))
+    if len(lines) < 2:
+        return None
+    return _parse_entry(lines, *_parse_title_line(lines[0]))
+
+
+def build_clippings_index(data, digest: str) -> ClippingsIndex:
+    """Index a clippings file (bytes or mmap) in one scan over its entries."""
+    index = ClippingsIndex(digest=digest)
+    start = 0
+    size = len(data)
+    while start <= size:
+        end = data.find(_SEPARATOR_BYTES, start)
+        if end < 0:
+            end = size
+        clipping = _parse_range(data, start, end)
+        if clipping is not None:
+            key = _normalize_title(clipping.book_title)
+            book = index.books.get(key)
+            if book is None:
+                book = index.books[key] = BookEntries(title=clipping.book_title, author=clipping.author)
+            if clipping.clip_type == "note":
+                book.notes += 1
+            else:
+                book.highlights += 1
+            book.ranges.append((start, end))
+        start = end + len(_SEPARATOR_BYTES)
+    return index
+
+
+def read_clippings(data, ranges: list[tuple[int, int]]) -> list[Clipping]:
+    """Parse only the given entries of a clippings file."""
+    clippings: list[Clipping] = []
+    for start, end in ranges:
+        clipping = _parse_range(data, start, end)
+        if clipping is not None:
+            clippings.append(clipping)
+    return clippings
+
+
+class ClippingsStore:
+    def __init__(self, directory: str | os.PathLike, max_bytes: int, index_entries: int, ttl_seconds: float = 0):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.indexes = LRUCache(max_entries=index_entries)
+
+    @classmethod
+    def from_env(cls) -> "ClippingsStore":
+        directory = os.environ.get("CLIPPINGS_STORE_DIR") or os.path.join(
+            tempfile.gettempdir(), "kindletomd-clippings"
+        )
+        return cls(
+            directory,
+            max_bytes=int(os.environ.get("CLIPPINGS_STORE_MB", "512")) * 1024 * 1024,
+            index_entries=int(os.environ.get("CLIPPINGS_INDEX_ENTRIES", "32")),
+            ttl_seconds=float(os.environ.get("CLIPPINGS_STORE_TTL_HOURS", "24")) * 3600,
+        )
+
+    def _path(self, digest: str, suffix: str) -> Path:
+        if not _DIGEST_RE.match(digest):
+            raise KeyError(digest)
+        return self.directory / f"{digest}{suffix}"
+
+    def _expired(self, mtime: float) -> bool:
+        return self.ttl_seconds > 0 and time.time() - mtime > self.ttl_seconds
+
+    def exists(self, digest: str) -> bool:
+        """Whether a file is stored; an expired one is deleted instead."""
+        try:
+            mtime = self._path(digest, ".txt").stat().st_mtime
+        except (KeyError, OSError):
+            return False
+        if self._expired(mtime):
+            self.delete(digest)
+            return False
+        return True
+
+    def delete(self, digest: str) -> bool:
+        """Delete a stored file and its index; False if it was not stored."""
+        try:
+            path = self._path(digest, ".txt")
+        except KeyError:
+            return False
+        self.indexes.discard(digest)
+        path.with_suffix(".json").unlink(missing_ok=True)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put(self, chunks: Iterable[bytes]) -> str:
+        """Store a clippings file streamed in chunks and return its id (SHA-256)."""
+        hasher = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    hasher.update(chunk)
+                    f.write(chunk)
+            digest = hasher.hexdigest()
+            path = self._path(digest, ".txt")
+            if path.exists():
+                os.utime(path)
+                os.unlink(tmp)
+            else:
+                os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self._evict(keep=digest)
+        return digest
+
+    def _evict(self, keep: str) -> None:
+        files = []
+        total = 0
+        for path in self.directory.glob("*.txt"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        files.sort()
+        for mtime, size, path in files:
+            if total <= self.max_bytes and not self._expired(mtime):
+                break
+            if path.stem == keep:
+                continue
+            path.unlink(missing_ok=True)
+            path.with_suffix(".json").unlink(missing_ok=True)
+            total -= size
+
+    def _open(self, digest: str):
+        """Memory-map a stored file (an empty file maps to b"")."""
+        path = self._path(digest, ".txt")
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            raise KeyError(digest)
+        with f:
+            os.utime(path)
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def index(self, digest: str) -> ClippingsIndex:
+        """Return the per-book index of a stored file, building it on first use.
+
+        Raises KeyError if the file is not in the store.
+        """
+        # Checked first: another process may have deleted or expired it
+        if not self.exists(digest):
+            self.indexes.discard(digest)
+            raise KeyError(digest)
+        index = self.indexes.get(digest)
+        if index is not None:
+            return index
+        sidecar = self._path(digest, ".json")
+        try:
+            with open(sidecar, encoding="utf-8") as f:
+                raw = json.load(f)
+            if raw.get("format") != INDEX_FORMAT:
+                raise ValueError("stale index")
+            index = ClippingsIndex(digest=digest, books={
+                key: BookEntries(**{**book, "ranges": [tuple(r) for r in book["ranges"]]})
+                for key, book in raw["books"].items()
+            })
+        except (OSError, ValueError, KeyError, TypeError):
+            data = self._open(digest)
+            try:
+                index = build_clippings_index(data, digest)
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({
+                    "format": INDEX_FORMAT,
+                    "books": {key: asdict(book) for key, book in index.books.items()},
+                }, f)
+            os.replace(tmp, sidecar)
+        self.indexes.put(digest, index)
+        return index
+
+    def clippings_for(self, digest: str, epub_title: str) -> list[Clipping]:
+        """Parse the entries of a stored file that belong to the given book."""
+        ranges = self.index(digest).ranges_for(epub_title)
+        if not ranges:
+            return []
+        data = self._open(digest)
+        try:
+            return read_clippings(data, ranges)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    def books(self, digest: str) -> list[dict]:
+        """Books in a stored file with their highlight and note counts."""
+        return [
+            {"title": book.title, "author": book.author, "highlights": book.highlights, "notes": book.notes}
+            for book in self.index(digest).books.values()
+        ]
+
+
+clippings_store = ClippingsStore.from_env()
@@ -1,4 +1,6 @@
+import codecs
 import re
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
 from datetime import datetime
 
@@ -43,10 +45,7 @@ def _normalize_title(title: str) -> str:
     return " ".join(title.split())
 
 
-def _titles_match(clip_title: str, epub_title: str) -> bool:
-    """Check if a clipping title matches the epub title (fuzzy)."""
-    norm_clip = _normalize_title(clip_title)
-    norm_epub = _normalize_title(epub_title)
+def _normalized_titles_match(norm_clip: str, norm_epub: str) -> bool:
     if not norm_clip or not norm_epub:
         return False
     # Exact normalized match
@@ -58,70 +57,127 @@ def _titles_match(clip_title: str, epub_title: str) -> bool:
     return False
 
 
-def parse_clippings(text: str, filter_title: str | None = None) -> list[Clipping]:
-    """Parse Kindle My Clippings.txt content.
+def _titles_match(clip_title: str, epub_title: str) -> bool:
+    """Check if a clipping title matches the epub title (fuzzy)."""
+    return _normalized_titles_match(_normalize_title(clip_title), _normalize_title(epub_title))
+
+
+def _parse_title_line(title_line: str) -> tuple[str, str]:
+    """Split "Book Title (Author Name)" into title and author."""
+    # Strip BOM if present
+    title_line = title_line.lstrip("\ufeff")
+    title_match = TITLE_RE.match(title_line)
+    if title_match:
+        return title_match.group("title").strip(), title_match.group("author").strip()
+    return title_line.strip(), ""
+
+
+def _parse_entry(lines: list[str], book_title: str, author: str) -> Clipping | None:
+    """Build a Clipping from an entry's stripped, non-blank lines."""
+    # Second line: metadata
+    meta_line = lines[1]
+    meta_match = META_RE.search(meta_line)
+    if not meta_match:
+        return None
+
+    clip_type_raw = meta_match.group("type").lower()
+    clip_type = clip_type_raw  # "highlight", "note", or "bookmark"
+    page = int(meta_match.group("page")) if meta_match.group("page") else None
+    loc_start = int(meta_match.group("loc_start")) if meta_match.group("loc_start") else None
+    loc_end = int(meta_match.group("loc_end")) if meta_match.group("loc_end") else None
+    date_str = meta_match.group("date").strip() if meta_match.group("date") else None
+
+    # Remaining lines: the highlight/note text
+    highlight_text = "\n".join(lines[2:]).strip()
+
+    # Skip bookmarks (no text content) and empty highlights
+    if clip_type == "bookmark" or not highlight_text:
+        return None
+
+    return Clipping(
+        book_title=book_title,
+        author=author,
+        text=highlight_text,
+        clip_type=clip_type,
+        page=page,
+        location_start=loc_start,
+        location_end=loc_end,
+        date=date_str,
+    )
+
+
+def _entry_lines(entry: str) -> list[str]:
+    """Stripped, non-blank lines of one raw entry."""
+    return [line.strip() for line in entry.strip().splitlines() if line.strip()]
+
+
+def _split_entries(chunks: Iterable[bytes | str], encoding: str) -> Iterator[str]:
+    """Yield raw entries from a stream of chunks, decoding incrementally."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    buffer = ""
+    for chunk in chunks:
+        buffer += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        if ENTRY_SEPARATOR not in buffer:
+            continue
+        entries = buffer.split(ENTRY_SEPARATOR)
+        buffer = entries.pop()
+        yield from entries
+    buffer += decoder.decode(b"", final=True)
+    yield from buffer.split(ENTRY_SEPARATOR)
 
-    Args:
-        text: The raw text content of My Clippings.txt
-        filter_title: If provided, only return clippings whose book title matches this.
 
-    Returns:
-        List of parsed Clipping objects.
+def iter_clippings(
+    chunks: Iterable[bytes | str],
+    filter_title: str | None = None,
+    encoding: str = "utf-8",
+) -> Iterator[Clipping]:
+    """Stream clippings out of My Clippings.txt content delivered in chunks.
+
+    Each entry's title line is checked against ``filter_title`` before its
+    metadata is parsed, so entries for other books cost little more than
+    a split. Title lines repeat for every entry of a book, so the result of
+    the check is remembered per distinct line.
+
+    Args:
+        chunks: Pieces of the file, as bytes (decoded with ``encoding``,
+            invalid sequences replaced) or str.
+        filter_title: If provided, only yield clippings whose book title matches this.
     """
-    entries = text.split(ENTRY_SEPARATOR)
-    clippings: list[Clipping] = []
+    norm_filter = _normalize_title(filter_title) if filter_title else None
+    titles: dict[str, tuple[str, str] | None] = {}
 
-    for entry in entries:
-        lines = [line.strip() for line in entry.strip().splitlines() if line.strip()]
+    for entry in _split_entries(chunks, encoding):
+        lines = _entry_lines(entry)
         if len(lines) < 2:
             continue
 
         # First line: "Book Title (Author Name)" or just "Book Title"
         title_line = lines[0]
-        # Strip BOM if present
-        title_line = title_line.lstrip("\ufeff")
-        title_match = TITLE_RE.match(title_line)
-        if title_match:
-            book_title = title_match.group("title").strip()
-            author = title_match.group("author").strip()
+        if title_line in titles:
+            parsed_title = titles[title_line]
         else:
-            book_title = title_line.strip()
-            author = ""
-
-        # Second line: metadata
-        meta_line = lines[1]
-        meta_match = META_RE.search(meta_line)
-        if not meta_match:
+            parsed_title = _parse_title_line(title_line)
+            if norm_filter is not None and not _normalized_titles_match(
+                _normalize_title(parsed_title[0]), norm_filter
+            ):
+                parsed_title = None
+            titles[title_line] = parsed_title
+        if parsed_title is None:
             continue
 
-        clip_type_raw = meta_match.group("type").lower()
-        clip_type = clip_type_raw  # "highlight", "note", or "bookmark"
-        page = int(meta_match.group("page")) if meta_match.group("page") else None
-        loc_start = int(meta_match.group("loc_start")) if meta_match.group("loc_start") else None
-        loc_end = int(meta_match.group("loc_end")) if meta_match.group("loc_end") else None
-        date_str = meta_match.group("date").strip() if meta_match.group("date") else None
+        clipping = _parse_entry(lines, *parsed_title)
+        if clipping is not None:
+            yield clipping
 
-        # Remaining lines: the highlight/note text
-        highlight_text = "\n".join(lines[2:]).strip()
-
-        # Skip bookmarks (no text content) and empty highlights
-        if clip_type == "bookmark" or not highlight_text:
-            continue
 
-        clipping = Clipping(
-            book_title=book_title,
-            author=author,
-            text=highlight_text,
-            clip_type=clip_type,
-            page=page,
-            location_start=loc_start,
-            location_end=loc_end,
-            date=date_str,
-        )
-
-        if filter_title and not _titles_match(book_title, filter_title):
-            continue
+def parse_clippings(text: str, filter_title: str | None = None) -> list[Clipping]:
+    """Parse Kindle My Clippings.txt content.
 
-        clippings.append(clipping)
+    Args:
+        text: The raw text content of My Clippings.txt
+        filter_title: If provided, only return clippings whose book title matches this.
 
-    return clippings
+    Returns:
+        List of parsed Clipping objects.
+    """
+    return list(iter_clippings([text], filter_title))
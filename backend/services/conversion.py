@@ -0,0 +1,139 @@
+"""The CPU-bound part of /api/convert, runnable in a worker process."""
+
+import re
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from .clippings_index import clippings_store
+from .clippings_parser import Clipping
+from .epub_cache import parse_epub_cached
+from .markdown_generator import generate_markdown, merge_markdown
+from .metrics import StageTimer, recording
+from .profiling import run_profiled
+
+
+class ConversionError(Exception):
+    """A conversion failure to report to the client with an HTTP status."""
+
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail, status_code)
+        self.detail = detail
+        self.status_code = status_code
+
+
+@dataclass
+class ConversionRequest:
+    # Spooled upload; see services.uploads
+    epub_path: str
+    epub_digest: str
+    clippings_id: str | None = None
+    notes: str | None = None
+    existing_markdown: str | None = None
+    # Run under cProfile and save the stats here; see services.profiling
+    profile_path: str | None = None
+    # Channel to put progress events on (ConversionPool.open_channel); see services.metrics
+    progress: Any = None
+
+
+def _parse_pasted_notes(text: str) -> list[Clipping]:
+    """Parse pasted bullet points into Clipping objects."""
+    notes: list[Clipping] = []
+    for line in text.splitlines():
+        line = line.strip()
+        # Strip leading bullet markers: -, *, •, numbered (1., 2.)
+        line = re.sub(r"^(?:[-*•]\s*|\d+[.)]\s*)", "", line).strip()
+        if not line:
+            continue
+        notes.append(Clipping(
+            book_title="",
+            author="",
+            text=line,
+            clip_type="note",
+            page=None,
+            location_start=None,
+            location_end=None,
+            date=None,
+        ))
+    return notes
+
+
+def run_conversion(request: ConversionRequest) -> dict:
+    """Parse the epub, gather clippings and notes, and generate or merge markdown.
+
+    Returns the /api/convert response body, plus under "metrics" the
+    StageTimer snapshot of this conversion and the seconds it took in all.
+    Raises ConversionError for invalid input.
+    """
+    started = time.perf_counter()
+    listener = request.progress.put if request.progress is not None else None
+    with recording(StageTimer(listener)) as timer:
+        if request.profile_path:
+            body = run_profiled(request.profile_path, _convert, request, timer)
+        else:
+            body = _convert(request, timer)
+    body["metrics"] = {**timer.snapshot(), "seconds": time.perf_counter() - started}
+    return body
+
+
+def _convert(request: ConversionRequest, timer: StageTimer) -> dict:
+    try:
+        with timer.stage("epub_parse"):
+            book = parse_epub_cached(request.epub_path, request.epub_digest)
+    except Exception as e:
+        raise ConversionError(f"Failed to parse epub file: {e}")
+    timer.count("chapters", len(book.chapters))
+    timer.event("epub_parsed", title=book.title, chapters=len(book.chapters))
+
+    all_clippings: list[Clipping] = []
+    notes: list[Clipping] = []
+
+    with timer.stage("clippings_parse"):
+        # Read this book's entries from the stored clippings file's index
+        if request.clippings_id:
+            try:
+                all_clippings = clippings_store.clippings_for(request.clippings_id, book.title)
+            except KeyError:
+                raise ConversionError(
+                    "Clippings file not found on the server. Please upload it again.",
+                    status_code=404,
+                )
+            except Exception as e:
+                raise ConversionError(f"Failed to parse clippings file: {e}")
+
+        # Parse pasted notes if provided
+        if request.notes and request.notes.strip():
+            notes = _parse_pasted_notes(request.notes)
+
+    if not all_clippings and not notes:
+        raise ConversionError(
+            "No highlights or notes provided. Upload a clippings file or paste some notes."
+        )
+    timer.count("highlights", len(all_clippings) + len(notes))
+    timer.event("clippings_parsed", highlights=len(all_clippings) + len(notes))
+
+    existing_md_text = request.existing_markdown
+    if existing_md_text:
+        timer.count("existing_markdown_bytes", len(existing_md_text.encode("utf-8")))
+        # Notes are passed apart so the merge watermark covers the clippings file only
+        result = merge_markdown(book, all_clippings, existing_md_text, notes=notes)
+    else:
+        result = generate_markdown(book, all_clippings + notes)
+    timer.count("markdown_bytes", len(result.markdown.encode("utf-8")))
+
+    return {
+        "title": result.title,
+        "author": result.author,
+        "chapters": [
+            {
+                "title": ch.title,
+                "level": ch.level,
+                "highlights": ch.highlights,
+            }
+            for ch in result.chapters
+        ],
+        "markdown": result.markdown,
+        "original_markdown": existing_md_text,
+        "stats": result.stats,
+        "clippings_id": request.clippings_id,
+    }
@@ -0,0 +1,310 @@
+"""Bounded process pool for CPU-bound conversions.
+
+Conversions run in worker processes so a large book cannot block the event
+loop. Admission is bounded: at most ``workers + queue_size`` conversions
+are accepted at once and further requests are rejected immediately with
+PoolBusy, so the API can answer 503 with a Retry-After estimate instead of
+queueing without limit. Batch conversions wait for admission instead. Each task can be given a CPU time budget; it counts
+the worker process's own CPU time only, not processes the task starts, so
+workers extract EPUB text in-process rather than in EPUB_EXTRACT_WORKERS
+pools of their own.
+A worker that dies takes the executor down with it; the tasks it held fail
+with WorkerCrashed and the next task starts a fresh executor.
+
+Configuration (environment):
+    CONVERT_WORKERS            worker processes (default: min(4, CPU count); 0 runs in a thread)
+    CONVERT_QUEUE_SIZE         conversions allowed to wait for a worker (default 8)
+    CONVERT_CPU_LIMIT_SECONDS  CPU seconds per conversion (default 60, 0 disables)
+"""
+
+import asyncio
+import itertools
+import math
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from starlette.concurrency import run_in_threadpool
+
+
+class PoolBusy(Exception):
+    """Raised when the admission queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+class ConversionTimeout(Exception):
+    """Raised in a worker when a task exceeds its CPU time limit."""
+
+
+class WorkerCrashed(Exception):
+    """Raised when a worker process died while the pool held the task."""
+
+
+def _on_cpu_limit(signum, frame):
+    raise ConversionTimeout()
+
+
+def _init_worker() -> None:
+    # Nested extraction pools would add processes per worker that neither
+    # admission nor the CPU limit sees
+    from . import epub_parser
+    epub_parser.EXTRACT_WORKERS = 0
+
+
+def _run_task(fn, args: tuple, cpu_limit: float):
+    """Worker-side wrapper: apply the CPU limit and report when the task started."""
+    started = time.time()
+    # ITIMER_PROF counts this process's CPU time; a worker runs one task at a time
+    limited = cpu_limit > 0 and hasattr(signal, "setitimer")
+    if limited:
+        signal.signal(signal.SIGPROF, _on_cpu_limit)
+        signal.setitimer(signal.ITIMER_PROF, cpu_limit)
+    try:
+        return fn(*args), started
+    finally:
+        if limited:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+
+
+class _Channel:
+    """Worker-side end of a progress channel: tags events for the pool's reader thread."""
+
+    def __init__(self, events, key: int):
+        self.events = events
+        self.key = key
+
+    def put(self, event: dict | None) -> None:
+        self.events.put((self.key, event))
+
+
+class _LocalChannel:
+    """Progress channel of a task run in a thread of the server process."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        self.loop = loop
+        self.queue = queue
+
+    def put(self, event: dict | None) -> None:
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+
+
+class ConversionPool:
+    def __init__(self, workers: int, queue_size: int, cpu_limit: float):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.cpu_limit = cpu_limit
+        self._executor: ProcessPoolExecutor | None = None
+        self._manager = None
+        self._in_flight = 0
+        # Callers of run(wait=True) waiting for admission, oldest first
+        self._slot_waiters: deque[asyncio.Future] = deque()
+        # Progress channels: one manager queue for every worker, read by one thread
+        self._events = None
+        self._events_lock = threading.Lock()
+        self._listeners: dict[int, tuple[asyncio.AbstractEventLoop, asyncio.Queue]] = {}
+        self._channel_keys = itertools.count()
+        # Metrics
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._service_seconds_avg = 1.0
+
+    @classmethod
+    def from_env(cls) -> "ConversionPool":
+        default_workers = min(4, os.cpu_count() or 1)
+        return cls(
+            workers=int(os.environ.get("CONVERT_WORKERS", default_workers)),
+            queue_size=int(os.environ.get("CONVERT_QUEUE_SIZE", "8")),
+            cpu_limit=float(os.environ.get("CONVERT_CPU_LIMIT_SECONDS", "60")),
+        )
+
+    @property
+    def capacity(self) -> int:
+        return max(self.workers, 1) + self.queue_size
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._in_flight - max(self.workers, 1))
+
+    def _retry_after(self) -> int:
+        waves = math.ceil((self.queue_depth + 1) / max(self.workers, 1))
+        return max(1, math.ceil(waves * self._service_seconds_avg))
+
+    async def run(self, fn, *args, wait: bool = False):
+        """Run fn(*args) in the pool.
+
+        When admission is full, raises PoolBusy, or with ``wait`` waits for
+        a slot to free up.
+        """
+        while self._in_flight >= self.capacity:
+            if not wait:
+                self.rejected += 1
+                raise PoolBusy(self._retry_after())
+            await self._wait_for_slot()
+
+        self._in_flight += 1
+        held = False
+        submitted = time.time()
+        try:
+            if self.workers > 0:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                    )
+                executor = self._executor
+                try:
+                    future = executor.submit(_run_task, fn, args, self.cpu_limit)
+                    result, started = await asyncio.shield(asyncio.wrap_future(future))
+                except BrokenProcessPool:
+                    self.crashes += 1
+                    # Tasks that shared the dead executor fail too; only the first resets it
+                    if self._executor is executor:
+                        self._executor = None
+                        executor.shutdown(wait=False, cancel_futures=True)
+                    raise WorkerCrashed()
+                except asyncio.CancelledError:
+                    # The caller gave up; a task a worker already took keeps
+                    # its slot until it ends
+                    if not future.cancel():
+                        held = True
+                        loop = asyncio.get_running_loop()
+                        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._release))
+                    raise
+            else:
+                # In-process mode (tests, --reload): a thread, without CPU limits
+                result, started = await run_in_threadpool(_run_task, fn, args, 0)
+        except ConversionTimeout:
+            self.timeouts += 1
+            raise
+        finally:
+            if not held:
+                self._release()
+
+        finished = time.time()
+        wait = max(0.0, started - submitted)
+        self.completed += 1
+        self.wait_seconds_total += wait
+        self.wait_seconds_max = max(self.wait_seconds_max, wait)
+        self._service_seconds_avg = 0.8 * self._service_seconds_avg + 0.2 * (finished - started)
+        return result
+
+    async def _wait_for_slot(self) -> None:
+        slot = asyncio.get_running_loop().create_future()
+        self._slot_waiters.append(slot)
+        try:
+            await slot
+        except asyncio.CancelledError:
+            if slot.done():
+                self._wake_waiter()  # Pass the freed slot on
+            else:
+                self._slot_waiters.remove(slot)
+            raise
+
+    def _wake_waiter(self) -> None:
+        while self._slot_waiters:
+            slot = self._slot_waiters.popleft()
+            if not slot.done():
+                slot.set_result(None)
+                return
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._wake_waiter()
+
+    async def open_channel(self) -> tuple["_Channel | _LocalChannel", asyncio.Queue]:
+        """A channel a task can put progress events on, and the queue they arrive on.
+
+        Events from worker processes all travel through one queue in a
+        manager process, started on first use, and one reader thread hands
+        them to the event loop. Close the channel with close_channel.
+        """
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        if self.workers <= 0:
+            return _LocalChannel(loop, events), events
+        if self._events is None:
+            await run_in_threadpool(self._start_events)
+        key = next(self._channel_keys)
+        self._listeners[key] = (loop, events)
+        return _Channel(self._events, key), events
+
+    async def flush_channel(self, channel: "_Channel | _LocalChannel") -> None:
+        """Put None on the channel's queue, after every event its finished task put."""
+        if isinstance(channel, _Channel):
+            await run_in_threadpool(channel.put, None)
+        else:
+            channel.put(None)
+
+    def close_channel(self, channel: "_Channel | _LocalChannel") -> None:
+        """Stop delivering the channel's events; later ones are dropped."""
+        if isinstance(channel, _Channel):
+            self._listeners.pop(channel.key, None)
+
+    def _start_events(self) -> None:
+        with self._events_lock:
+            if self._events is not None:
+                return
+            self._manager = multiprocessing.get_context("spawn").Manager()
+            events = self._manager.Queue()
+            threading.Thread(
+                target=self._forward_events, args=(events,), name="progress-events", daemon=True
+            ).start()
+            self._events = events
+
+    def _forward_events(self, events) -> None:
+        while True:
+            try:
+                item = events.get()
+            except (EOFError, OSError):
+                return  # The manager shut down
+            if item is None:
+                return
+            key, event = item
+            listener = self._listeners.get(key)
+            if listener is None:
+                continue
+            loop, queue = listener
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                pass  # The loop closed
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "queue_capacity": self.queue_size,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "crashes": self.crashes,
+            "wait_seconds_avg": round(self.wait_seconds_total / self.completed, 4) if self.completed else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 4),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+        if self._manager is not None:
+            self._events.put(None)
+            self._manager.shutdown()
+            self._manager = None
+            self._events = None
+
+
+conversion_pool = ConversionPool.from_env()
@@ -0,0 +1,98 @@
+"""Cache of parsed EPUBs keyed by the SHA-256 of the file.
+
+Parsing (ebooklib + HTML extraction) and building the matching index are
+the expensive parts of a conversion, and users often re-run a conversion
+with the same EPUB. Entries are kept in a bounded in-memory LRU and,
+when EPUB_CACHE_DIR is set, in an on-disk tier that survives restarts
+and is shared by all workers.
+
+Configuration (environment):
+    EPUB_CACHE_ENTRIES    max parsed books kept in memory (default 16, 0 disables)
+    EPUB_CACHE_MEMORY_MB  max total size of the in-memory tier (default 256)
+    EPUB_CACHE_DIR        directory for the on-disk tier (default: disabled)
+    EPUB_CACHE_DISK_MB    max total size of the on-disk tier (default 1024)
+"""
+
+import hashlib
+import os
+import pickle
+from os import PathLike
+
+from .cache import DiskCache, LRUCache
+from .epub_parser import PARSER_VERSION, ParsedBook, parse_epub
+from .markdown_generator import INDEX_VERSION, get_book_index
+
+
+def cache_key(file_bytes: bytes | None = None, digest: str | None = None) -> str:
+    """Content hash plus the parser/index versions that produced the entry.
+
+    Pass ``digest`` (the file's SHA-256 hex digest) when it is already known.
+    """
+    if digest is None:
+        digest = hashlib.sha256(file_bytes).hexdigest()
+    return f"p{PARSER_VERSION}-i{INDEX_VERSION}-{digest}"
+
+
+class ParsedEpubCache:
+    def __init__(self, memory: LRUCache, disk: DiskCache | None = None):
+        self.memory = memory
+        self.disk = disk
+
+    @classmethod
+    def from_env(cls) -> "ParsedEpubCache":
+        memory = LRUCache(
+            max_entries=int(os.environ.get("EPUB_CACHE_ENTRIES", "16")),
+            max_bytes=int(os.environ.get("EPUB_CACHE_MEMORY_MB", "256")) * 1024 * 1024,
+        )
+        disk = None
+        directory = os.environ.get("EPUB_CACHE_DIR")
+        if directory:
+            disk = DiskCache(directory, int(os.environ.get("EPUB_CACHE_DISK_MB", "1024")) * 1024 * 1024)
+        return cls(memory, disk)
+
+    def parse(self, source: bytes | str | PathLike, digest: str | None = None) -> ParsedBook:
+        """Return the parsed book (with its matching index built), parsing on a miss.
+
+        ``source`` is the EPUB's bytes or a path to it; for a path the
+        file's SHA-256 ``digest`` is required.
+        """
+        if digest is None and not isinstance(source, (bytes, bytearray)):
+            raise TypeError("digest is required when parsing from a path")
+        key = cache_key(source, digest)
+        book = self.memory.get(key)
+        if book is not None:
+            return book
+
+        if self.disk is not None:
+            entry = self.disk.get_sized(key)
+            if entry is not None:
+                # Sized by the pickle just read, as on a miss
+                book, size = entry
+                self.memory.put(key, book, size)
+                return book
+
+        book = parse_epub(source)
+        get_book_index(book).term_postings()
+        data = pickle.dumps(book, pickle.HIGHEST_PROTOCOL)
+        self.memory.put(key, book, len(data))
+        if self.disk is not None:
+            self.disk.put_bytes(key, data)
+        return book
+
+    def stats(self) -> dict:
+        stats = {"memory": self.memory.stats()}
+        if self.disk is not None:
+            stats["disk"] = self.disk.stats()
+        return stats
+
+
+_cache = ParsedEpubCache.from_env()
+
+
+def parse_epub_cached(source: bytes | str | PathLike, digest: str | None = None) -> ParsedBook:
+    """parse_epub through the process-wide cache."""
+    return _cache.parse(source, digest)
+
+
+def epub_cache_stats() -> dict:
+    return _cache.stats()
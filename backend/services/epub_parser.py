@@ -1,8 +1,37 @@
+import codecs
+import logging
+import multiprocessing
+import os
+import posixpath
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import unquote
+
 import ebooklib
 from ebooklib import epub
-from bs4 import BeautifulSoup
+from ebooklib.utils import parse_string
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+from bs4.dammit import EncodingDetector
+from lxml import etree
 from dataclasses import dataclass, field
 from io import BytesIO
+from os import PathLike
+from typing import TYPE_CHECKING, BinaryIO
+
+if TYPE_CHECKING:
+    from .markdown_generator import BookIndex
+
+logger = logging.getLogger(__name__)
+
+# Bump when parse_epub output changes so cached parses are invalidated
+PARSER_VERSION = 2
+
+# Worker processes for document text extraction; 0 or 1 extracts in-process.
+# Processes rather than threads: the extractor's parser callbacks hold the GIL.
+# Conversion pool workers set this to 0; see services.conversion_pool.
+EXTRACT_WORKERS = int(os.environ.get("EPUB_EXTRACT_WORKERS", "0"))
+# Books with fewer documents than this are extracted in-process regardless
+PARALLEL_MIN_DOCUMENTS = 16
 
 
 @dataclass
@@ -19,10 +48,209 @@ class ParsedBook:
     title: str
     author: str
     chapters: list[Chapter] = field(default_factory=list)
+    # Normalized matching index, built lazily by markdown_generator.get_book_index
+    search_index: "BookIndex | None" = field(default=None, repr=False, compare=False)
+
+
+# BeautifulSoup's get_text() leaves out strings inside these elements:
+# script and style are decomposed, the others hold non-text string types
+_DECOMPOSED_TAGS = frozenset({"script", "style"})
+_SKIPPED_TEXT_TAGS = _DECOMPOSED_TAGS | {"template", "rt", "rp"}
+# The no-TOC fallback titles a chapter after its first of these
+_HEADING_TAGS = frozenset({"h1", "h2", "h3"})
+
+
+def _join_words(strings: list[str]) -> str:
+    # Joining with spaces keeps each string's words apart, as get_text(" ") does
+    return " ".join(" ".join(strings).split())
 
 
 def _extract_text(html_content: bytes | str) -> str:
     """Extract clean text from HTML content."""
+    return _join_words(_document_strings(html_content)[0])
+
+
+def _extract_sections(html_content: bytes | str, anchors: frozenset[str]) -> tuple[list[str], dict[str, int]]:
+    """Extract a document's text split at the elements whose id is in ``anchors``.
+
+    Returns the section texts and a map from each anchor found to the
+    index of the section it starts; section 0 is the text before the
+    first anchor. Joined with spaces the sections give _extract_text.
+    """
+    sections, found, _ = _extract_parts(html_content, anchors)
+    return sections, found
+
+
+def _extract_parts(
+    html_content: bytes | str, anchors: frozenset[str]
+) -> tuple[list[str], dict[str, int], str | None]:
+    """_extract_sections plus the text of the first h1-h3 (None without one)."""
+    strings, marks, heading = _document_strings(html_content, anchors)
+    sections: list[str] = []
+    found: dict[str, int] = {}
+    start = 0
+    for anchor, position in marks:
+        sections.append(_join_words(strings[start:position]))
+        found[anchor] = len(sections)
+        start = position
+    sections.append(_join_words(strings[start:]))
+    return sections, found, heading
+
+
+def _document_strings(
+    html_content: bytes | str, anchors: frozenset[str] = frozenset()
+) -> tuple[list[str], list[tuple[str, int]], str | None]:
+    """The strings get_text() would join, where each anchor element starts, and the first heading.
+
+    The heading text is what get_text(strip=True) returns for the first
+    h1-h3 element.
+    """
+    if isinstance(html_content, bytes):
+        try:
+            result = _strings_lxml(html_content, anchors)
+        except Exception:
+            result = None
+        if result is not None:
+            return result
+    return _strings_bs4(html_content, anchors)
+
+
+def _anchor_of(tag: str, attrib, anchors: frozenset[str]) -> str | None:
+    anchor = attrib.get("id")
+    if anchor is None and tag == "a":
+        anchor = attrib.get("name")
+    return anchor if anchor in anchors else None
+
+
+class _TextTarget:
+    """lxml parser target collecting the strings BeautifulSoup's get_text() returns.
+
+    Follows how BeautifulSoup builds its tree from the same parser events:
+    consecutive data events make one string, any other event ends it, and
+    an end tag closes back to the nearest open tag of that name.
+    """
+
+    def __init__(self, anchors: frozenset[str] = frozenset()) -> None:
+        self._strings: list[str] = []
+        self._marks: list[tuple[str, int]] = []
+        self._anchors = anchors
+        self._data: list[str] = []
+        self._stack: list[str] = []
+        self._open: dict[str, int] = {}
+        self._skipping = 0
+        self._decomposed = 0
+        # Strings of the first heading, and the stack depth it was opened at
+        self._heading: list[str] | None = None
+        self._heading_depth = -1
+
+    def _end_string(self) -> None:
+        if self._data:
+            if not self._skipping:
+                string = "".join(self._data)
+                self._strings.append(string)
+                if self._heading_depth >= 0:
+                    self._heading.append(string)
+            self._data = []
+
+    def start(self, tag, attrib, nsmap=None) -> None:
+        self._end_string()
+        if self._heading is None and tag in _HEADING_TAGS:
+            self._heading = []
+            self._heading_depth = len(self._stack)
+        self._stack.append(tag)
+        self._open[tag] = self._open.get(tag, 0) + 1
+        if tag in _SKIPPED_TEXT_TAGS:
+            self._skipping += 1
+            if tag in _DECOMPOSED_TAGS:
+                self._decomposed += 1
+        if self._anchors and not self._decomposed:
+            anchor = _anchor_of(tag, attrib, self._anchors)
+            if anchor is not None:
+                self._marks.append((anchor, len(self._strings)))
+                self._anchors = self._anchors - {anchor}
+
+    def end(self, tag) -> None:
+        self._end_string()
+        if not self._open.get(tag):
+            return
+        while self._stack:
+            closed = self._stack.pop()
+            self._open[closed] -= 1
+            if closed in _SKIPPED_TEXT_TAGS:
+                self._skipping -= 1
+                if closed in _DECOMPOSED_TAGS:
+                    self._decomposed -= 1
+            if len(self._stack) == self._heading_depth:
+                self._heading_depth = -1
+            if closed == tag:
+                break
+
+    def data(self, data) -> None:
+        self._data.append(data)
+
+    def comment(self, text) -> None:
+        self._end_string()
+
+    def pi(self, target, data=None) -> None:
+        self._end_string()
+
+    def doctype(self, *args) -> None:
+        self._end_string()
+
+    def close(self) -> tuple[list[str], list[tuple[str, int]], str | None]:
+        self._end_string()
+        heading = None
+        if self._heading is not None:
+            heading = "".join(stripped for string in self._heading if (stripped := string.strip()))
+        return self._strings, self._marks, heading
+
+
+def _strings_lxml(html_content: bytes, anchors: frozenset[str]):
+    """_document_strings straight from lxml parser events, without building a tree.
+
+    Returns None for documents whose decoding BeautifulSoup might do
+    differently (anything not declared and valid as UTF-8).
+    """
+    declared = EncodingDetector.find_declared_encoding(html_content, is_html=True)
+    if declared not in ("utf-8", "utf8"):
+        return None
+    if html_content.startswith(codecs.BOM_UTF8):
+        html_content = html_content[len(codecs.BOM_UTF8):]
+    html_content.decode("utf-8")
+
+    parser = etree.HTMLParser(target=_TextTarget(anchors), recover=True, encoding="utf-8")
+    parser.feed(html_content)
+    return parser.close()
+
+
+def _strings_bs4(html_content: bytes | str, anchors: frozenset[str]):
+    """Reference implementation, used for documents the lxml path does not take."""
+    soup = BeautifulSoup(html_content, "lxml")
+    for tag in soup(list(_DECOMPOSED_TAGS)):
+        tag.decompose()
+    heading = soup.find(list(_HEADING_TAGS))
+    strings: list[str] = []
+    marks: list[tuple[str, int]] = []
+    for node in soup.descendants:
+        if isinstance(node, Tag):
+            anchor = _anchor_of(node.name, node.attrs, anchors) if anchors else None
+            if anchor is not None:
+                marks.append((anchor, len(strings)))
+                anchors = anchors - {anchor}
+        elif type(node) in (NavigableString, CData):
+            # The string types get_text() includes
+            strings.append(node)
+    return strings, marks, heading.get_text(strip=True) if heading is not None else None
+
+
+def _extract_text_lxml(html_content: bytes) -> str | None:
+    """_extract_text through lxml only; None where it defers to BeautifulSoup."""
+    result = _strings_lxml(html_content, frozenset())
+    return None if result is None else _join_words(result[0])
+
+
+def _extract_text_bs4(html_content: bytes | str) -> str:
+    """Reference extractor, used for documents the lxml path does not take."""
     soup = BeautifulSoup(html_content, "lxml")
     for tag in soup(["script", "style"]):
         tag.decompose()
@@ -31,25 +259,170 @@ def _extract_text(html_content: bytes | str) -> str:
     return " ".join(text.split())
 
 
-def _get_item_text(book: epub.EpubBook, href: str) -> str:
-    """Get text content for an item by href."""
-    # Strip any fragment identifier
-    base_href = href.split("#")[0]
-    for item in book.get_items_of_type(ebooklib.ITEM_DOCUMENT):
-        item_href = item.get_name()
-        if item_href == base_href or item_href.endswith("/" + base_href):
-            return _extract_text(item.get_content())
-    return ""
+def _render_html(raw: bytes) -> bytes:
+    """A document's content as ebooklib's EpubHtml.get_content() returns it."""
+    html = epub.EpubHtml(content=raw)
+    html.book = epub.EpubBook()
+    return html.get_content()
+
+
+def _document_source(item) -> tuple[bytes, bool]:
+    """Content to extract an item's text from, and whether it still needs _render_html.
 
+    Rendering is left to the extracting process, where it runs in parallel.
+    """
+    if isinstance(item, _HtmlItem):
+        return item.read_raw(), True
+    if type(item) in (epub.EpubHtml, epub.EpubNav):
+        return item.content, True
+    return item.get_content(), False
 
-def _walk_toc(toc_items, book: epub.EpubBook, chapters: list[Chapter], level: int, order_counter: list[int]):
+
+def _extract_document(content: bytes, render: bool, anchors: frozenset[str]):
+    if render:
+        content = _render_html(content)
+    return _extract_parts(content, anchors)
+
+
+_executors: dict[int, ProcessPoolExecutor] = {}
+
+
+def _extract_executor(workers: int) -> ProcessPoolExecutor:
+    if workers not in _executors:
+        _executors[workers] = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executors[workers]
+
+
+class _Documents:
+    """Document items by href, each parsed once and split at the TOC's anchors.
+
+    Hrefs resolve like the old per-entry scan did: to the first document
+    whose name is the href or ends with "/" + href.
+    """
+
+    def __init__(self, book: "epub.EpubBook | _LazyEpub", hrefs: list[str]):
+        self._hrefs = hrefs
+        self._items = {}
+        for item in book.get_items_of_type(ebooklib.ITEM_DOCUMENT):
+            name = item.get_name()
+            self._items.setdefault(name, item)
+            for i, char in enumerate(name):
+                if char == "/":
+                    self._items.setdefault(name[i + 1:], item)
+
+        # Anchors the TOC points at in each document, and documents it
+        # also points at without a fragment
+        self._anchors: dict[str, set[str]] = {}
+        self._whole: set[str] = set()
+        for href in hrefs:
+            base, _, fragment = href.partition("#")
+            item = self._items.get(base)
+            if item is None:
+                continue
+            if fragment:
+                self._anchors.setdefault(item.get_name(), set()).add(fragment)
+            else:
+                self._whole.add(item.get_name())
+        self._sections: dict[str, tuple[list[str], dict[str, int], str | None]] = {}
+
+    def referenced_items(self) -> list:
+        """Document items the TOC points at, in TOC order."""
+        items = []
+        seen: set[str] = set()
+        for href in self._hrefs:
+            item = self._items.get(href.partition("#")[0])
+            if item is not None and item.get_name() not in seen:
+                seen.add(item.get_name())
+                items.append(item)
+        return items
+
+    def prefetch(self, items: list, workers: int) -> None:
+        """Extract the given documents, in parallel when there are enough of them."""
+        jobs = []
+        for item in items:
+            name = item.get_name()
+            if name in self._sections:
+                continue
+            content, render = _document_source(item)
+            jobs.append((name, content, render, frozenset(self._anchors.get(name, ()))))
+        if workers > 1 and len(jobs) >= PARALLEL_MIN_DOCUMENTS:
+            pool = _extract_executor(workers)
+            chunksize = max(1, len(jobs) // (workers * 4))
+            results = pool.map(
+                _extract_document,
+                [job[1] for job in jobs],
+                [job[2] for job in jobs],
+                [job[3] for job in jobs],
+                chunksize=chunksize,
+            )
+        else:
+            results = (_extract_document(content, render, anchors) for _, content, render, anchors in jobs)
+        # map() yields in submission order, so results line up with jobs
+        for (name, *_), result in zip(jobs, results):
+            self._sections[name] = result
+
+    def _extracted(self, item) -> tuple[list[str], dict[str, int], str | None]:
+        name = item.get_name()
+        if name not in self._sections:
+            self.prefetch([item], workers=0)
+        return self._sections[name]
+
+    def whole_text(self, item) -> str:
+        """Text of a whole document item."""
+        sections = self._extracted(item)[0]
+        return " ".join(section for section in sections if section)
+
+    def heading(self, item) -> str | None:
+        """Text of a document item's first h1-h3 element, None if it has none."""
+        return self._extracted(item)[2]
+
+    def text(self, href: str) -> str:
+        """Text of the section of the document that href points at."""
+        base, _, fragment = href.partition("#")
+        item = self._items.get(base)
+        if item is None:
+            return ""
+        name = item.get_name()
+        sections, found, _ = self._extracted(item)
+        if not found:
+            return sections[0]
+        if fragment and fragment in found:
+            index = found[fragment]
+            # Text before the first anchor goes with the first anchor's
+            # section unless the TOC also has an entry for the whole file
+            if index == 1 and name not in self._whole and sections[0]:
+                return f"{sections[0]} {sections[1]}".strip()
+            return sections[index]
+        if not fragment:
+            return sections[0]
+        # An anchor the document does not have: the whole document, as before
+        return " ".join(section for section in sections if section)
+
+
+def _toc_hrefs(toc_items) -> list[str]:
+    hrefs: list[str] = []
+    for item in toc_items:
+        if isinstance(item, tuple):
+            section, children = item
+            if getattr(section, "href", ""):
+                hrefs.append(section.href)
+            hrefs.extend(_toc_hrefs(children))
+        elif isinstance(item, epub.Link):
+            hrefs.append(item.href)
+    return hrefs
+
+
+def _walk_toc(toc_items, documents: _Documents, chapters: list[Chapter], level: int, order_counter: list[int]):
     """Recursively walk the TOC tree."""
     for item in toc_items:
         if isinstance(item, tuple):
             # Nested section: (Section, [children])
             section, children = item
             href = section.href if hasattr(section, "href") else ""
-            text = _get_item_text(book, href) if href else ""
+            text = documents.text(href) if href else ""
             chapters.append(Chapter(
                 title=section.title,
                 level=level,
@@ -58,10 +431,10 @@ def _walk_toc(toc_items, book: epub.EpubBook, chapters: list[Chapter], level: in
                 href=href,
             ))
             order_counter[0] += 1
-            _walk_toc(children, book, chapters, level + 1, order_counter)
+            _walk_toc(children, documents, chapters, level + 1, order_counter)
         elif isinstance(item, epub.Link):
             href = item.href
-            text = _get_item_text(book, href)
+            text = documents.text(href)
             chapters.append(Chapter(
                 title=item.title,
                 level=level,
@@ -72,10 +445,236 @@ def _walk_toc(toc_items, book: epub.EpubBook, chapters: list[Chapter], level: in
             order_counter[0] += 1
 
 
-def parse_epub(file_bytes: bytes) -> ParsedBook:
-    """Parse an epub file from bytes and return structured book data."""
-    book = epub.read_epub(BytesIO(file_bytes), options={"ignore_ncx": False})
+OPF_NS = epub.NAMESPACES["OPF"]
+DC_NS = epub.NAMESPACES["DC"]
+
+
+class _LazyItem:
+    """A manifest entry whose content is decompressed only when asked for."""
+
+    def __init__(self, reader: "_LazyEpub", uid: str, file_name: str, path: str, item_type: int):
+        self._reader = reader
+        self.id = uid
+        self.file_name = file_name
+        self._path = path
+        self._type = item_type
+
+    def get_name(self) -> str:
+        return self.file_name
+
+    def get_type(self) -> int:
+        return self._type
+
+    def get_content(self) -> bytes:
+        return self.read_raw()
+
+    def read_raw(self) -> bytes:
+        return self._reader.read(self._path)
+
+
+class _HtmlItem(_LazyItem):
+    """An XHTML document, returned the way ebooklib's EpubHtml re-renders it.
+
+    ebooklib drops the document's head and re-serializes the body
+    elements into its chapter template; the extracted text depends on
+    that, so the same rendering is used here.
+    """
+
+    def get_content(self) -> bytes:
+        return _render_html(self.read_raw())
+
+
+class _CoverHtmlItem(_LazyItem):
+    """ebooklib replaces an XHTML cover page with its own cover template."""
+
+    def get_content(self) -> bytes:
+        cover = epub.EpubCoverHtml()
+        cover.book = epub.EpubBook()
+        return cover.get_content()
+
+
+class _LazyEpub:
+    """Read just what parse_epub needs from an EPUB zip.
+
+    Mirrors the parts of ebooklib's EpubBook that parse_epub uses
+    (metadata, toc, spine and document items) with ebooklib's semantics,
+    but reads the container, OPF and NCX/nav up front and leaves every
+    other entry compressed until get_content() is called. Images, fonts
+    and audio are never read.
+    """
+
+    def __init__(self, zf: zipfile.ZipFile):
+        self._zf = zf
+        self._names = set(zf.namelist())
+        self.items: list[_LazyItem] = []
+        self.spine: list[tuple[str | None, str]] = []
+        self.toc = []
+        self._metadata: dict[str, list[tuple[str | None, dict]]] = {}
+        self._ids = {"html": 0, "image": 0, "static": 0}
 
+        container = parse_string(self.read("META-INF/container.xml"))
+        opf_file = ""
+        for root_file in container.findall(
+            ".//xmlns:rootfile[@media-type]", namespaces={"xmlns": epub.NAMESPACES["CONTAINERNS"]}
+        ):
+            if root_file.get("media-type") == "application/oebps-package+xml":
+                opf_file = root_file.get("full-path")
+        self._opf_dir = posixpath.dirname(opf_file)
+
+        opf = parse_string(self.read(opf_file))
+        metadata, manifest, spine = (opf.find(f"{{{OPF_NS}}}{tag}") for tag in ("metadata", "manifest", "spine"))
+        if metadata is None or manifest is None or spine is None:
+            raise ValueError(f"{opf_file!r} lacks a metadata, manifest or spine element")
+        self._load_metadata(metadata)
+        nav_item = self._load_manifest(manifest)
+        self._load_toc(spine, nav_item)
+
+    def read(self, name: str) -> bytes:
+        return self._zf.read(posixpath.normpath(name))
+
+    def _path(self, href: str) -> str:
+        path = posixpath.normpath(posixpath.join(self._opf_dir, href))
+        if path not in self._names:
+            # ebooklib reads every manifest entry and fails on missing ones
+            raise KeyError(f"There is no item named {path!r} in the archive")
+        return path
+
+    def _load_metadata(self, metadata) -> None:
+        for t in metadata:
+            if not isinstance(t.tag, str):
+                continue
+            ns, _, tag = t.tag[1:].partition("}") if t.tag.startswith("{") else ("", "", t.tag)
+            if ns == DC_NS:
+                self._metadata.setdefault(tag, []).append((t.text, dict(t.items())))
+
+    def _add(self, item: _LazyItem, kind: str) -> None:
+        if not item.id:
+            prefix = {"html": "chapter", "image": "image", "static": "static"}[kind]
+            item.id = f"{prefix}_{self._ids[kind]}"
+            self._ids[kind] += 1
+        self.items.append(item)
+
+    def _load_manifest(self, manifest) -> _LazyItem | None:
+        nav_item = None
+        for r in manifest:
+            if r.tag != f"{{{OPF_NS}}}item":
+                continue
+            uid, href = r.get("id"), r.get("href")
+            media_type = r.get("media-type")
+            properties = (r.get("properties") or "").split()
+            file_name = unquote(href)
+
+            if media_type == "application/xhtml+xml":
+                if "nav" in properties:
+                    item = _HtmlItem(self, uid, file_name, self._path(href), ebooklib.ITEM_DOCUMENT)
+                    nav_item = nav_item or item
+                elif "cover" in properties:
+                    self._path(file_name)
+                    item = _CoverHtmlItem(self, "cover", "cover.xhtml", "", ebooklib.ITEM_DOCUMENT)
+                else:
+                    item = _HtmlItem(self, uid, file_name, self._path(file_name), ebooklib.ITEM_DOCUMENT)
+                self._add(item, "html")
+                continue
+
+            if media_type == "application/smil+xml":
+                item_type, kind = ebooklib.ITEM_SMIL, "static"
+            elif media_type in epub.IMAGE_MEDIA_TYPES:
+                if "cover-image" in properties:
+                    item_type, kind = ebooklib.ITEM_COVER, "static"
+                else:
+                    item_type, kind = ebooklib.ITEM_IMAGE, "image"
+            else:
+                item_type, kind = self._type_from_extension(file_name), "static"
+            self._add(_LazyItem(self, uid, file_name, self._path(file_name), item_type), kind)
+        return nav_item
+
+    @staticmethod
+    def _type_from_extension(file_name: str) -> int:
+        ext = posixpath.splitext(file_name)[1].lower()
+        for item_type, extensions in ebooklib.EXTENSIONS.items():
+            if ext in extensions:
+                return item_type
+        return ebooklib.ITEM_UNKNOWN
+
+    def _load_toc(self, spine, nav_item: _LazyItem | None) -> None:
+        self.spine = [(t.get("idref"), t.get("linear", "yes")) for t in spine]
+
+        # Same precedence as read_epub(options={"ignore_ncx": False}):
+        # the NCX named by the spine, then the nav document if that gave no TOC.
+        # _parse_ncx and _parse_nav are private; requirements.txt pins the
+        # ebooklib versions that have them.
+        toc_reader = epub.EpubReader("", options={"ignore_ncx": False})
+        toc_id = spine.get("toc", "")
+        if toc_id:
+            ncx = self.get_item_with_id(toc_id)
+            if ncx is None:
+                raise ValueError(f"The spine's toc {toc_id!r} is not in the manifest")
+            toc_reader._parse_ncx(self.read(posixpath.join(self._opf_dir, ncx.get_name())))
+        if nav_item is not None and not toc_reader.book.toc:
+            toc_reader._parse_nav(nav_item.read_raw(), posixpath.dirname(nav_item.file_name), navtype="toc")
+        self.toc = toc_reader.book.toc
+
+    def get_metadata(self, namespace: str, name: str) -> list[tuple[str | None, dict]]:
+        # parse_epub only asks for Dublin Core fields
+        return self._metadata.get(name, []) if namespace == "DC" else []
+
+    def get_item_with_id(self, uid: str) -> _LazyItem | None:
+        for item in self.items:
+            if item.id == uid:
+                return item
+        return None
+
+    def get_items_of_type(self, item_type: int):
+        return (item for item in self.items if item.get_type() == item_type)
+
+
+def parse_epub(source: bytes | str | PathLike | BinaryIO, workers: int | None = None) -> ParsedBook:
+    """Parse an epub file and return structured book data.
+
+    ``source`` is the file's bytes, a path, or a seekable binary file
+    object; paths and files are read as a zip without loading them whole.
+    Text documents are decompressed on demand by a lightweight reader;
+    EPUBs it cannot handle are parsed again with ebooklib. ``workers``
+    (default EPUB_EXTRACT_WORKERS) extract document text in parallel.
+    """
+    if workers is None:
+        workers = EXTRACT_WORKERS
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = BytesIO(source)
+    try:
+        with zipfile.ZipFile(source) as zf:
+            return _parse_book(_LazyEpub(zf), workers)
+    except (zipfile.BadZipFile, KeyError, ValueError, etree.LxmlError) as e:
+        # Only what a malformed EPUB raises; anything else is a bug to surface
+        logger.warning("Lazy EPUB reader failed (%s: %s); parsing with ebooklib", type(e).__name__, e)
+        if hasattr(source, "seek"):
+            source.seek(0)
+    book = epub.read_epub(source, options={"ignore_ncx": False})
+    return _parse_book(book, workers)
+
+
+def _spine_merges(book: "epub.EpubBook | _LazyEpub", toc_hrefs: set[str]) -> list[tuple[str, object]]:
+    """Spine items no TOC entry covers, each with the TOC href of the item before it.
+
+    Many EPUBs split content across multiple XHTML files but only reference
+    some of them from the TOC (e.g. supplementary "-sup" files). Their text
+    is merged into the preceding chapter; without this, highlights in those
+    files can never match.
+    """
+    merges = []
+    last_href: str | None = None
+    for item_id, _ in book.spine:
+        item = book.get_item_with_id(item_id)
+        if item is None:
+            continue
+        if item.get_name() in toc_hrefs:
+            last_href = item.get_name()
+        elif last_href is not None:
+            merges.append((last_href, item))
+    return merges
+
+
+def _parse_book(book: "epub.EpubBook | _LazyEpub", workers: int = 0) -> ParsedBook:
     title = book.get_metadata("DC", "title")
     title = title[0][0] if title else "Unknown Title"
 
@@ -84,53 +683,43 @@ def parse_epub(file_bytes: bytes) -> ParsedBook:
 
     chapters: list[Chapter] = []
     toc = book.toc
+    if isinstance(toc, epub.Link):
+        # ebooklib's reading of an NCX whose navMap is empty
+        toc = []
 
+    documents = _Documents(book, _toc_hrefs(toc) if toc else [])
     if toc:
-        _walk_toc(toc, book, chapters, 1, [0])
-
-    # Merge text from spine items not covered by any TOC entry into the
-    # preceding chapter.  Many EPUBs split content across multiple XHTML
-    # files but only reference some of them from the TOC (e.g. supplementary
-    # "-sup" files).  Without this, highlights in those files can never match.
-    if chapters:
-        toc_hrefs: set[str] = set()
-        for ch in chapters:
-            if ch.href:
-                toc_hrefs.add(ch.href.split("#")[0])
-
-        # Build href -> chapter mapping for quick lookup
-        href_to_chapter: dict[str, Chapter] = {}
-        for ch in chapters:
-            if ch.href:
-                href_to_chapter[ch.href.split("#")[0]] = ch
-
-        # Walk spine in order; for un-referenced items, append text to the
-        # most recent preceding chapter.
-        last_chapter: Chapter | None = None
-        for item_id, _ in book.spine:
-            item = book.get_item_with_id(item_id)
-            if item is None:
-                continue
-            item_href = item.get_name()
-            if item_href in href_to_chapter:
-                last_chapter = href_to_chapter[item_href]
-            elif item_href not in toc_hrefs and last_chapter is not None:
-                extra_text = _extract_text(item.get_content())
-                if extra_text.strip():
-                    last_chapter.text = last_chapter.text + " " + extra_text
-
-    # If TOC produced no chapters, fall back to spine order
+        toc_hrefs = {href.split("#")[0] for href in _toc_hrefs(toc) if href}
+        merges = _spine_merges(book, toc_hrefs)
+        # Extract everything the TOC walk and the spine merge need up front,
+        # so that it can run in parallel
+        documents.prefetch(documents.referenced_items() + [item for _, item in merges], workers)
+        _walk_toc(toc, documents, chapters, 1, [0])
+
+        # Merged text goes to the last chapter for the preceding href,
+        # joined once per chapter
+        href_to_chapter = {ch.href.split("#")[0]: ch for ch in chapters if ch.href}
+        extra: dict[str, list[str]] = {}
+        for href, item in merges:
+            extra_text = documents.whole_text(item)
+            if extra_text.strip():
+                extra.setdefault(href, []).append(extra_text)
+        for href, texts in extra.items():
+            chapter = href_to_chapter[href]
+            chapter.text = " ".join([chapter.text, *texts])
+
+    # If TOC produced no chapters, fall back to document order
     if not chapters:
-        for i, item in enumerate(book.get_items_of_type(ebooklib.ITEM_DOCUMENT)):
-            text = _extract_text(item.get_content())
+        items = list(book.get_items_of_type(ebooklib.ITEM_DOCUMENT))
+        documents.prefetch(items, workers)
+        for i, item in enumerate(items):
+            text = documents.whole_text(item)
             if not text.strip():
                 continue
-            # Try to get a title from the HTML
-            soup = BeautifulSoup(item.get_content(), "lxml")
-            heading = soup.find(["h1", "h2", "h3"])
-            ch_title = heading.get_text(strip=True) if heading else f"Chapter {i + 1}"
+            # Title the chapter after its first heading
+            heading = documents.heading(item)
             chapters.append(Chapter(
-                title=ch_title,
+                title=heading if heading is not None else f"Chapter {i + 1}",
                 level=1,
                 order=i,
                 text=text,
@@ -1,10 +1,18 @@
+import hashlib
 import re
-import unicodedata
+from bisect import bisect_right
 from dataclasses import dataclass, field
 
+try:
+    import ahocorasick
+except ImportError:  # optional C speedup; fall back to the pure-Python automaton
+    ahocorasick = None
+
 from .epub_parser import Chapter, ParsedBook
 from .clippings_parser import Clipping
 from .markdown_parser import ParsedHighlight, RawBlock, parse_existing_markdown
+from .metrics import count, event, progress, timed
+from .normalize import normalize_for_search
 
 
 @dataclass
@@ -34,31 +42,8 @@ class GenerationResult:
     preamble: list[str] = field(default_factory=list)
 
 
-def _normalize_for_search(text: str) -> str:
-    """Normalize text for fuzzy substring matching."""
-    # Unicode-normalize to decompose fancy characters (e.g. ligatures, accents)
-    text = unicodedata.normalize("NFKC", text)
-    # Strip zero-width and other invisible Unicode characters
-    text = re.sub(r"[\u200b-\u200f\u2028-\u202f\u2060\ufeff]", "", text)
-    # Collapse whitespace
-    text = " ".join(text.split())
-    # Lowercase
-    text = text.lower()
-    # Normalize ALL common quote variants to ASCII
-    text = text.replace("\u2018", "'").replace("\u2019", "'")   # curly single
-    text = text.replace("\u201c", '"').replace("\u201d", '"')   # curly double
-    text = text.replace("\u201a", "'").replace("\u201e", '"')   # low-9 quotes
-    text = text.replace("\u2039", "'").replace("\u203a", "'")   # angle single
-    text = text.replace("\u00ab", '"').replace("\u00bb", '"')   # guillemets
-    text = text.replace("\u02bc", "'")                          # modifier apostrophe
-    # Normalize ALL dash variants to ASCII hyphen
-    text = text.replace("\u2014", "-").replace("\u2013", "-")   # em/en dash
-    text = text.replace("\u2012", "-").replace("\u2015", "-")   # figure/horizontal
-    text = text.replace("\u00ad", "")                           # soft hyphen
-    # Remove non-alphanumeric except spaces (keep apostrophes)
-    text = re.sub(r"[^\w\s']", " ", text)
-    return " ".join(text.split())
-
+# Bump when normalization or the BookIndex layout changes (invalidates cached indexes)
+INDEX_VERSION = 1
 
 STOP_WORDS = frozenset({
     "a", "an", "the", "and", "or", "but", "in", "on", "at", "to", "for",
@@ -74,17 +59,122 @@ STOP_WORDS = frozenset({
 })
 
 
-def _match_score(highlight_text: str, chapter_text: str) -> int:
-    """Score how well a highlight matches a chapter.
+@dataclass
+class ChapterCorpus:
+    """Normalized search text for a single chapter."""
+    chapter: Chapter
+    text: str
+    tokens: list[str]
+    words: frozenset[str]
 
-    Returns:
-        3 = direct substring match (best)
-        2 = first+last N words found (good, handles truncation)
-        1 = high word overlap (fallback for subtle char differences)
-        0 = no match
+
+@dataclass
+class BookIndex:
+    """Per-book matching index, built once and reused for every clipping.
+
+    All normalized chapter texts are joined into one ``buffer`` (separated by
+    newlines, which normalized text never contains, so no match can span two
+    chapters) and ``starts`` holds each chapter's offset into it.
     """
-    norm_highlight = _normalize_for_search(highlight_text)
-    norm_chapter = _normalize_for_search(chapter_text)
+    chapters: list[ChapterCorpus] = field(default_factory=list)
+    buffer: str = ""
+    starts: list[int] = field(default_factory=list)
+    # Sparse chapter x term presence matrix over significant words, stored by
+    # column: term -> ascending chapter indices. Built on first use.
+    term_chapters: dict[str, list[int]] | None = None
+
+    def chapter_at(self, offset: int) -> int:
+        """Return the index of the chapter containing a buffer offset."""
+        return bisect_right(self.starts, offset) - 1
+
+    def chapter_end(self, i: int) -> int:
+        return self.starts[i] + len(self.chapters[i].text)
+
+    def term_postings(self) -> dict[str, list[int]]:
+        if self.term_chapters is None:
+            postings: dict[str, list[int]] = {}
+            for i, corpus in enumerate(self.chapters):
+                for word in corpus.words - STOP_WORDS:
+                    if len(word) > 2:
+                        postings.setdefault(word, []).append(i)
+            self.term_chapters = postings
+        return self.term_chapters
+
+
+@dataclass
+class HighlightQuery:
+    """A clipping's text pre-normalized for matching."""
+    text: str
+    words: list[str]
+    significant: list[str]
+    # Kindle position of the clipping, used by the location-guided matcher
+    location: int | None = None
+    page: int | None = None
+
+
+def _chapter_corpus(chapter: Chapter) -> ChapterCorpus:
+    text = normalize_for_search(chapter.text)
+    tokens = text.split()
+    return ChapterCorpus(chapter=chapter, text=text, tokens=tokens, words=frozenset(tokens))
+
+
+@dataclass
+class BookMatch:
+    """Result of matching one highlight against a whole book."""
+    chapter: Chapter | None
+    score: int
+    # Highlight/chapter comparisons spent, when the matcher tracks them
+    comparisons: int | None = None
+
+
+def build_book_index(book: ParsedBook) -> BookIndex:
+    """Normalize every chapter of a book once for matching."""
+    chapters = [_chapter_corpus(ch) for ch in book.chapters]
+    starts: list[int] = []
+    pos = 0
+    for corpus in chapters:
+        starts.append(pos)
+        pos += len(corpus.text) + 1
+    buffer = "\n".join(corpus.text for corpus in chapters)
+    return BookIndex(chapters=chapters, buffer=buffer, starts=starts)
+
+
+def get_book_index(book: ParsedBook) -> BookIndex:
+    """Return the book's matching index, building it on first use."""
+    if book.search_index is None:
+        book.search_index = build_book_index(book)
+    return book.search_index
+
+
+def _is_significant(word: str) -> bool:
+    return word not in STOP_WORDS and len(word) > 2
+
+
+def _highlight_query(
+    highlight_text: str,
+    location: int | None = None,
+    page: int | None = None,
+) -> HighlightQuery:
+    text = normalize_for_search(highlight_text)
+    words = text.split()
+    significant = [w for w in words if _is_significant(w)]
+    return HighlightQuery(text=text, words=words, significant=significant, location=location, page=page)
+
+
+def _has_word_overlap(query: HighlightQuery, corpus: ChapterCorpus) -> bool:
+    """Check if most of a highlight's significant words appear in a chapter."""
+    significant = query.significant
+    if len(query.words) < 4 or not significant or not corpus.text:
+        return False
+    chapter_words = corpus.words
+    found = sum(1 for w in significant if w in chapter_words)
+    return found / len(significant) >= 0.8
+
+
+def _score_query(query: HighlightQuery, corpus: ChapterCorpus) -> int:
+    """Score a normalized highlight against a normalized chapter (see _match_score)."""
+    norm_highlight = query.text
+    norm_chapter = corpus.text
 
     if not norm_highlight or not norm_chapter:
         return 0
@@ -94,7 +184,7 @@ def _match_score(highlight_text: str, chapter_text: str) -> int:
         return 3
 
     # Try matching with first and last N words (handles truncated highlights)
-    words = norm_highlight.split()
+    words = query.words
     if len(words) >= 6:
         first_part = " ".join(words[:5])
         last_part = " ".join(words[-5:])
@@ -102,17 +192,304 @@ def _match_score(highlight_text: str, chapter_text: str) -> int:
             return 2
 
     # Word-overlap fallback: check if most significant words appear in chapter
-    if len(words) >= 4:
-        significant = [w for w in words if w not in STOP_WORDS and len(w) > 2]
-        if significant:
-            chapter_words = set(norm_chapter.split())
-            found = sum(1 for w in significant if w in chapter_words)
-            if found / len(significant) >= 0.8:
-                return 1
+    if _has_word_overlap(query, corpus):
+        return 1
 
     return 0
 
 
+def _match_score(highlight_text: str, chapter_text: str) -> int:
+    """Score how well a highlight matches a chapter.
+
+    Returns:
+        3 = direct substring match (best)
+        2 = first+last N words found (good, handles truncation)
+        1 = high word overlap (fallback for subtle char differences)
+        0 = no match
+    """
+    corpus = _chapter_corpus(Chapter(title="", level=0, order=0, text=chapter_text))
+    return _score_query(_highlight_query(highlight_text), corpus)
+
+
+def _match_query(query: HighlightQuery, index: BookIndex) -> BookMatch:
+    """Find the best chapter for a highlight with whole-book substring searches.
+
+    Picks the same chapter as scoring every chapter in TOC order with
+    _score_query and keeping the first best score: the earliest chapter
+    with a direct match, else the earliest with both first+last 5 words.
+    Word-overlap (tier 1) matching is left to _match_word_overlap.
+    """
+    if not query.text:
+        return BookMatch(chapter=None, score=0)
+
+    buffer = index.buffer
+    pos = buffer.find(query.text)
+    if pos >= 0:
+        i = index.chapter_at(pos)
+        return BookMatch(index.chapters[i].chapter, 3)
+
+    words = query.words
+    if len(words) >= 6:
+        first_part = " ".join(words[:5])
+        last_part = " ".join(words[-5:])
+        pos = buffer.find(first_part)
+        while pos >= 0:
+            i = index.chapter_at(pos)
+            start = index.starts[i]
+            end = index.chapter_end(i)
+            if buffer.find(last_part, start, end) >= 0:
+                return BookMatch(index.chapters[i].chapter, 2)
+            # Skip the rest of this chapter
+            pos = buffer.find(first_part, end)
+
+    return BookMatch(chapter=None, score=0)
+
+
+def _match_word_overlap(
+    queries: list[HighlightQuery],
+    matches: list[BookMatch],
+    index: BookIndex,
+) -> None:
+    """Fill in tier-1 (word overlap) matches for all still-unmatched highlights.
+
+    Equivalent to running _has_word_overlap against every chapter, but the
+    overlap counts for a highlight come from one sparse product of its
+    significant-term counts with the chapter x term presence matrix, so
+    only chapters sharing at least one term are touched.
+    """
+    postings = None
+    for query, match in zip(queries, matches):
+        if match.chapter is not None or len(query.words) < 4 or not query.significant:
+            continue
+        if postings is None:
+            postings = index.term_postings()
+        term_counts: dict[str, int] = {}
+        for word in query.significant:
+            term_counts[word] = term_counts.get(word, 0) + 1
+        overlap: dict[int, int] = {}
+        for word, tf in term_counts.items():
+            for i in postings.get(word, ()):
+                overlap[i] = overlap.get(i, 0) + tf
+        total = len(query.significant)
+        hits = [i for i, found in overlap.items() if found / total >= 0.8]
+        if hits:
+            match.chapter = index.chapters[min(hits)].chapter
+            match.score = 1
+
+
+def _match_pairwise(queries: list[HighlightQuery], index: BookIndex) -> list[BookMatch]:
+    """Reference matcher: score every highlight against every chapter."""
+    results: list[BookMatch] = []
+    for done, query in enumerate(queries):
+        progress("matching", done, len(queries))
+        best = BookMatch(chapter=None, score=0)
+        for corpus in index.chapters:
+            score = _score_query(query, corpus)
+            if score > best.score:
+                best = BookMatch(corpus.chapter, score)
+                if score == 3:
+                    break  # Direct match is the best possible, stop early
+        results.append(best)
+    return results
+
+
+def _match_indexed(queries: list[HighlightQuery], index: BookIndex) -> list[BookMatch]:
+    """Match each highlight with its own whole-book search (see _match_query)."""
+    matches: list[BookMatch] = []
+    for done, query in enumerate(queries):
+        progress("matching", done, len(queries))
+        matches.append(_match_query(query, index))
+    _match_word_overlap(queries, matches, index)
+    return matches
+
+
+class _Automaton:
+    """Minimal pure-Python Aho–Corasick automaton.
+
+    Mirrors the subset of the ``ahocorasick.Automaton`` API used below and
+    is only used when pyahocorasick is not installed.
+    """
+
+    def __init__(self) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list] = [[]]
+
+    def add_word(self, word: str, value) -> None:
+        node = 0
+        for ch in word:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(value)
+
+    def make_automaton(self) -> None:
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = list(goto[0].values())
+        for node in queue:
+            for ch, nxt in goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                if out[fail[nxt]]:
+                    out[nxt] = out[nxt] + out[fail[nxt]]
+
+    def iter(self, text: str):
+        """Yield (end_index, value) for every pattern occurrence in text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for value in out[node]:
+                yield i, value
+
+
+def _match_automaton(queries: list[HighlightQuery], index: BookIndex) -> list[BookMatch]:
+    """Match all highlights in one pass over the book with an Aho–Corasick automaton.
+
+    Every distinct highlight text and first/last-5-word probe becomes one
+    pattern; each chapter's normalized text is streamed through the
+    automaton once, recording which chapters contain each pattern.
+    Decisions are the same as _match_query.
+    """
+    pattern_ids: dict[str, int] = {}
+    probes: list[tuple[int, int, int]] = []  # (full, first, last) pattern ids, -1 if unused
+
+    def pattern_id(text: str) -> int:
+        return pattern_ids.setdefault(text, len(pattern_ids))
+
+    for query in queries:
+        full = first = last = -1
+        if query.text:
+            full = pattern_id(query.text)
+            if len(query.words) >= 6:
+                first = pattern_id(" ".join(query.words[:5]))
+                last = pattern_id(" ".join(query.words[-5:]))
+        probes.append((full, first, last))
+
+    # hits[pattern] holds the indexes of the chapters containing it
+    hits: list[set[int]] = [set() for _ in pattern_ids]
+    if pattern_ids:
+        automaton = ahocorasick.Automaton() if ahocorasick is not None else _Automaton()
+        for text, pid in pattern_ids.items():
+            automaton.add_word(text, pid)
+        automaton.make_automaton()
+        for i, corpus in enumerate(index.chapters):
+            if not corpus.text:
+                continue
+            for _, pid in automaton.iter(corpus.text):
+                hits[pid].add(i)
+
+    results: list[BookMatch] = []
+    for query, (full, first, last) in zip(queries, probes):
+        match = BookMatch(chapter=None, score=0)
+        if full >= 0 and hits[full]:
+            match = BookMatch(index.chapters[min(hits[full])].chapter, 3)
+        elif first >= 0:
+            both = hits[first] & hits[last]
+            if both:
+                match = BookMatch(index.chapters[min(both)].chapter, 2)
+        results.append(match)
+    _match_word_overlap(queries, results, index)
+    return results
+
+
+class _LocationModel:
+    """Learned mapping from a Kindle position (location or page) to a chapter."""
+
+    def __init__(self) -> None:
+        self._positions: list[int] = []
+        self._chapters: list[int] = []
+
+    def predict(self, position: int) -> int | None:
+        """Chapter of the nearest learned position at or before ``position``."""
+        if not self._positions:
+            return None
+        i = bisect_right(self._positions, position)
+        return self._chapters[max(i - 1, 0)]
+
+    def learn(self, position: int, chapter: int) -> None:
+        i = bisect_right(self._positions, position)
+        self._positions.insert(i, position)
+        self._chapters.insert(i, chapter)
+
+
+def _match_by_location(queries: list[HighlightQuery], index: BookIndex) -> list[BookMatch]:
+    """Match highlights by checking the chapters their Kindle position predicts first.
+
+    Highlights from one book are close to monotonic in location, so after a
+    few confident (tier 3 or 2) matches the location -> chapter mapping is
+    learned and most highlights are found by a direct match in the predicted
+    chapter or one of its neighbours. Anything else falls back to the
+    whole-book search. A highlight whose text also appears in an earlier
+    chapter is attributed to the predicted one, so unlike the other
+    matchers this one can pick a different chapter for repeated text.
+
+    Each match records the chapter comparisons it cost: the candidate
+    chapters checked, plus one per chapter when it fell back to the full
+    search.
+    """
+    chapter_count = len(index.chapters)
+    chapter_positions = {id(corpus.chapter): i for i, corpus in enumerate(index.chapters)}
+    models = {"location": _LocationModel(), "page": _LocationModel()}
+    matches: list[BookMatch] = []
+
+    for done, query in enumerate(queries):
+        progress("matching", done, len(queries))
+        if query.location is not None:
+            model, position = models["location"], query.location
+        elif query.page is not None:
+            model, position = models["page"], query.page
+        else:
+            model, position = None, None
+
+        match = None
+        candidates: list[int] = []
+        predicted = model.predict(position) if model is not None and query.text else None
+        if predicted is not None:
+            candidates = [
+                i for i in (predicted, predicted + 1, predicted - 1) if 0 <= i < chapter_count
+            ]
+            # Only a direct match settles it: a first+last words match here
+            # could still lose to a direct match anywhere in the book
+            for checked, i in enumerate(candidates, 1):
+                if query.text in index.chapters[i].text:
+                    match = BookMatch(index.chapters[i].chapter, 3, comparisons=checked)
+                    break
+
+        if match is None:
+            match = _match_query(query, index)
+            match.comparisons = len(candidates) + chapter_count
+
+        if model is not None and match.score >= 2:
+            model.learn(position, chapter_positions[id(match.chapter)])
+        matches.append(match)
+
+    _match_word_overlap(queries, matches, index)
+    return matches
+
+
+MATCHERS = {
+    "automaton": _match_automaton,
+    "indexed": _match_indexed,
+    "location": _match_by_location,
+    "pairwise": _match_pairwise,
+}
+
+# The pure-Python automaton is slower than per-highlight searches, so only
+# default to the automaton when the C implementation is available.
+DEFAULT_MATCHER = "automaton" if ahocorasick is not None else "indexed"
+
+
 def _format_location(clipping: Clipping) -> str:
     """Format location/page info for display."""
     parts = []
@@ -126,6 +503,15 @@ def _format_location(clipping: Clipping) -> str:
     return " · ".join(parts) if parts else ""
 
 
+def _highlight_dict(clip: Clipping) -> dict:
+    return {
+        "text": clip.text,
+        "type": clip.clip_type,
+        "location": _format_location(clip),
+        "page": clip.page,
+    }
+
+
 def _render_highlight(h: dict, md_lines: list[str]) -> None:
     """Render a single highlight dict into markdown lines."""
     md_lines.append(f"- {h['text']}")
@@ -174,29 +560,45 @@ def _format_markdown(
     return "\n".join(md_lines).strip() + "\n"
 
 
-def generate_markdown(book: ParsedBook, clippings: list[Clipping]) -> GenerationResult:
-    """Match clippings to chapters and generate markdown output."""
+def generate_markdown(
+    book: ParsedBook,
+    clippings: list[Clipping],
+    matcher: str | None = None,
+) -> GenerationResult:
+    """Match clippings to chapters and generate markdown output.
+
+    ``matcher`` selects the matching engine (see MATCHERS, defaults to
+    DEFAULT_MATCHER). All of them pick the same chapters as _match_score,
+    except "location" for text that appears in more than one chapter.
+    """
+    matcher = matcher or DEFAULT_MATCHER
+    if matcher not in MATCHERS:
+        raise ValueError(f"Unknown matcher: {matcher!r}")
+
     # Match each clipping to a chapter
     matched: list[tuple[Clipping, Chapter | None]] = []
     matched_count = 0
     orphaned_count = 0
 
-    for clip in clippings:
-        found_chapter = None
-        best_score = 0
-        for chapter in book.chapters:
-            score = _match_score(clip.text, chapter.text)
-            if score > best_score:
-                best_score = score
-                found_chapter = chapter
-                if score == 3:
-                    break  # Direct match is the best possible, stop early
-
-        matched.append((clip, found_chapter))
-        if found_chapter:
+    with timed("matching"):
+        progress("matching", 0, len(clippings))
+        index = get_book_index(book)
+        queries = [_highlight_query(clip.text, clip.location_start, clip.page) for clip in clippings]
+        matches = MATCHERS[matcher](queries, index)
+        progress("matching", len(clippings), len(clippings))
+
+    comparisons_saved = 0
+    tracks_comparisons = False
+    for clip, match in zip(clippings, matches):
+        matched.append((clip, match.chapter))
+        count(f"match_tier_{match.score}")
+        if match.chapter:
             matched_count += 1
         else:
             orphaned_count += 1
+        if match.comparisons is not None:
+            tracks_comparisons = True
+            comparisons_saved += len(index.chapters) - match.comparisons
 
     total = len(clippings)
     match_rate = round((matched_count / total * 100), 1) if total > 0 else 0
@@ -207,6 +609,8 @@ def generate_markdown(book: ParsedBook, clippings: list[Clipping]) -> Generation
         "orphaned": orphaned_count,
         "match_rate": match_rate,
     }
+    if tracks_comparisons:
+        stats["comparisons_saved"] = comparisons_saved
 
     # Group by chapter
     chapter_highlights: dict[str, list[tuple[Clipping, Chapter | None]]] = {}
@@ -230,27 +634,18 @@ def generate_markdown(book: ParsedBook, clippings: list[Clipping]) -> Generation
             seen_chapters.add(chapter.title)
             cr = ChapterResult(title=chapter.title, level=chapter.level)
             for clip, _ in chapter_highlights[chapter.title]:
-                cr.highlights.append({
-                    "text": clip.text,
-                    "type": clip.clip_type,
-                    "location": _format_location(clip),
-                    "page": clip.page,
-                })
+                cr.highlights.append(_highlight_dict(clip))
             chapter_results.append(cr)
 
     # Add orphaned clips as a chapter result
     if orphaned_clips:
         cr = ChapterResult(title="Unmatched Highlights", level=1)
         for clip in orphaned_clips:
-            cr.highlights.append({
-                "text": clip.text,
-                "type": clip.clip_type,
-                "location": _format_location(clip),
-                "page": clip.page,
-            })
+            cr.highlights.append(_highlight_dict(clip))
         chapter_results.append(cr)
 
-    markdown = _format_markdown(chapter_results)
+    with timed("render"):
+        markdown = _format_markdown(chapter_results)
 
     return GenerationResult(
         title=book.title,
@@ -261,119 +656,280 @@ def generate_markdown(book: ParsedBook, clippings: list[Clipping]) -> Generation
     )
 
 
-def _is_duplicate(new_text: str, existing_normalized: set[str]) -> bool:
+class DedupIndex:
+    """Normalized highlight texts indexed for exact and containment lookups.
+
+    Normalized text is single-space separated, so if ``a`` occurs inside
+    ``b`` every token of ``a`` except the first and last (which may be cut
+    mid-word) is a whole token of ``b``. That gives two small posting
+    indexes instead of comparing against every entry:
+
+    - ``_postings``: token -> entries containing it. A query inside an entry
+      must be in the postings of each of its interior tokens; the rarest
+      one is used as the candidate list.
+    - ``_keys``: one interior token per entry -> entries. An entry inside
+      a query has its key token among the query's tokens.
+
+    Texts with fewer than three tokens have no interior token and are
+    compared directly.
+
+    Each entry can be given an owner when added (merge uses the title of
+    the chapter it is in), returned by ``owner``.
+    """
+
+    def __init__(self) -> None:
+        self._entries: list[str] = []
+        self._exact: dict[str, str | None] = {}
+        self._postings: dict[str, list[int]] = {}
+        self._keys: dict[str, list[int]] = {}
+        self._short: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, norm: str, owner: str | None = None) -> None:
+        if not norm or norm in self._exact:
+            return
+        i = len(self._entries)
+        self._entries.append(norm)
+        self._exact[norm] = owner
+        tokens = norm.split(" ")
+        for token in set(tokens):
+            self._postings.setdefault(token, []).append(i)
+        if len(tokens) < 3:
+            self._short.append(i)
+        else:
+            self._keys.setdefault(max(tokens[1:-1], key=len), []).append(i)
+
+    def find(self, norm: str) -> str | None:
+        """Return an entry equal to, containing, or contained in ``norm``."""
+        if not norm:
+            return None
+        if norm in self._exact:
+            return norm
+        entries = self._entries
+        tokens = norm.split(" ")
+
+        # norm inside an existing entry
+        if len(tokens) >= 3:
+            candidates = None
+            for token in tokens[1:-1]:
+                posting = self._postings.get(token)
+                if posting is None:
+                    candidates = ()
+                    break
+                if candidates is None or len(posting) < len(candidates):
+                    candidates = posting
+            for i in candidates:
+                if norm in entries[i]:
+                    return entries[i]
+        else:
+            for existing in entries:
+                if norm in existing:
+                    return existing
+
+        # An existing entry inside norm
+        for token in set(tokens):
+            for i in self._keys.get(token, ()):
+                if entries[i] in norm:
+                    return entries[i]
+        for i in self._short:
+            if entries[i] in norm:
+                return entries[i]
+        return None
+
+    def owner(self, entry: str) -> str | None:
+        """The owner ``entry`` was added with."""
+        return self._exact.get(entry)
+
+
+def _is_duplicate(new_text: str, existing_normalized: DedupIndex) -> bool:
     """Check if a highlight text is a duplicate of any existing highlight.
 
     Uses exact normalized match and substring containment to catch
     Kindle's truncation differences.
     """
-    norm = _normalize_for_search(new_text)
-    if not norm:
-        return False
-    # Exact match
-    if norm in existing_normalized:
-        return True
-    # Substring containment (catches truncation differences)
-    for existing in existing_normalized:
-        if norm in existing or existing in norm:
-            return True
-    return False
-
-
-def merge_markdown(book: ParsedBook, clippings: list[Clipping], existing_markdown_text: str) -> GenerationResult:
-    """Merge new clippings into an existing markdown file, deduplicating highlights."""
+    return existing_normalized.find(normalize_for_search(new_text)) is not None
+
+
+# Kept in the preamble of merged files: how many of the book's clippings
+# the file has seen, and a hash of the last of them. Kindle only appends to
+# My Clippings.txt, so on the next merge those clippings can be skipped.
+_WATERMARK_RE = re.compile(r"<!-- kindletomd: merged (\d+) clippings, last ([0-9a-f]{16}) -->")
+
+
+def _clipping_digest(clip: Clipping) -> str:
+    key = "\x1f".join(str(v) for v in (
+        clip.text, clip.clip_type, clip.page, clip.location_start, clip.location_end, clip.date,
+    ))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def _already_merged(preamble: list[str], clippings: list[Clipping]) -> int:
+    """How many leading clippings the preamble's watermark says were merged.
+
+    0 without a watermark, or if it does not match the clippings (the file
+    was edited on the device, or this is another book's note).
+    """
+    for line in preamble:
+        match = _WATERMARK_RE.fullmatch(line.strip())
+        if match:
+            merged = int(match.group(1))
+            if 0 < merged <= len(clippings) and _clipping_digest(clippings[merged - 1]) == match.group(2):
+                return merged
+            return 0
+    return 0
+
+
+def _with_watermark(preamble: list[str], clippings: list[Clipping]) -> list[str]:
+    """The preamble with its watermark replaced by one covering ``clippings``.
+
+    Unchanged without clippings, so a merge of pasted notes alone keeps it.
+    """
+    if not clippings:
+        return preamble
+    lines = [line for line in preamble if not _WATERMARK_RE.fullmatch(line.strip())]
+    lines.append(
+        f"<!-- kindletomd: merged {len(clippings)} clippings, last {_clipping_digest(clippings[-1])} -->"
+    )
+    return lines
+
+
+def merge_markdown(
+    book: ParsedBook,
+    clippings: list[Clipping],
+    existing_markdown_text: str,
+    matcher: str | None = None,
+    notes: list[Clipping] | None = None,
+) -> GenerationResult:
+    """Merge new clippings and pasted notes into an existing markdown file, deduplicating highlights.
+
+    Clippings repeating a highlight already in the file are not matched to
+    chapters: they are listed, marked as duplicates, after the new
+    highlights of the chapter holding the highlight they repeat. Only the
+    rest go through generate_markdown.
+
+    The merged file records in its preamble how many clippings it has seen
+    (see _WATERMARK_RE). When the watermark matches the start of
+    ``clippings``, those are skipped; otherwise every clipping is merged.
+    ``notes`` are always merged, after the clippings, and the watermark
+    does not cover them.
+    """
     # Parse existing markdown
-    parsed = parse_existing_markdown(existing_markdown_text)
+    with timed("markdown_parse"):
+        parsed = parse_existing_markdown(existing_markdown_text)
+    already_merged = _already_merged(parsed.preamble, clippings)
+    count("already_merged", already_merged)
+    preamble = _with_watermark(parsed.preamble, clippings)
+
+    with timed("dedup"):
+        # Build dedup index from existing highlights, owned by their chapter
+        existing_normalized = DedupIndex()
+        existing_highlight_count = sum(len(chapter.highlights) for chapter in parsed.chapters)
+        new_clippings = clippings[already_merged:] + (notes or [])
+        # Not needed when the watermark covers every clipping
+        for chapter in parsed.chapters if new_clippings else ():
+            for h in chapter.highlights:
+                norm = normalize_for_search(h.text)
+                if norm:
+                    existing_normalized.add(norm, chapter.title)
+
+        # Clippings already in the file need no matching: they are listed
+        # as duplicates in the chapter of the highlight they repeat
+        fresh: list[Clipping] = []
+        known_duplicates: dict[str, list[dict]] = {}
+        for clip in new_clippings:
+            norm = normalize_for_search(clip.text)
+            entry = existing_normalized.find(norm)
+            if entry is None:
+                fresh.append(clip)
+            else:
+                owner = existing_normalized.owner(entry)
+                known_duplicates.setdefault(owner, []).append({**_highlight_dict(clip), "duplicate": True})
+
+    event(
+        "merge",
+        existing_highlights=existing_highlight_count,
+        already_merged=already_merged,
+        repeated=len(new_clippings) - len(fresh),
+        new=len(fresh),
+    )
 
     # Run normal generation for the new highlights
-    new_result = generate_markdown(book, clippings)
-
-    # Build dedup index from existing highlights
-    existing_normalized: set[str] = set()
-    existing_highlight_count = 0
-    for chapter in parsed.chapters:
-        for h in chapter.highlights:
-            existing_highlight_count += 1
-            norm = _normalize_for_search(h.text)
-            if norm:
-                existing_normalized.add(norm)
-
-    # Track merge stats
-    duplicates_found = 0
-    new_highlights_added = 0
-
-    # Merge chapters
-    merged_results: list[ChapterResult] = []
-    seen_titles: set[str] = set()
-
-    # First, preserve existing chapters in their original order, appending new non-duplicate highlights
-    for chapter in parsed.chapters:
-        seen_titles.add(chapter.title)
-        cr = ChapterResult(title=chapter.title, level=chapter.level)
-
-        # Build content_items from parsed content_items (preserves interleaved raw blocks)
-        for item in chapter.content_items:
-            if isinstance(item, RawBlock):
-                cr.content_items.append({"raw_lines": item.lines})
-            elif isinstance(item, ParsedHighlight):
-                h_dict = {
-                    "text": item.text,
-                    "type": item.clip_type,
-                    "location": item.location,
-                    "page": item.page,
-                }
-                cr.highlights.append(h_dict)
-                cr.content_items.append(h_dict)
-
-        # Find matching chapter in new results and append non-duplicates
-        for new_cr in new_result.chapters:
-            if new_cr.title == chapter.title:
-                for h in new_cr.highlights:
-                    if _is_duplicate(h["text"], existing_normalized):
-                        duplicates_found += 1
-                        dup_h = {**h, "duplicate": True}
-                        cr.highlights.append(dup_h)
-                        cr.content_items.append(dup_h)
-                        norm = _normalize_for_search(dup_h["text"])
-                        if norm:
-                            existing_normalized.add(norm)
-                    else:
-                        cr.highlights.append(h)
-                        cr.content_items.append(h)
-                        new_highlights_added += 1
-                        # Add to dedup index so later chapters don't re-add
-                        norm = _normalize_for_search(h["text"])
-                        if norm:
-                            existing_normalized.add(norm)
-                break
-
-        merged_results.append(cr)
-
-    # Then add chapters that only exist in new results
-    for new_cr in new_result.chapters:
-        if new_cr.title not in seen_titles:
-            seen_titles.add(new_cr.title)
+    new_result = generate_markdown(book, fresh, matcher=matcher) if fresh else None
+    new_chapters: dict[str, ChapterResult] = {}
+    for new_cr in new_result.chapters if new_result else ():
+        new_chapters.setdefault(new_cr.title, new_cr)
+
+    with timed("dedup"):
+        # Track merge stats
+        duplicates_found = 0
+        new_highlights_added = 0
+
+        # Merge chapters
+        merged_results: list[ChapterResult] = []
+
+        # First, preserve existing chapters in their original order, appending new non-duplicate highlights
+        for chapter in parsed.chapters:
+            cr = ChapterResult(title=chapter.title, level=chapter.level)
+
+            # Build content_items from parsed content_items (preserves interleaved raw blocks)
+            for item in chapter.content_items:
+                if isinstance(item, RawBlock):
+                    cr.content_items.append({"raw_lines": item.lines})
+                elif isinstance(item, ParsedHighlight):
+                    h_dict = {
+                        "text": item.text,
+                        "type": item.clip_type,
+                        "location": item.location,
+                        "page": item.page,
+                    }
+                    cr.highlights.append(h_dict)
+                    cr.content_items.append(h_dict)
+
+            # New highlights matched to this chapter, minus repeats among themselves
+            new_cr = new_chapters.pop(chapter.title, None)
+            for h in new_cr.highlights if new_cr else ():
+                if _is_duplicate(h["text"], existing_normalized):
+                    duplicates_found += 1
+                    h = {**h, "duplicate": True}
+                else:
+                    new_highlights_added += 1
+                cr.highlights.append(h)
+                cr.content_items.append(h)
+                # Add to dedup index so later chapters don't re-add
+                norm = normalize_for_search(h["text"])
+                if norm:
+                    existing_normalized.add(norm, cr.title)
+
+            # Then the clippings repeating this chapter's highlights
+            for dup_h in known_duplicates.pop(chapter.title, ()):
+                duplicates_found += 1
+                cr.highlights.append(dup_h)
+                cr.content_items.append(dup_h)
+
+            merged_results.append(cr)
+
+        # Then add chapters that only exist in new results
+        for new_cr in new_chapters.values():
             cr = ChapterResult(title=new_cr.title, level=new_cr.level)
             for h in new_cr.highlights:
                 if _is_duplicate(h["text"], existing_normalized):
                     duplicates_found += 1
-                    dup_h = {**h, "duplicate": True}
-                    cr.highlights.append(dup_h)
-                    norm = _normalize_for_search(dup_h["text"])
-                    if norm:
-                        existing_normalized.add(norm)
+                    h = {**h, "duplicate": True}
                 else:
-                    cr.highlights.append(h)
                     new_highlights_added += 1
-                    norm = _normalize_for_search(h["text"])
-                    if norm:
-                        existing_normalized.add(norm)
-            if cr.highlights:
-                # New-only chapters: content_items mirrors highlights (no raw blocks)
-                cr.content_items = list(cr.highlights)
-                merged_results.append(cr)
-
-    markdown = _format_markdown(merged_results, preamble=parsed.preamble)
+                cr.highlights.append(h)
+                norm = normalize_for_search(h["text"])
+                if norm:
+                    existing_normalized.add(norm, cr.title)
+            # New-only chapters: content_items mirrors highlights (no raw blocks)
+            cr.content_items = list(cr.highlights)
+            merged_results.append(cr)
+
+    count("duplicates", duplicates_found)
+    with timed("render"):
+        markdown = _format_markdown(merged_results, preamble=preamble)
 
     total_in_output = sum(len(cr.highlights) for cr in merged_results)
     matched_in_output = sum(
@@ -391,7 +947,10 @@ def merge_markdown(book: ParsedBook, clippings: list[Clipping], existing_markdow
         "existing_highlights": existing_highlight_count,
         "new_highlights_added": new_highlights_added,
         "duplicates_found": duplicates_found,
+        "already_merged": already_merged,
     }
+    if new_result and "comparisons_saved" in new_result.stats:
+        stats["comparisons_saved"] = new_result.stats["comparisons_saved"]
 
     return GenerationResult(
         title=book.title,
@@ -399,5 +958,5 @@ def merge_markdown(book: ParsedBook, clippings: list[Clipping], existing_markdow
         chapters=merged_results,
         markdown=markdown,
         stats=stats,
-        preamble=parsed.preamble,
+        preamble=preamble,
     )
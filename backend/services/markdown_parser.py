@@ -32,20 +32,71 @@ class ParsedMarkdown:
     preamble: list[str] = field(default_factory=list)
 
 
+# Each line is dispatched on its first character to at most two of these
+_HEADING_RE = re.compile(r"(#{1,4})\s+(.+)")
+_HIGHLIGHT_RE = re.compile(r'- "(.+)"')
+_NOTE_RE = re.compile(r"- (.+)")
+_META_RE = re.compile(r"\s{2}(.+)")
+_PAGE_RE = re.compile(r"PAGE\s+(\d+)")
+_LOCATION_RE = re.compile(r"(LOCATION\s+\S+)")
+
+
 def _flush_raw_accumulator(raw_accumulator: list[str]) -> RawBlock | None:
     """Flush the raw accumulator into a RawBlock, stripping leading/trailing blank lines.
 
     Returns None if only blank lines remain (structural whitespace).
     """
-    # Strip leading blank lines
-    while raw_accumulator and raw_accumulator[0].strip() == "":
-        raw_accumulator.pop(0)
-    # Strip trailing blank lines
-    while raw_accumulator and raw_accumulator[-1].strip() == "":
-        raw_accumulator.pop()
-    if not raw_accumulator:
+    start, end = 0, len(raw_accumulator)
+    while start < end and not raw_accumulator[start].strip():
+        start += 1
+    while end > start and not raw_accumulator[end - 1].strip():
+        end -= 1
+    if start == end:
         return None
-    return RawBlock(lines=list(raw_accumulator))
+    return RawBlock(lines=raw_accumulator[start:end])
+
+
+class _Tokenizer:
+    """State of parse_existing_markdown between lines."""
+
+    def __init__(self) -> None:
+        self.result = ParsedMarkdown()
+        self.chapter: ParsedChapter | None = None
+        self.highlight: ParsedHighlight | None = None
+        self.raw: list[str] = []
+
+    def flush(self) -> None:
+        """End the pending highlight, then the raw lines after it."""
+        if self.highlight and self.chapter:
+            self.chapter.highlights.append(self.highlight)
+            self.chapter.content_items.append(self.highlight)
+            self.highlight = None
+        if self.raw:
+            block = _flush_raw_accumulator(self.raw)
+            if block:
+                if self.chapter:
+                    self.chapter.content_items.append(block)
+                else:
+                    self.result.preamble.extend(block.lines)
+            self.raw.clear()
+
+    def heading(self, match: re.Match) -> None:
+        self.flush()
+        level = len(match.group(1)) - 1  # ## = level 1, ### = level 2, etc.
+        self.chapter = ParsedChapter(title=match.group(2).strip(), level=level)
+        self.result.chapters.append(self.chapter)
+
+    def item(self, text: str, clip_type: str) -> None:
+        self.flush()
+        self.highlight = ParsedHighlight(text=text, clip_type=clip_type, location="", page=None)
+
+    def metadata(self, meta: str) -> None:
+        page_match = _PAGE_RE.search(meta)
+        if page_match:
+            self.highlight.page = int(page_match.group(1))
+        loc_match = _LOCATION_RE.search(meta)
+        if loc_match:
+            self.highlight.location = loc_match.group(1)
 
 
 def parse_existing_markdown(markdown_text: str) -> ParsedMarkdown:
@@ -60,109 +111,37 @@ def parse_existing_markdown(markdown_text: str) -> ParsedMarkdown:
 
     Unrecognized lines are preserved as RawBlock entries in content_items.
     """
-    result = ParsedMarkdown()
-    current_chapter: ParsedChapter | None = None
-    current_highlight: ParsedHighlight | None = None
-    raw_accumulator: list[str] = []
+    tokens = _Tokenizer()
+    raw_append = tokens.raw.append
 
     for line in markdown_text.splitlines():
-        # Chapter heading: # Title, ## Title, ### Title, #### Title
-        heading_match = re.match(r"^(#{1,4})\s+(.+)$", line)
-        if heading_match:
-            # Flush any pending highlight
-            if current_highlight and current_chapter:
-                current_chapter.highlights.append(current_highlight)
-                current_chapter.content_items.append(current_highlight)
-                current_highlight = None
-
-            # Flush raw accumulator to current chapter or preamble
-            if raw_accumulator:
-                block = _flush_raw_accumulator(raw_accumulator)
-                if block:
-                    if current_chapter:
-                        current_chapter.content_items.append(block)
-                    else:
-                        result.preamble.extend(block.lines)
-                raw_accumulator.clear()
-
-            level = len(heading_match.group(1)) - 1  # ## = level 1, ### = level 2, etc.
-            title = heading_match.group(2).strip()
-            current_chapter = ParsedChapter(title=title, level=level)
-            result.chapters.append(current_chapter)
-            continue
-
-        # Highlight line: - "text" (quoted = highlight)
-        highlight_match = re.match(r'^- "(.+)"$', line)
-        if highlight_match and current_chapter is not None:
-            if current_highlight:
-                current_chapter.highlights.append(current_highlight)
-                current_chapter.content_items.append(current_highlight)
-
-            # Flush raw accumulator before this highlight
-            if raw_accumulator:
-                block = _flush_raw_accumulator(raw_accumulator)
-                if block:
-                    current_chapter.content_items.append(block)
-                raw_accumulator.clear()
-
-            current_highlight = ParsedHighlight(
-                text=highlight_match.group(1),
-                clip_type="highlight",
-                location="",
-                page=None,
-            )
-            continue
-
-        # Note line: - text (unquoted = note)
-        note_match = re.match(r"^- (.+)$", line)
-        if note_match and current_chapter is not None:
-            if current_highlight:
-                current_chapter.highlights.append(current_highlight)
-                current_chapter.content_items.append(current_highlight)
-
-            # Flush raw accumulator before this note
-            if raw_accumulator:
-                block = _flush_raw_accumulator(raw_accumulator)
-                if block:
-                    current_chapter.content_items.append(block)
-                raw_accumulator.clear()
-
-            current_highlight = ParsedHighlight(
-                text=note_match.group(1),
-                clip_type="note",
-                location="",
-                page=None,
-            )
-            continue
-
-        # Metadata line (indented): PAGE 42 · LOCATION 100-105 · HIGHLIGHT
-        meta_match = re.match(r"^\s{2}(.+)$", line)
-        if meta_match and current_highlight:
-            meta = meta_match.group(1)
-            page_match = re.search(r"PAGE\s+(\d+)", meta)
-            if page_match:
-                current_highlight.page = int(page_match.group(1))
-            # Extract location string
-            loc_match = re.search(r"(LOCATION\s+\S+)", meta)
-            if loc_match:
-                current_highlight.location = loc_match.group(1)
-            continue
+        first = line[:1]
+        if first == "#":
+            # Chapter heading: # Title, ## Title, ### Title, #### Title
+            match = _HEADING_RE.fullmatch(line)
+            if match:
+                tokens.heading(match)
+                continue
+        elif first == "-":
+            # Highlight line: - "text" (quoted = highlight); note line: - text
+            if tokens.chapter is not None:
+                match = _HIGHLIGHT_RE.fullmatch(line)
+                if match:
+                    tokens.item(match.group(1), "highlight")
+                    continue
+                match = _NOTE_RE.fullmatch(line)
+                if match:
+                    tokens.item(match.group(1), "note")
+                    continue
+        elif tokens.highlight:
+            # Metadata line (indented): PAGE 42 · LOCATION 100-105 · HIGHLIGHT
+            match = _META_RE.fullmatch(line)
+            if match:
+                tokens.metadata(match.group(1))
+                continue
 
         # Unrecognized line — accumulate for raw block
-        raw_accumulator.append(line)
-
-    # Flush last highlight
-    if current_highlight and current_chapter:
-        current_chapter.highlights.append(current_highlight)
-        current_chapter.content_items.append(current_highlight)
-
-    # Flush any remaining raw accumulator
-    if raw_accumulator:
-        block = _flush_raw_accumulator(raw_accumulator)
-        if block:
-            if current_chapter:
-                current_chapter.content_items.append(block)
-            else:
-                result.preamble.extend(block.lines)
-
-    return result
+        raw_append(line)
+
+    tokens.flush()
+    return tokens.result
@@ -0,0 +1,198 @@
+"""Per-stage timings and counters for conversions, exported in Prometheus text format.
+
+Code on the conversion path wraps its stages in ``timed("name")`` and
+records counts with ``count("name", n)``; both do nothing unless a
+StageTimer is being recorded into (see ``recording``), so the services
+stay usable on their own. The timer's snapshot travels back from the
+worker process with the conversion result and is added to
+``conversion_metrics``, which /metrics renders.
+
+``event`` and ``progress`` likewise pass progress events, plain dicts with
+a "stage" key, to the timer's listener if it has one (/api/convert/stream).
+"""
+
+import threading
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Stage histogram buckets, in seconds
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Minimum seconds between two progress events of a stage
+PROGRESS_INTERVAL = 0.1
+
+
+class StageTimer:
+    """Wall-clock seconds per named stage, and counters, for one conversion."""
+
+    def __init__(self, listener: Callable[[dict], None] | None = None) -> None:
+        self.stages: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        self.listener = listener
+        self._last_progress = (0.0, "", -1)  # time, stage, done
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            # A stage entered more than once (e.g. rendering in merge) adds up
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def event(self, stage: str, **fields) -> None:
+        if self.listener is not None:
+            self.listener({"stage": stage, **fields})
+
+    def progress(self, stage: str, done: int, total: int) -> None:
+        """Report ``done`` of ``total`` items, at most every PROGRESS_INTERVAL seconds."""
+        if self.listener is None:
+            return
+        now = time.monotonic()
+        last, last_stage, last_done = self._last_progress
+        if (stage, done) == (last_stage, last_done):
+            return
+        if done >= total or stage != last_stage or now - last >= PROGRESS_INTERVAL:
+            self._last_progress = (now, stage, done)
+            self.event(stage, done=done, total=total)
+
+    def update(self, snapshot: dict) -> None:
+        """Add another timer's snapshot (e.g. from a worker process)."""
+        for name, seconds in snapshot["stages"].items():
+            self.add(name, seconds)
+        for name, value in snapshot["counts"].items():
+            self.count(name, value)
+
+    def snapshot(self) -> dict:
+        return {"stages": dict(self.stages), "counts": dict(self.counts)}
+
+    def milliseconds(self) -> dict[str, float]:
+        return {name: round(seconds * 1000, 1) for name, seconds in self.stages.items()}
+
+    def server_timing(self) -> str:
+        """The stages as a Server-Timing header value."""
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.milliseconds().items())
+
+
+_current: ContextVar[StageTimer | None] = ContextVar("stage_timer", default=None)
+
+
+@contextmanager
+def recording(timer: StageTimer):
+    """Make ``timer`` the one timed() and count() record into."""
+    token = _current.set(timer)
+    try:
+        yield timer
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(name: str):
+    timer = _current.get()
+    if timer is None:
+        yield
+    else:
+        with timer.stage(name):
+            yield
+
+
+def count(name: str, value: int = 1) -> None:
+    timer = _current.get()
+    if timer is not None:
+        timer.count(name, value)
+
+
+def event(stage: str, **fields) -> None:
+    timer = _current.get()
+    if timer is not None:
+        timer.event(stage, **fields)
+
+
+def progress(stage: str, done: int, total: int) -> None:
+    timer = _current.get()
+    if timer is not None:
+        timer.progress(stage, done, total)
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.observations = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.observations += 1
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class ConversionMetrics:
+    """Process-wide conversion metrics: stage histograms and counters."""
+
+    def __init__(self, prefix: str = "kindletomd") -> None:
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._stages: dict[str, _Histogram] = {}
+        self._counts: dict[str, int] = {}
+        self._outcomes: dict[str, int] = {}
+
+    def observe(self, timer: StageTimer) -> None:
+        with self._lock:
+            for name, seconds in timer.stages.items():
+                if name not in self._stages:
+                    self._stages[name] = _Histogram(STAGE_BUCKETS)
+                self._stages[name].observe(seconds)
+            for name, value in timer.counts.items():
+                self._counts[name] = self._counts.get(name, 0) + value
+
+    def outcome(self, outcome: str) -> None:
+        with self._lock:
+            self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+
+    def render(self, gauges: dict[str, float] | None = None) -> str:
+        """Prometheus text exposition format, with optional extra gauges."""
+        p = self.prefix
+        lines: list[str] = []
+        with self._lock:
+            lines.append(f"# HELP {p}_conversions_total Conversions handled, by outcome.")
+            lines.append(f"# TYPE {p}_conversions_total counter")
+            for outcome, value in sorted(self._outcomes.items()):
+                lines.append(f'{p}_conversions_total{{outcome="{_label(outcome)}"}} {value}')
+
+            lines.append(f"# HELP {p}_stage_seconds Time spent in each conversion stage.")
+            lines.append(f"# TYPE {p}_stage_seconds histogram")
+            for stage, hist in sorted(self._stages.items()):
+                label = f'stage="{_label(stage)}"'
+                for bound, value in zip(hist.buckets, hist.counts):
+                    lines.append(f'{p}_stage_seconds_bucket{{{label},le="{bound}"}} {value}')
+                lines.append(f'{p}_stage_seconds_bucket{{{label},le="+Inf"}} {hist.observations}')
+                lines.append(f"{p}_stage_seconds_sum{{{label}}} {hist.total}")
+                lines.append(f"{p}_stage_seconds_count{{{label}}} {hist.observations}")
+
+            for name, value in sorted(self._counts.items()):
+                lines.append(f"# TYPE {p}_{name}_total counter")
+                lines.append(f"{p}_{name}_total {value}")
+
+        for name, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {p}_{name} gauge")
+            lines.append(f"{p}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+conversion_metrics = ConversionMetrics()
@@ -0,0 +1,133 @@
+"""Text normalization for matching highlights against chapter text.
+
+Both sides of every comparison go through normalize_for_search:
+
+1. NFKC (ligatures, full-width forms, compatibility characters)
+2. drop invisible characters (zero-width, bidi marks, line/paragraph
+   separators, narrow no-break space, word joiner, BOM) and soft hyphens
+3. lowercase
+4. quote variants become an apostrophe; double quotes and dashes, like
+   every other character that is not a word character, whitespace or an
+   apostrophe, become a space
+5. collapse whitespace runs to one space and strip
+
+Steps 2 and 4 are ``str.translate`` tables. The same rules are implemented
+by frontend/src/utils/normalize.ts; testdata/normalize_golden.json holds
+cases both are tested against.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+# Removed before lowercasing, as they were before this was table-driven:
+# lowercasing looks at neighbouring characters (final sigma)
+_INVISIBLE = (
+    "\u200b\u200c\u200d\u200e\u200f"  # zero-width space/joiners, bidi marks
+    "\u2028\u2029\u202a\u202b\u202c\u202d\u202e\u202f"  # separators, bidi embedding, narrow nbsp
+    "\u2060\ufeff"  # word joiner, BOM
+    "\u00ad"  # soft hyphen
+)
+_REMOVE_TABLE = str.maketrans("", "", _INVISIBLE)
+
+_APOSTROPHES = "\u2018\u2019\u201a\u2039\u203a\u02bc"  # curly, low-9, angle single, modifier
+_DOUBLE_QUOTES = "\u201c\u201d\u201e\u00ab\u00bb"  # curly, low-9, guillemets
+_DASHES = "\u2014\u2013\u2012\u2015"  # em, en, figure, horizontal bar
+_MAP_TABLE = str.maketrans(
+    {**{c: "'" for c in _APOSTROPHES}, **{c: " " for c in _DOUBLE_QUOTES + _DASHES}}
+)
+
+_NON_WORD_RE = re.compile(r"[^\w\s']")
+_WORD_RE = re.compile(r"\S+")
+
+# Highlights and short titles repeat across conversions; chapters do not
+_MEMO_MAX_LENGTH = 512
+
+
+def normalize_for_search(text: str) -> str:
+    """Normalize text for fuzzy substring matching."""
+    if len(text) <= _MEMO_MAX_LENGTH:
+        return _normalize_memo(text)
+    return _normalize(text)
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).translate(_REMOVE_TABLE).lower().translate(_MAP_TABLE)
+    return " ".join(_NON_WORD_RE.sub(" ", text).split())
+
+
+_normalize_memo = lru_cache(maxsize=8192)(_normalize)
+
+
+def normalize_with_offsets(text: str) -> tuple[str, list[int]]:
+    """normalize_for_search(text) and where each of its characters came from.
+
+    ``offsets[i]`` is the index in ``text`` of the character that produced
+    normalized character ``i``; a separator space points at the first
+    character of the run it replaces. A final extra entry points just past
+    the source of the last character, so a match ``normalized[a:b]`` came
+    from ``text[offsets[a]:offsets[b]]``. Characters NFKC produced from
+    several source characters (e.g. a letter and a combining accent) point
+    at the first of them.
+    """
+    chars, sources = _nfkc_with_sources(text)
+
+    kept = chars.translate(_REMOVE_TABLE)
+    if len(kept) != len(chars):
+        sources = [s for c, s in zip(chars, sources) if c not in _INVISIBLE]
+    lowered = kept.lower()
+    if len(lowered) != len(kept):
+        # Some characters lowercase to several (e.g. U+0130)
+        sources = [s for c, s in zip(kept, sources) for _ in c.lower()]
+    mapped = _NON_WORD_RE.sub(" ", lowered.translate(_MAP_TABLE))
+
+    out: list[str] = []
+    offsets: list[int] = []
+    for match in _WORD_RE.finditer(mapped):
+        if out:
+            out.append(" ")
+            offsets.append(sources[previous_end])
+        out.append(match.group())
+        offsets.extend(sources[match.start():match.end()])
+        previous_end = match.end()
+    if offsets:
+        # Past the last character's source: where the next character's starts
+        following = sources[previous_end] if previous_end < len(sources) else len(text)
+        offsets.append(max(following, offsets[-1] + 1))
+    else:
+        offsets.append(0)
+    return "".join(out), offsets
+
+
+def _nfkc_with_sources(text: str) -> tuple[str, list[int]]:
+    """NFKC of text, with the index of the source character of each output character.
+
+    NFKC is applied to runs that start at a character with combining class
+    0, so each output character points at the start of the run it came
+    from; in the rare text where that differs from normalizing everything
+    at once, runs are split at whitespace instead.
+    """
+    if unicodedata.is_normalized("NFKC", text):
+        return text, list(range(len(text)))
+    full = unicodedata.normalize("NFKC", text)
+    for starts in (_starter_runs(text), _whitespace_runs(text)):
+        pieces: list[str] = []
+        sources: list[int] = []
+        for start, end in zip(starts, starts[1:] + [len(text)]):
+            piece = unicodedata.normalize("NFKC", text[start:end])
+            if piece == text[start:end]:
+                sources.extend(range(start, end))
+            else:
+                sources.extend([start] * len(piece))
+            pieces.append(piece)
+        if "".join(pieces) == full:
+            return full, sources
+    return full, [0] * len(full)
+
+
+def _starter_runs(text: str) -> list[int]:
+    return [0] + [i for i in range(1, len(text)) if not unicodedata.combining(text[i])]
+
+
+def _whitespace_runs(text: str) -> list[int]:
+    return [0] + [i for i in range(1, len(text)) if text[i].isspace() or text[i - 1].isspace()]
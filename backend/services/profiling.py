@@ -0,0 +1,68 @@
+"""Opt-in cProfile capture of single conversions.
+
+With PROFILE_DIR set, ``/api/convert?profile=true`` runs that conversion
+under cProfile in its worker and saves the stats there as a .pstats file,
+whose id the response returns in an ``X-Profile-Id`` header; the file can
+then be downloaded from ``/api/profiles/{id}``. Without PROFILE_DIR the
+flag is ignored and nothing is profiled.
+
+Configuration (environment):
+    PROFILE_DIR   directory for saved profiles (default: unset, profiling disabled)
+    PROFILE_KEEP  profiles kept; older ones are deleted (default 20)
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import secrets
+from pathlib import Path
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR") or None
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "20"))
+
+
+def profiling_enabled() -> bool:
+    return PROFILE_DIR is not None
+
+
+def new_profile() -> tuple[str, str]:
+    """Reserve an id and the path its profile is to be written to."""
+    directory = Path(PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    _prune(directory, PROFILE_KEEP - 1)
+    profile_id = secrets.token_hex(16)
+    return profile_id, str(directory / f"{profile_id}.pstats")
+
+
+def _prune(directory: Path, keep: int) -> None:
+    profiles = sorted(directory.glob("*.pstats"), key=lambda p: p.stat().st_mtime)
+    for path in profiles[:max(0, len(profiles) - keep)]:
+        path.unlink(missing_ok=True)
+
+
+def profile_path(profile_id: str) -> Path | None:
+    """Path of a saved profile, None if the id is unknown or profiling is off."""
+    if PROFILE_DIR is None or not _ID_RE.match(profile_id):
+        return None
+    path = Path(PROFILE_DIR) / f"{profile_id}.pstats"
+    return path if path.is_file() else None
+
+
+def run_profiled(path: str, fn, *args):
+    """Call fn(*args) under cProfile and save the stats to ``path``."""
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args)
+    finally:
+        profiler.dump_stats(path)
+
+
+def profile_report(path: Path, sort: str = "cumulative", limit: int = 60) -> str:
+    """The top ``limit`` functions of a saved profile as text."""
+    out = io.StringIO()
+    pstats.Stats(str(path), stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
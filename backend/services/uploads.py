@@ -0,0 +1,52 @@
+"""Spooling of uploaded files to named temp files.
+
+Conversions run in worker processes, so an uploaded EPUB is copied to a
+named file that a worker can open by path instead of being read into
+memory and pickled across the process boundary. The SHA-256 used as the
+parse-cache key is computed while copying.
+
+Configuration (environment):
+    UPLOAD_SPOOL_DIR  directory for spooled uploads (default: system temp dir)
+"""
+
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO
+
+# Uploads are copied this many bytes at a time
+SPOOL_CHUNK_SIZE = 256 * 1024
+
+
+@dataclass
+class SpooledUpload:
+    path: str
+    digest: str
+    size: int
+
+    def remove(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def spool_upload(file: BinaryIO, suffix: str = "") -> SpooledUpload:
+    """Copy a file object to a named temp file, hashing it on the way."""
+    directory = os.environ.get("UPLOAD_SPOOL_DIR") or None
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    hasher = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="upload-", suffix=suffix, dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: file.read(SPOOL_CHUNK_SIZE), b""):
+                hasher.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return SpooledUpload(path=path, digest=hasher.hexdigest(), size=size)
@@ -0,0 +1,66 @@
+"""Verify streaming and indexed My Clippings.txt parsing."""
+
+import tempfile
+
+from services.clippings_index import ClippingsStore
+from services.clippings_parser import iter_clippings, parse_clippings
+
+CLIPPINGS = """﻿The Great Book (Ann Author)
+- Your Highlight on page 4 | location 10-12 | Added on Monday, January 1, 2024 10:00:00 AM
+
+Naïve “quoted” text
+==========
+Other Book (Someone Else)
+- Your Highlight on location 5-6 | Added on Monday, January 1, 2024 10:01:00 AM
+
+Not this one
+==========
+The Great Book (Ann Author)
+- Your Bookmark on page 9 | location 90 | Added on Monday, January 1, 2024 10:02:00 AM
+
+
+==========
+Great Book (Ann Author)
+- Your Note on location 14 | Added on Monday, January 1, 2024 10:03:00 AM
+
+A note
+==========
+"""
+
+# Test 1: Title filter applied before parsing
+clippings = parse_clippings(CLIPPINGS, filter_title="The Great Book")
+assert [c.text for c in clippings] == ["Naïve “quoted” text", "A note"], f"Test 1 FAIL: {clippings}"
+assert clippings[0].page == 4 and clippings[0].location_start == 10 and clippings[0].location_end == 12
+assert clippings[1].clip_type == "note" and clippings[1].author == "Ann Author"
+print("Test 1 PASS: Filtered parse")
+
+# Test 2: Byte chunks split inside separators and multi-byte characters
+data = CLIPPINGS.encode("utf-8")
+for size in (1, 2, 3, 7, 64):
+    chunks = [data[i:i + size] for i in range(0, len(data), size)]
+    streamed = list(iter_clippings(chunks))
+    assert streamed == parse_clippings(CLIPPINGS), f"Test 2 FAIL: chunk size {size}"
+print("Test 2 PASS: Chunked input matches one-shot parse")
+
+# Test 3: Invalid UTF-8 is replaced, not fatal
+bad = data.replace("Naïve".encode("utf-8"), b"Na\xffve")
+[first, *_] = iter_clippings([bad], filter_title="The Great Book")
+assert first.text == "Na�ve “quoted” text", f"Test 3 FAIL: {first.text!r}"
+print("Test 3 PASS: Invalid bytes replaced")
+
+# Test 4: Stored file index lists books and reads only the matching entries
+store = ClippingsStore(tempfile.mkdtemp(), max_bytes=1024 * 1024, index_entries=4)
+clippings_id = store.put([data[:100], data[100:]])
+assert store.put([data]) == clippings_id, "Test 4 FAIL: same content, different id"
+books = {b["title"]: b for b in store.books(clippings_id)}
+assert books["The Great Book"]["highlights"] == 1 and books["The Great Book"]["notes"] == 1, f"Test 4 FAIL: {books}"
+assert books["Other Book"]["highlights"] == 1, f"Test 4 FAIL: {books}"
+for title in ("The Great Book", "Other Book", "Missing", ""):
+    expected = parse_clippings(CLIPPINGS, filter_title=title)
+    assert store.clippings_for(clippings_id, title) == expected, f"Test 4 FAIL: {title!r}"
+store.indexes = type(store.indexes)(max_entries=4)  # drop in-memory indexes: reload from the sidecar
+assert store.clippings_for(clippings_id, "Other Book") == parse_clippings(CLIPPINGS, "Other Book")
+print("Test 4 PASS: Indexed clippings store")
+
+print()
+print("All tests passed!")
@@ -0,0 +1,127 @@
+"""Verify DedupIndex against the linear containment scan it replaces."""
+
+import random
+
+from benchmarks.synthetic import make_book, make_clippings
+from services.clippings_parser import Clipping
+from services.markdown_generator import DedupIndex, generate_markdown, merge_markdown
+from services.metrics import StageTimer, recording
+
+
+def linear_find(norm, existing):
+    if not norm:
+        return False
+    return any(norm == e or norm in e or e in norm for e in existing)
+
+
+WORDS = "a an the of dream ocean river light dark it's well then x yy".split()
+
+# Test 1: Random exact, truncated, extended and fresh lookups
+for seed in range(300):
+    rng = random.Random(seed)
+    index = DedupIndex()
+    existing: list[str] = []
+    for _ in range(rng.randint(0, 40)):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 12)))
+        index.add(text)
+        existing.append(text)
+    for _ in range(40):
+        roll = rng.random()
+        if existing and roll < 0.3:
+            base = rng.choice(existing)
+            a = rng.randint(0, len(base))
+            query = base[a:a + rng.randint(0, len(base))].strip()  # may cut mid-word
+        elif existing and roll < 0.5:
+            query = " ".join([rng.choice(WORDS), rng.choice(existing), rng.choice(WORDS)])
+        else:
+            query = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 8)))
+        query = " ".join(query.split())
+        found = index.find(query)
+        assert (found is not None) == linear_find(query, existing), f"Test 1 FAIL: seed {seed} {query!r}"
+        if found is not None:
+            assert found == query or found in query or query in found, f"Test 1 FAIL: bad match {found!r}"
+        if rng.random() < 0.3:
+            index.add(query)
+            if query:
+                existing.append(query)
+print("Test 1 PASS: DedupIndex agrees with the linear scan")
+
+# Test 2: Kindle truncation in both directions
+index = DedupIndex()
+index.add("the quick brown fox jumps over the lazy dog")
+assert index.find("quick brown fox jumps") is not None, "Test 2 FAIL: truncated new highlight"
+assert index.find("so the quick brown fox jumps over the lazy dog again") is not None, "Test 2 FAIL: extended"
+assert index.find("ick brown fo") is not None, "Test 2 FAIL: cut mid-word"
+assert index.find("the quick brown cat") is None, "Test 2 FAIL: false positive"
+assert index.find("") is None, "Test 2 FAIL: empty text"
+print("Test 2 PASS: Truncation in both directions")
+
+# Test 3: Owners follow entries
+index = DedupIndex()
+index.add("the quick brown fox jumps", "Chapter 1")
+index.add("the quick brown fox jumps", "Chapter 2")
+index.add("a lazy dog sleeps", "Chapter 2")
+assert index.owner(index.find("quick brown fox")) == "Chapter 1", "Test 3 FAIL: first owner kept"
+assert index.owner(index.find("dog sleeps")) == "Chapter 2", "Test 3 FAIL: owner"
+assert index.owner("unknown text") is None, "Test 3 FAIL: unknown entry"
+print("Test 3 PASS: Owners follow entries")
+
+# Test 4: Merge only matches clippings not already in the file
+book = make_book(chapters=12, words_per_chapter=800)
+clippings = make_clippings(book, count=120, orphan_ratio=0.05)
+existing = generate_markdown(book, clippings[:80]).markdown
+timer = StageTimer()
+with recording(timer):
+    merged = merge_markdown(book, clippings, existing)
+matched = sum(v for k, v in timer.counts.items() if k.startswith("match_tier_"))
+assert matched <= 40, f"Test 4 FAIL: {matched} clippings matched"
+assert merged.stats["duplicates_found"] + merged.stats["new_highlights_added"] == 120, "Test 4 FAIL: counts"
+
+# Without the watermark written by merge, so every clipping is checked
+unmarked = "\n".join(line for line in merged.markdown.splitlines() if not line.startswith("<!--"))
+timer = StageTimer()
+with recording(timer):
+    remerged = merge_markdown(book, clippings, unmarked)
+assert not any(k.startswith("match_tier_") for k in timer.counts), "Test 4 FAIL: re-merge ran the matcher"
+assert remerged.stats["new_highlights_added"] == 0, "Test 4 FAIL: re-merge added highlights"
+assert remerged.stats["duplicates_found"] == 120, "Test 4 FAIL: re-merge duplicates"
+for chapter in remerged.chapters:
+    # Each repeat is listed in the chapter of the highlight it repeats
+    texts = {h["text"] for h in chapter.highlights if not h.get("duplicate")}
+    for h in chapter.highlights:
+        assert not h.get("duplicate") or h["text"] in texts, f"Test 4 FAIL: {h['text']!r} in {chapter.title}"
+print("Test 4 PASS: Merge skips matching for known highlights")
+
+# Test 5: The watermark skips clippings merged before
+merged = merge_markdown(book, clippings[:100], existing)
+assert merged.markdown.count("<!-- kindletomd: merged 100 clippings") == 1, "Test 5 FAIL: watermark written"
+timer = StageTimer()
+with recording(timer):
+    remerged = merge_markdown(book, clippings, merged.markdown)
+assert remerged.stats["already_merged"] == 100, "Test 5 FAIL: watermark not used"
+assert remerged.stats["duplicates_found"] + remerged.stats["new_highlights_added"] == 20, "Test 5 FAIL: counts"
+assert remerged.markdown.count("<!-- kindletomd: merged") == 1, "Test 5 FAIL: watermark not replaced"
+assert "<!-- kindletomd: merged 120 clippings" in remerged.markdown, "Test 5 FAIL: watermark not updated"
+again = merge_markdown(book, clippings, remerged.markdown)
+assert again.stats["already_merged"] == 120 and again.stats["duplicates_found"] == 0, "Test 5 FAIL: no-op merge"
+
+# Anything else falls back to a full merge
+edited = [*clippings[:99], Clipping("T", "A", "edited on the device", "note", None, None, None, None)]
+assert merge_markdown(book, edited, merged.markdown).stats["already_merged"] == 0, "Test 5 FAIL: edited"
+assert merge_markdown(book, clippings[:50], merged.markdown).stats["already_merged"] == 0, "Test 5 FAIL: fewer"
+assert merge_markdown(book, clippings, existing).stats["already_merged"] == 0, "Test 5 FAIL: no watermark"
+print("Test 5 PASS: Watermark skips merged clippings")
+
+# Test 6: Pasted notes are merged but left out of the watermark
+notes = [Clipping("", "", f"pasted note number {i}", "note", None, None, None, None) for i in range(3)]
+with_notes = merge_markdown(book, clippings[:100], existing, notes=notes)
+assert "<!-- kindletomd: merged 100 clippings" in with_notes.markdown, "Test 6 FAIL: notes in watermark"
+assert all(n.text in with_notes.markdown for n in notes), "Test 6 FAIL: notes not merged"
+remerged = merge_markdown(book, clippings, with_notes.markdown)
+assert remerged.stats["already_merged"] == 100, "Test 6 FAIL: watermark not used without notes"
+notes_only = merge_markdown(book, [], remerged.markdown, notes=notes[:1])
+assert "<!-- kindletomd: merged 120 clippings" in notes_only.markdown, "Test 6 FAIL: watermark dropped"
+print("Test 6 PASS: Notes stay out of the watermark")
+
+print()
+print("All tests passed!")
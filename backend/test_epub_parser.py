@@ -0,0 +1,171 @@
+"""Verify that the lazy zip reader parses EPUBs exactly like ebooklib."""
+
+import io
+import logging
+import os
+import tempfile
+import zipfile
+
+from ebooklib import epub
+
+from benchmarks.synthetic import make_epub
+from services import epub_parser
+from services.epub_parser import _LazyEpub, _parse_book, parse_epub
+
+CONTAINER = (
+    '<?xml version="1.0"?><container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+    '<rootfiles><rootfile full-path="{opf}" media-type="application/oebps-package+xml"/></rootfiles></container>'
+)
+
+
+def xhtml(title, body):
+    return (
+        '<?xml version="1.0" encoding="utf-8"?><!DOCTYPE html>'
+        '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">'
+        f"<head><title>{title}</title></head><body>{body}</body></html>"
+    )
+
+
+def nav(links):
+    items = "".join(f'<li><a href="{href}">{label}</a></li>' for label, href in links)
+    return xhtml("Contents", f'<nav epub:type="toc"><ol>{items}</ol></nav>')
+
+
+def build_epub(opf_path, manifest, spine, files, version="3.0", spine_attrs=""):
+    """An EPUB zip from manifest <item>s, spine idrefs and {zip name: content}."""
+    itemrefs = "".join(f'<itemref idref="{idref}"/>' for idref in spine)
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        zf.writestr("META-INF/container.xml", CONTAINER.format(opf=opf_path))
+        for name, content in files.items():
+            zf.writestr(name, content)
+        zf.writestr(
+            opf_path,
+            f'<?xml version="1.0"?><package xmlns="http://www.idpf.org/2007/opf" version="{version}" '
+            'unique-identifier="id"><metadata xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            '<dc:identifier id="id">test</dc:identifier><dc:title>Test Book</dc:title>'
+            "<dc:creator>Test Author</dc:creator></metadata>"
+            f'<manifest>{"".join(manifest)}</manifest>'
+            f"<spine{spine_attrs}>{itemrefs}</spine></package>",
+        )
+    return buf.getvalue()
+
+
+def assert_same_as_ebooklib(name, data):
+    fd, path = tempfile.mkstemp(suffix=".epub")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        with zipfile.ZipFile(path) as zf:
+            lazy = _parse_book(_LazyEpub(zf))
+        reference = _parse_book(epub.read_epub(path, options={"ignore_ncx": False}))
+    finally:
+        os.unlink(path)
+    assert lazy.chapters, f"{name} FAIL: no chapters"
+    assert lazy == reference, f"{name} FAIL:\n{lazy}\nvs\n{reference}"
+    return lazy
+
+
+# Test 1: EPUB 2 with an NCX, fragment entries and files outside the TOC
+data = make_epub(chapters=6, words_per_chapter=200, images=2, image_bytes=100, toc_every=2, sections_per_chapter=2)
+assert_same_as_ebooklib("Test 1", data)
+print("Test 1 PASS: EPUB 2 NCX")
+
+# Test 2: EPUB 3 with only a nav document
+chapters = {f"OEBPS/ch{i}.xhtml": xhtml(f"Ch {i}", f"<h1>Chapter {i}</h1><p>Text of chapter {i}.</p>") for i in (1, 2, 3)}
+data = build_epub(
+    "OEBPS/content.opf",
+    ['<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>']
+    + [f'<item id="ch{i}" href="ch{i}.xhtml" media-type="application/xhtml+xml"/>' for i in (1, 2, 3)],
+    ["ch1", "ch2", "ch3"],
+    {"OEBPS/nav.xhtml": nav([("One", "ch1.xhtml"), ("Two", "ch2.xhtml"), ("Three", "ch3.xhtml")]), **chapters},
+)
+assert_same_as_ebooklib("Test 2", data)
+print("Test 2 PASS: EPUB 3 nav")
+
+# Test 3: A cover image and a cover page ahead of the TOC's first entry
+data = build_epub(
+    "OEBPS/content.opf",
+    [
+        '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>',
+        '<item id="cover-img" href="cover.jpg" media-type="image/jpeg" properties="cover-image"/>',
+        '<item id="cover-page" href="cover.xhtml" media-type="application/xhtml+xml"/>',
+    ]
+    + [f'<item id="ch{i}" href="ch{i}.xhtml" media-type="application/xhtml+xml"/>' for i in (1, 2, 3)],
+    ["cover-page", "ch1", "ch2", "ch3"],
+    {
+        "OEBPS/nav.xhtml": nav([("One", "ch1.xhtml"), ("Three", "ch3.xhtml")]),
+        "OEBPS/cover.jpg": b"\xff\xd8\xff\xe0not really a jpeg",
+        "OEBPS/cover.xhtml": xhtml("Cover", '<img src="cover.jpg" alt="Cover"/>'),
+        **chapters,
+    },
+)
+assert_same_as_ebooklib("Test 3", data)
+print("Test 3 PASS: Cover")
+
+# Test 4: Documents in subdirectories, one with a percent-encoded href that
+# only the spine lists, so its text is merged into the chapter before it
+data = build_epub(
+    "OEBPS/content.opf",
+    [
+        '<item id="ncx" href="toc.ncx" media-type="application/x-dtbncx+xml"/>',
+        '<item id="c1" href="Text/ch1.xhtml" media-type="application/xhtml+xml"/>',
+        '<item id="c2" href="Text/Chapter%202.xhtml" media-type="application/xhtml+xml"/>',
+        '<item id="c3" href="Text/ch3.xhtml" media-type="application/xhtml+xml"/>',
+    ],
+    ["c1", "c2", "c3"],
+    {
+        "OEBPS/toc.ncx": (
+            '<?xml version="1.0"?><ncx xmlns="http://www.daisy.org/z3986/2005/ncx/" version="2005-1">'
+            "<head/><docTitle><text>Test Book</text></docTitle><navMap>"
+            '<navPoint id="n1" playOrder="1"><navLabel><text>One</text></navLabel>'
+            '<content src="Text/ch1.xhtml"/></navPoint>'
+            '<navPoint id="n2" playOrder="2"><navLabel><text>Three, part</text></navLabel>'
+            '<content src="Text/ch3.xhtml#part"/></navPoint>'
+            "</navMap></ncx>"
+        ),
+        "OEBPS/Text/ch1.xhtml": xhtml("One", "<p>First chapter text.</p>"),
+        "OEBPS/Text/Chapter 2.xhtml": xhtml("Two", "<p>Encoded chapter text.</p>"),
+        "OEBPS/Text/ch3.xhtml": xhtml("Three", '<p>Before the part.</p><h2 id="part">Part</h2><p>The part.</p>'),
+    },
+    spine_attrs=' toc="ncx"',
+)
+book = assert_same_as_ebooklib("Test 4", data)
+assert "Encoded chapter text." in book.chapters[0].text, f"Test 4 FAIL: {book.chapters[0].text!r}"
+assert "The part." in book.chapters[1].text, f"Test 4 FAIL: {book.chapters[1].text!r}"
+print("Test 4 PASS: Subdirectories and percent-encoded hrefs")
+
+
+# Test 5: Malformed EPUBs fall back to ebooklib; other errors are not swallowed
+class Rejecting:
+    def __init__(self, zf):
+        raise self.error
+
+
+saved = epub_parser._LazyEpub
+records: list[logging.LogRecord] = []
+handler = logging.Handler()
+handler.emit = records.append
+epub_parser.logger.addHandler(handler)
+try:
+    epub_parser._LazyEpub = Rejecting
+    Rejecting.error = ValueError("unsupported layout")
+    book = parse_epub(data)
+    assert book.chapters and records, "Test 5 FAIL: no fallback"
+    assert "parsing with ebooklib" in records[0].getMessage(), "Test 5 FAIL: fallback not logged"
+
+    Rejecting.error = AttributeError("_parse_ncx")
+    try:
+        parse_epub(data)
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("Test 5 FAIL: AttributeError swallowed")
+finally:
+    epub_parser._LazyEpub = saved
+    epub_parser.logger.removeHandler(handler)
+print("Test 5 PASS: Narrow fallback to ebooklib")
+
+print()
+print("All tests passed!")
@@ -0,0 +1,155 @@
+"""Verify that every matching engine picks the same chapters as _match_score."""
+
+import random
+
+from benchmarks.synthetic import make_book, make_clippings
+from services import markdown_generator
+from services.clippings_parser import Clipping
+from services.epub_parser import Chapter, ParsedBook
+from services.metrics import StageTimer, recording
+from services.markdown_generator import (
+    MATCHERS,
+    _Automaton,
+    _highlight_query,
+    _match_score,
+    build_book_index,
+    generate_markdown,
+)
+
+WORDS = (
+    "the of and to in it was he she dream ocean river mountain light dark "
+    "“quoted” don’t well—then naïve ﬁne café time space strange"
+).split()
+
+
+def reference_match(text, chapters):
+    """The original per-pair loop: first chapter with the best score."""
+    best, best_score = None, 0
+    for chapter in chapters:
+        score = _match_score(text, chapter.text)
+        if score > best_score:
+            best, best_score = chapter, score
+            if score == 3:
+                break
+    return best, best_score
+
+
+def random_case(seed):
+    rng = random.Random(seed)
+    chapters = [
+        Chapter(
+            title=f"Chapter {i}",
+            level=1,
+            order=i,
+            text=" ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 300))),
+        )
+        for i in range(rng.randint(1, 10))
+    ]
+    texts = []
+    for _ in range(rng.randint(1, 30)):
+        words = rng.choice(chapters).text.split()
+        start = rng.randint(0, max(0, len(words) - 12))
+        span = words[start:start + rng.randint(1, 25)]
+        roll = rng.random()
+        if roll < 0.2 and len(span) > 10:
+            span[len(span) // 2] = "zzz"  # truncated/edited middle: tier 2
+        elif roll < 0.4:
+            rng.shuffle(span)  # same words, different order: tier 1
+        elif roll < 0.5:
+            span = [rng.choice(WORDS) + "x" for _ in range(8)]  # orphan
+        texts.append(" ".join(span))
+    return chapters, texts
+
+
+# Test 1: All engines agree with the per-pair reference on random books
+for seed in range(200):
+    chapters, texts = random_case(seed)
+    index = build_book_index(ParsedBook(title="T", author="A", chapters=chapters))
+    queries = [_highlight_query(t) for t in texts]
+    expected = [reference_match(t, chapters) for t in texts]
+    for name, matcher in MATCHERS.items():
+        got = [(m.chapter, m.score) for m in matcher(queries, index)]
+        assert got == expected, f"Test 1 FAIL: {name} differs on seed {seed}"
+print("Test 1 PASS: All matchers agree with _match_score")
+
+# Test 2: Pure-Python automaton agrees with the default automaton
+saved = markdown_generator.ahocorasick
+markdown_generator.ahocorasick = None
+try:
+    for seed in range(50):
+        chapters, texts = random_case(seed)
+        index = build_book_index(ParsedBook(title="T", author="A", chapters=chapters))
+        queries = [_highlight_query(t) for t in texts]
+        got = [(m.chapter, m.score) for m in MATCHERS["automaton"](queries, index)]
+        expected = [(m.chapter, m.score) for m in MATCHERS["indexed"](queries, index)]
+        assert got == expected, f"Test 2 FAIL: seed {seed}"
+finally:
+    markdown_generator.ahocorasick = saved
+print("Test 2 PASS: Pure-Python automaton matches")
+
+# Test 3: Automaton reports every occurrence, including overlapping patterns
+automaton = _Automaton()
+for word in ["he", "she", "his", "hers"]:
+    automaton.add_word(word, word)
+automaton.make_automaton()
+hits = sorted(automaton.iter("ushers"))
+assert hits == [(3, "he"), (3, "she"), (5, "hers")], f"Test 3 FAIL: {hits}"
+print("Test 3 PASS: Automaton finds overlapping patterns")
+
+# Test 4: generate_markdown output does not depend on the engine
+chapters, texts = random_case(7)
+book = ParsedBook(title="T", author="A", chapters=chapters)
+clippings = [Clipping("T", "A", t, "highlight", None, None, None, None) for t in texts]
+outputs = {generate_markdown(book, clippings, matcher=name).markdown for name in MATCHERS}
+assert len(outputs) == 1, "Test 4 FAIL: engines produce different markdown"
+print("Test 4 PASS: Same markdown from every engine")
+
+# Test 5: Location-guided matching on a book read front to back
+book = make_book(chapters=20, words_per_chapter=800)
+clippings = make_clippings(book, count=200)
+located = generate_markdown(book, clippings, matcher="location")
+reference = generate_markdown(book, clippings, matcher="pairwise")
+assert located.markdown == reference.markdown, "Test 5 FAIL: location matcher changed the output"
+assert located.stats["comparisons_saved"] > 0, f"Test 5 FAIL: {located.stats}"
+assert "comparisons_saved" not in reference.stats, "Test 5 FAIL: pairwise reports comparisons"
+print("Test 5 PASS: Location-guided matching")
+
+# Test 6: Matching reports its progress to a listening timer
+for name in MATCHERS:
+    events: list[dict] = []
+    with recording(StageTimer(events.append)):
+        generate_markdown(book, clippings, matcher=name)
+    done = [e["done"] for e in events if e["stage"] == "matching"]
+    assert done[0] == 0 and done[-1] == len(clippings), f"Test 6 FAIL: {name} {done}"
+    assert done == sorted(set(done)), f"Test 6 FAIL: {name} not increasing"
+    assert all(e["total"] == len(clippings) for e in events), f"Test 6 FAIL: {name} total"
+print("Test 6 PASS: Matching progress events")
+
+# Test 7: The location matcher only trusts a direct match near the predicted
+# chapter; a first+last words match there loses to a direct match elsewhere
+book = ParsedBook(title="T", author="A", chapters=[
+    Chapter(title="One", level=1, order=0, text="opening line of the book"),
+    Chapter(title="Two", level=1, order=1, text=(
+        "alpha beta gamma delta epsilon zeta eta theta one two three four five and more"
+    )),
+    Chapter(title="Three", level=1, order=2, text="nothing to see here"),
+    Chapter(title="Four", level=1, order=3, text=(
+        "alpha beta gamma delta epsilon iota kappa one two three four five"
+    )),
+])
+index = build_book_index(book)
+queries = [
+    _highlight_query("opening line of the book", location=10),
+    _highlight_query("alpha beta gamma delta epsilon iota kappa one two three four five", location=20),
+]
+reference = MATCHERS["pairwise"](queries, index)
+located = MATCHERS["location"](queries, index)
+assert [m.chapter.title for m in located] == [m.chapter.title for m in reference] == ["One", "Four"], (
+    f"Test 7 FAIL: {[m.chapter.title for m in located]}"
+)
+# Nothing predicted for the first; two candidates and then the full search for the second
+assert [m.comparisons for m in located] == [4, 2 + 4], f"Test 7 FAIL: {[m.comparisons for m in located]}"
+print("Test 7 PASS: Location matcher keeps tier precedence")
+
+print()
+print("All tests passed!")
@@ -0,0 +1,52 @@
+"""Verify the normalizer against its golden cases and its offset map."""
+
+import json
+import random
+from pathlib import Path
+
+from services.normalize import _normalize, normalize_for_search, normalize_with_offsets
+
+GOLDEN = json.loads((Path(__file__).parent / "testdata" / "normalize_golden.json").read_text())
+
+# Test 1: Golden cases (shared with frontend/scripts/check-normalize.mjs)
+for case in GOLDEN:
+    assert normalize_for_search(case["input"]) == case["normalized"], f"Test 1 FAIL: {case!r}"
+    assert normalize_with_offsets(case["input"])[0] == case["normalized"], f"Test 1 FAIL: {case!r}"
+print(f"Test 1 PASS: {len(GOLDEN)} golden cases")
+
+# Test 2: Offsets are one longer than the output, non-decreasing and in range
+ALPHABET = ["a", "B", "z", " ", "\n", "'", "’", "“", "—", "­", "​",
+            "ﬁ", "é", "É", "Ａ", "İ", "Σ", ".", "-", "7"]
+for seed in range(500):
+    rng = random.Random(seed)
+    text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40)))
+    normalized, offsets = normalize_with_offsets(text)
+    assert normalized == _normalize(text), f"Test 2 FAIL: {text!r}"
+    assert len(offsets) == len(normalized) + 1, f"Test 2 FAIL: {text!r}"
+    assert all(a <= b for a, b in zip(offsets, offsets[1:])), f"Test 2 FAIL: {text!r}"
+    assert all(0 <= o <= len(text) for o in offsets), f"Test 2 FAIL: {text!r}"
+print("Test 2 PASS: Offset map shape")
+
+# Test 3: A match in normalized text maps back to the original span
+text = "He said “It’s  the­ory” — and left.\nThe ﬁnal word."
+normalized, offsets = normalize_with_offsets(text)
+for needle, expected in [
+    ("said it's", "said “It’s"),
+    ("theory", "the­ory"),
+    ("and left", "and left"),
+    ("final word", "ﬁnal word"),
+]:
+    start = normalized.index(needle)
+    span = text[offsets[start]:offsets[start + len(needle)]]
+    assert span == expected, f"Test 3 FAIL: {needle!r} -> {span!r}"
+print("Test 3 PASS: Spans map back to the original text")
+
+# Test 4: Memoized and unmemoized paths agree
+long_text = "The “quick” brown fox — " * 100
+assert normalize_for_search(long_text) == _normalize(long_text), "Test 4 FAIL: long text"
+for case in GOLDEN:
+    assert normalize_for_search(case["input"]) == _normalize(case["input"]), f"Test 4 FAIL: {case!r}"
+print("Test 4 PASS: Memoized results match")
+
+print()
+print("All tests passed!")
@@ -0,0 +1,145 @@
+"""Verify the lxml text extractor against BeautifulSoup and golden files.
+
+testdata/xhtml holds EPUB chapter documents; each has a .txt golden file
+with the text parse_epub extracts from it (after ebooklib's rendering of
+the document body).
+"""
+
+import random
+import tempfile
+import warnings
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+from ebooklib import epub
+
+from services.epub_parser import (
+    _Documents,
+    _extract_sections,
+    _extract_text,
+    _extract_text_bs4,
+    _extract_text_lxml,
+    _strings_bs4,
+    _strings_lxml,
+    parse_epub,
+)
+
+warnings.filterwarnings("ignore")
+
+SAMPLES = sorted((Path(__file__).parent / "testdata" / "xhtml").glob("*.xhtml"))
+
+
+def rendered(raw: bytes) -> bytes:
+    """The document as parse_epub sees it (EpubHtml re-renders the body)."""
+    item = epub.EpubHtml(content=raw)
+    item.book = epub.EpubBook()
+    return item.get_content()
+
+
+def reference_heading(doc: bytes) -> str | None:
+    """How the no-TOC fallback used to title a chapter."""
+    heading = BeautifulSoup(doc, "lxml").find(["h1", "h2", "h3"])
+    return heading.get_text(strip=True) if heading else None
+
+
+def check_equivalent(doc: bytes, label: str) -> None:
+    fast = _extract_text_lxml(doc)
+    if fast is not None:
+        assert fast == _extract_text_bs4(doc), f"{label}: lxml {fast!r} != bs4 {_extract_text_bs4(doc)!r}"
+    heading = reference_heading(doc)
+    for path, result in (("lxml", _strings_lxml(doc, frozenset())), ("bs4", _strings_bs4(doc, frozenset()))):
+        if result is not None:
+            assert result[2] == heading, f"{label}: {path} heading {result[2]!r} != {heading!r}"
+
+
+assert SAMPLES, "no samples in testdata/xhtml"
+
+# Test 1: Golden text for every sample
+for path in SAMPLES:
+    expected = path.with_suffix(".txt").read_text(encoding="utf-8").strip()
+    got = _extract_text(rendered(path.read_bytes()))
+    assert got == expected, f"Test 1 FAIL: {path.name}\n  got      {got!r}\n  expected {expected!r}"
+print(f"Test 1 PASS: {len(SAMPLES)} golden files match")
+
+# Test 2: lxml and BeautifulSoup agree on raw and rendered samples
+taken = 0
+for path in SAMPLES:
+    for label, doc in (("raw", path.read_bytes()), ("rendered", rendered(path.read_bytes()))):
+        check_equivalent(doc, f"Test 2 FAIL: {path.name} ({label})")
+        taken += _extract_text_lxml(doc) is not None
+print(f"Test 2 PASS: extractors agree ({taken} of {2 * len(SAMPLES)} documents took the lxml path)")
+
+# Test 3: Non-UTF-8 and undeclared documents are left to BeautifulSoup
+latin = (Path(__file__).parent / "testdata" / "xhtml" / "windows1252.xhtml").read_bytes()
+assert _extract_text_lxml(latin) is None, "Test 3 FAIL: windows-1252 document took the lxml path"
+assert "Café crème" in _extract_text(latin), "Test 3 FAIL: windows-1252 document mis-decoded"
+assert _extract_text_lxml(b"<p>no declaration</p>") is None, "Test 3 FAIL: undeclared document took the lxml path"
+assert _extract_text("<p>str input</p>") == "str input", "Test 3 FAIL: str input"
+print("Test 3 PASS: other encodings fall back to BeautifulSoup")
+
+# Test 4: Random tag soup
+TAGS = ["p", "b", "span", "div", "script", "style", "template", "rt", "rp", "ruby",
+        "table", "tr", "td", "li", "title", "head", "body", "html", "br", "pre", "h1", "h2", "h3"]
+TEXTS = ["word", " spaced  out ", "\n\t", "&amp;", "&nbsp;", "\xa0", "“q”", "soft\xadhy",
+         "日本", "<!-- c -->", "<![CDATA[cd]]>", "<?pi x?>", "&bogus;", "<", "&"]
+
+
+def soup(rng: random.Random, depth: int = 0) -> str:
+    out = []
+    for _ in range(rng.randint(0, 5)):
+        if rng.random() < 0.5 or depth > 5:
+            out.append(rng.choice(TEXTS))
+        else:
+            tag = rng.choice(TAGS)
+            close = f"</{tag}>" if rng.random() < 0.9 else ""
+            out.append(f"<{tag}>{soup(rng, depth + 1)}{close}")
+    return "".join(out)
+
+
+for seed in range(1500):
+    rng = random.Random(seed)
+    raw = f"<?xml version='1.0' encoding='utf-8'?><html><body>{soup(rng)}</body></html>".encode()
+    check_equivalent(raw, f"Test 4 FAIL: seed {seed} (raw)")
+    check_equivalent(rendered(raw), f"Test 4 FAIL: seed {seed} (rendered)")
+print("Test 4 PASS: extractors agree on text and headings of 1500 random documents")
+
+# Test 5: Documents split at fragment anchors
+doc = (b"<?xml version='1.0' encoding='utf-8'?><html><body><h1>Part One</h1>"
+       b"<h2 id='s1'>First</h2><p>alpha beta</p><script id='s3'>x</script>"
+       b"<h2><a name='s2'/>Second</h2><p>gamma</p></body></html>")
+anchors = frozenset({"s1", "s2", "s3", "missing"})
+for label, document in (("lxml", doc), ("bs4", doc.replace(b"utf-8", b"latin-1"))):
+    sections, found = _extract_sections(document, anchors)
+    assert sections == ["Part One", "First alpha beta", "Second gamma"], f"Test 5 FAIL: {label} {sections}"
+    assert found == {"s1": 1, "s2": 2}, f"Test 5 FAIL: {label} {found}"
+    assert " ".join(sections) == _extract_text(document), f"Test 5 FAIL: {label} sections do not add up"
+
+book = epub.EpubBook()
+book.set_identifier("fragments")
+book.set_title("Fragments")
+chapter = epub.EpubHtml(title="Part One", file_name="part1.xhtml")
+chapter.content = doc
+book.add_item(chapter)
+book.toc = [epub.Link("part1.xhtml#s1", "First", "c1"), epub.Link("part1.xhtml#s2", "Second", "c2")]
+book.add_item(epub.EpubNcx())
+book.spine = [chapter]
+with tempfile.TemporaryDirectory() as tmp:
+    path = str(Path(tmp) / "fragments.epub")
+    epub.write_epub(path, book)
+    parsed = parse_epub(path)
+texts = [ch.text for ch in parsed.chapters]
+assert texts == ["Part One First alpha beta", "Second gamma"], f"Test 5 FAIL: {texts}"
+print("Test 5 PASS: TOC entries get their own section of a shared document")
+
+# Test 6: Prefetched documents (rendered by the extracting worker) match on-demand extraction
+for path in SAMPLES:
+    book.add_item(epub.EpubHtml(title=path.stem, file_name=path.name, content=path.read_bytes()))
+documents = _Documents(book, [path.name for path in SAMPLES])
+documents.prefetch(documents.referenced_items(), workers=0)
+for path in SAMPLES:
+    expected = path.with_suffix(".txt").read_text(encoding="utf-8").strip()
+    assert documents.text(path.name) == expected, f"Test 6 FAIL: {path.name}"
+    assert documents.whole_text(book.get_item_with_href(path.name)) == expected, f"Test 6 FAIL: {path.name}"
+print("Test 6 PASS: prefetched documents match their golden text")
+
+print("\nAll tests passed!")
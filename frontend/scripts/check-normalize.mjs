@@ -0,0 +1,27 @@
+// Checks src/utils/normalize.ts against the golden cases shared with the backend.
+//   npm run test:normalize
+import { readFileSync } from 'node:fs';
+import ts from 'typescript';
+
+const source = readFileSync(new URL('../src/utils/normalize.ts', import.meta.url), 'utf8');
+const { outputText } = ts.transpileModule(source, {
+  compilerOptions: { module: ts.ModuleKind.ESNext, target: ts.ScriptTarget.ES2022 },
+});
+const { normalizeForMatch } = await import(`data:text/javascript,${encodeURIComponent(outputText)}`);
+
+const golden = JSON.parse(
+  readFileSync(new URL('../../backend/testdata/normalize_golden.json', import.meta.url), 'utf8'),
+);
+let failures = 0;
+for (const { input, normalized } of golden) {
+  const got = normalizeForMatch(input);
+  if (got !== normalized) {
+    failures++;
+    console.error(`FAIL ${JSON.stringify(input)}\n  got      ${JSON.stringify(got)}\n  expected ${JSON.stringify(normalized)}`);
+  }
+}
+if (failures) {
+  console.error(`${failures} of ${golden.length} cases differ from the backend`);
+  process.exit(1);
+}
+console.log(`All ${golden.length} normalization cases match the backend`);
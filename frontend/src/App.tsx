@@ -6,24 +6,26 @@ import { Header } from './components/Header/Header';
 import { UploadPage } from './components/UploadPage/UploadPage';
 import { ResultsPage } from './components/ResultsPage/ResultsPage';
 import { convertFiles } from './api/convert';
-import type { ConversionResult } from './types';
+import type { ConversionProgress, ConversionResult } from './types';
 import classes from './App.module.css';
 
 export default function App() {
   const [result, setResult] = useState<ConversionResult | null>(null);
   const [loading, setLoading] = useState(false);
+  const [progress, setProgress] = useState<ConversionProgress | null>(null);
   const [error, setError] = useState<string | null>(null);
 
   const handleConvert = async (epub: File, clippings: File | null, notes?: string, existingMarkdown?: File, existingMarkdownText?: string) => {
     setLoading(true);
     setError(null);
     try {
-      const data = await convertFiles(epub, clippings, notes, existingMarkdown, existingMarkdownText);
+      const data = await convertFiles(epub, clippings, notes, existingMarkdown, existingMarkdownText, setProgress);
       setResult(data);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Conversion failed');
     } finally {
       setLoading(false);
+      setProgress(null);
     }
   };
 
@@ -44,7 +46,7 @@ export default function App() {
     <MantineProvider>
       <div className={classes.app}>
         <Header />
-        <UploadPage onConvert={handleConvert} loading={loading} />
+        <UploadPage onConvert={handleConvert} loading={loading} progress={progress} />
         {error && (
           <div className={classes.error}>
             {error}
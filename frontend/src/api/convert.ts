@@ -1,14 +1,64 @@
-import type { ConversionResult } from '../types';
+import type { ConversionEvent, ConversionProgress, ConversionResult } from '../types';
 
 const API_BASE = import.meta.env.VITE_API_BASE || '';
 
+// Progress bar percentage reached when each stage is reported; matching fills the range after them
+const STAGE_PERCENT = {
+  upload: 10,
+  epub_parsed: 25,
+  clippings_parsed: 35,
+  merge: 40,
+};
+const MATCHING_START = 40;
+const MATCHING_END = 95;
+
+function nextProgress(progress: ConversionProgress, event: ConversionEvent): ConversionProgress {
+  switch (event.stage) {
+    case 'upload':
+      return { ...progress, percent: STAGE_PERCENT.upload, label: 'Files received' };
+    case 'epub_parsed':
+      return {
+        ...progress,
+        percent: STAGE_PERCENT.epub_parsed,
+        label: `Read ${event.chapters} chapters`,
+        title: event.title,
+        chapters: event.chapters,
+      };
+    case 'clippings_parsed':
+      return {
+        ...progress,
+        percent: STAGE_PERCENT.clippings_parsed,
+        label: `Found ${event.highlights} highlights`,
+        highlights: event.highlights,
+      };
+    case 'merge':
+      return {
+        ...progress,
+        percent: STAGE_PERCENT.merge,
+        label: `Merging ${event.new} new highlights into ${event.existing_highlights} existing`,
+      };
+    case 'matching': {
+      const share = event.total > 0 ? event.done / event.total : 1;
+      return {
+        ...progress,
+        percent: MATCHING_START + Math.round(share * (MATCHING_END - MATCHING_START)),
+        label: `Matching highlights to chapters: ${event.done} of ${event.total}`,
+      };
+    }
+    case 'done':
+      return { ...progress, percent: 100, label: 'Done' };
+    default:
+      return progress;
+  }
+}
+
 export async function convertFiles(
   epub: File,
   clippings: File | null,
   notes?: string,
   existingMarkdown?: File,
   existingMarkdownText?: string,
-  onProgress?: (pct: number) => void
+  onProgress?: (progress: ConversionProgress) => void
 ): Promise<ConversionResult> {
   const formData = new FormData();
   formData.append('epub', epub);
@@ -25,21 +75,40 @@ export async function convertFiles(
     formData.append('existing_markdown_text', existingMarkdownText);
   }
 
-  onProgress?.(10);
+  let progress: ConversionProgress = { percent: 0, label: 'Uploading files' };
+  onProgress?.(progress);
 
-  const response = await fetch(`${API_BASE}/api/convert`, {
+  const response = await fetch(`${API_BASE}/api/convert/stream`, {
     method: 'POST',
     body: formData,
   });
 
-  onProgress?.(80);
-
-  if (!response.ok) {
+  if (!response.ok || !response.body) {
     const error = await response.json().catch(() => ({ detail: 'Conversion failed' }));
     throw new Error(error.detail || 'Conversion failed');
   }
 
-  const data: ConversionResult = await response.json();
-  onProgress?.(100);
-  return data;
+  // One JSON event per line; a read can end mid-line
+  const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (value) buffer += value;
+    const lines = buffer.split('\n');
+    buffer = done ? '' : lines.pop() ?? '';
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const event: ConversionEvent = JSON.parse(line);
+      if (event.stage === 'error') {
+        throw new Error(event.detail || 'Conversion failed');
+      }
+      progress = nextProgress(progress, event);
+      onProgress?.(progress);
+      if (event.stage === 'done') {
+        return event.result;
+      }
+    }
+    if (done) break;
+  }
+  throw new Error('Conversion failed: the connection closed early');
 }
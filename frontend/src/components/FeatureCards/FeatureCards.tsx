@@ -17,9 +17,9 @@ const features = [
   },
   {
     icon: IconShieldLock,
-    title: '100% Private',
+    title: 'Self-Hosted',
     description:
-      'All processing happens on your machine. Your books and highlights never leave your computer.',
+      'Conversion runs on the server you host. Books are deleted after conversion, clippings after a day without use.',
   },
 ];
 
@@ -33,27 +33,9 @@ function filterDuplicateText(node: ReactNode): ReactNode {
 }
 
 import classes from './MarkdownPreview.module.css';
+import { normalizeForMatch } from '../../utils/normalize';
 
-// --- Normalization & duplicate detection (mirrors backend logic) ---
-
-/** JS port of backend's _normalize_for_search */
-function normalizeForMatch(text: string): string {
-  // Collapse whitespace, lowercase
-  let t = text.replace(/\s+/g, ' ').trim().toLowerCase();
-  // Curly single quotes → ASCII apostrophe
-  t = t.replace(/[\u2018\u2019\u201a\u2039\u203a\u02bc]/g, "'");
-  // Curly double quotes / guillemets → ASCII double quote
-  t = t.replace(/[\u201c\u201d\u201e\u00ab\u00bb]/g, '"');
-  // Dash variants → ASCII hyphen
-  t = t.replace(/[\u2014\u2013\u2012\u2015]/g, '-');
-  // Soft hyphen → remove
-  t = t.replace(/\u00ad/g, '');
-  // Zero-width / invisible chars
-  t = t.replace(/[\u200b-\u200f\u2028-\u202f\u2060\ufeff]/g, '');
-  // Remove non-alphanumeric except spaces and apostrophes
-  t = t.replace(/[^\w\s']/g, ' ');
-  return t.replace(/\s+/g, ' ').trim();
-}
+// --- Duplicate detection (mirrors backend logic) ---
 
 interface HighlightItem {
   text: string;
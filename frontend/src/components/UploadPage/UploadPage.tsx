@@ -1,10 +1,11 @@
 import { useState } from 'react';
-import { Container, Title, Text, Button, Group, Card, Stack, Textarea, Collapse, UnstyledButton, Switch } from '@mantine/core';
+import { Container, Title, Text, Button, Group, Card, Stack, Textarea, Collapse, UnstyledButton, Switch, Progress } from '@mantine/core';
 import { type FileWithPath } from '@mantine/dropzone';
 import { IconBolt, IconLock, IconGitMerge, IconChevronDown, IconChevronRight, IconNotes } from '@tabler/icons-react';
 import { FileDropzone } from '../FileDropzone/FileDropzone';
 import { HowItWorks } from '../HowItWorks/HowItWorks';
 import { FeatureCards } from '../FeatureCards/FeatureCards';
+import type { ConversionProgress } from '../../types';
 import classes from './UploadPage.module.css';
 
 const MARKDOWN_MIME = ['text/markdown', 'text/plain'];
@@ -12,12 +13,13 @@ const MARKDOWN_MIME = ['text/markdown', 'text/plain'];
 interface UploadPageProps {
   onConvert: (epub: File, clippings: File | null, notes?: string, existingMarkdown?: File, existingMarkdownText?: string) => void;
   loading: boolean;
+  progress?: ConversionProgress | null;
 }
 
 const EPUB_MIME = ['application/epub+zip'];
 const CLIPPINGS_MIME = ['text/plain', 'text/html'];
 
-export function UploadPage({ onConvert, loading }: UploadPageProps) {
+export function UploadPage({ onConvert, loading, progress }: UploadPageProps) {
   const [epub, setEpub] = useState<File | null>(null);
   const [clippings, setClippings] = useState<File | null>(null);
   const [notes, setNotes] = useState('');
@@ -193,11 +195,30 @@ export function UploadPage({ onConvert, loading }: UploadPageProps) {
             Convert to Markdown
           </Button>
 
+          {/* Conversion progress, as reported by the server */}
+          {loading && progress && (
+            <Stack gap={6} className={classes.progress}>
+              <Progress value={progress.percent} radius="xl" animated />
+              <Text size="sm" c="dimmed" ta="center">
+                {progress.label}
+              </Text>
+              {(progress.chapters !== undefined || progress.highlights !== undefined) && (
+                <Text size="xs" c="dimmed" ta="center">
+                  {[
+                    progress.title,
+                    progress.chapters !== undefined && `${progress.chapters} chapters`,
+                    progress.highlights !== undefined && `${progress.highlights} highlights`,
+                  ].filter(Boolean).join(' · ')}
+                </Text>
+              )}
+            </Stack>
+          )}
+
           {/* Privacy note */}
           <Group gap={6} c="dimmed">
             <IconLock size={14} />
             <Text size="xs">
-              Your files are processed locally and never leave your browser.
+              Files are converted on your KindleNotes server. Your clippings file is kept there for a day so you can convert more books without uploading it again.
             </Text>
           </Group>
 
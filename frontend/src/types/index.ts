@@ -16,6 +16,7 @@ export interface ConversionResult {
   chapters: Chapter[];
   markdown: string;
   original_markdown?: string | null;
+  clippings_id?: string | null;
   stats: {
     total_highlights: number;
     matched_highlights: number;
@@ -26,5 +27,24 @@ export interface ConversionResult {
     existing_highlights?: number;
     new_highlights_added?: number;
     duplicates_found?: number;
+    already_merged?: number;
   };
 }
+
+/** Events streamed by /api/convert/stream, one JSON object per line */
+export type ConversionEvent =
+  | { stage: 'upload'; epub_bytes?: number; clippings_bytes?: number }
+  | { stage: 'epub_parsed'; title: string; chapters: number }
+  | { stage: 'clippings_parsed'; highlights: number }
+  | { stage: 'merge'; existing_highlights: number; already_merged: number; repeated: number; new: number }
+  | { stage: 'matching'; done: number; total: number }
+  | { stage: 'done'; result: ConversionResult; timings: Record<string, number> }
+  | { stage: 'error'; status: number; detail: string };
+
+export interface ConversionProgress {
+  percent: number;
+  label: string;
+  title?: string;
+  chapters?: number;
+  highlights?: number;
+}
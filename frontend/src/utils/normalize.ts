@@ -0,0 +1,37 @@
+/**
+ * Text normalization for matching highlights, mirroring the backend's
+ * services/normalize.py step for step. backend/testdata/normalize_golden.json
+ * holds cases both must agree on; check with `npm run test:normalize`.
+ */
+
+// Python's str.isspace() characters (JS \s differs: it has \ufeff, lacks \x1c-\x1f and \x85)
+const WHITESPACE = '\\t\\n\\v\\f\\r\\x1c-\\x20\\x85\\xa0\\u1680\\u2000-\\u200a\\u2028\\u2029\\u202f\\u205f\\u3000';
+
+// Zero-width, bidi marks, line/paragraph separators, narrow nbsp, word joiner,
+// BOM and soft hyphen. Removed before lowercasing, which looks at neighbours (final sigma)
+const INVISIBLE = /[\u200b-\u200f\u2028-\u202f\u2060\ufeff\u00ad]/g;
+
+const MAP: Record<string, string> = {
+  // Apostrophes: curly, low-9, angle single, modifier
+  '\u2018': "'", '\u2019': "'", '\u201a': "'", '\u2039': "'", '\u203a': "'", '\u02bc': "'",
+  // Double quotes: curly, low-9, guillemets
+  '\u201c': ' ', '\u201d': ' ', '\u201e': ' ', '\u00ab': ' ', '\u00bb': ' ',
+  // Dashes: em, en, figure, horizontal bar
+  '\u2014': ' ', '\u2013': ' ', '\u2012': ' ', '\u2015': ' ',
+};
+const MAPPED = new RegExp(`[${Object.keys(MAP).join('')}]`, 'g');
+
+// Anything but Python's \w (letters, numbers, underscore), whitespace and apostrophes
+const NON_WORD = new RegExp(`[^\\p{L}\\p{N}_${WHITESPACE}']`, 'gu');
+const WHITESPACE_RUN = new RegExp(`[${WHITESPACE}]+`);
+
+/** Normalize text for fuzzy substring matching, as the backend does. */
+export function normalizeForMatch(text: string): string {
+  const t = text
+    .normalize('NFKC')
+    .replace(INVISIBLE, '')
+    .toLowerCase()
+    .replace(MAPPED, (c) => MAP[c])
+    .replace(NON_WORD, ' ');
+  return t.split(WHITESPACE_RUN).filter(Boolean).join(' ');
+}